@@ -0,0 +1,39 @@
+from collections import deque
+from typing import Deque
+
+from ..models.schemas import LLMCallRecord, LLMMetrics
+
+# 保留最近多少次调用的明细
+RECENT_CALLS = 100
+
+class LLMMetricsRecorder:
+    """进程内的模型调用统计：累计token、响应字节数和延迟，并保留最近的调用明细"""
+
+    def __init__(self):
+        self.totals = LLMMetrics()
+        self._recent: Deque[LLMCallRecord] = deque(maxlen=RECENT_CALLS)
+
+    def record(self, call: LLMCallRecord) -> None:
+        totals = self.totals
+        totals.calls += 1
+        if call.outcome != "ok":
+            totals.failed_calls += 1
+        # 服务端未返回usage时使用发送前的估算值
+        totals.prompt_tokens += call.prompt_tokens if call.prompt_tokens is not None else call.estimated_prompt_tokens
+        totals.completion_tokens += call.completion_tokens or 0
+        totals.response_bytes += call.response_bytes
+        totals.total_latency_ms += call.latency_ms
+        self._recent.append(call)
+
+    def record_local_repair(self) -> None:
+        """模型输出不是合法JSON，但在本地修复成功（省去一次重新请求）"""
+        self.totals.local_repairs += 1
+
+    def record_requery(self) -> None:
+        """本地修复失败，需要重新请求模型"""
+        self.totals.requeries += 1
+
+    def snapshot(self) -> LLMMetrics:
+        return self.totals.model_copy(update={"recent": list(self._recent)})
+
+llm_metrics = LLMMetricsRecorder()
@@ -0,0 +1,284 @@
+from collections import deque
+from typing import Awaitable, Callable, Deque, List, Optional, Set, TypeVar
+import asyncio
+import json
+import logging
+import random
+import time
+
+from ..models.schemas import ModelEndpointStatus
+from ..config import settings
+
+# openai为可选依赖，未安装时不创建任何服务
+try:
+    from openai import AsyncOpenAI
+    from openai import APIError, BadRequestError, UnprocessableEntityError, RateLimitError
+    OPENAI_AVAILABLE = True
+    # 请求本身有问题（换服务也会失败），不切换服务也不计入服务的失败次数
+    REQUEST_ERRORS = (BadRequestError, UnprocessableEntityError)
+    # 其余API错误（限流、认证、5xx、网络、超时）视为服务故障，立即切换到下一个服务
+    FAILOVER_ERRORS = (APIError,)
+except ImportError:
+    OPENAI_AVAILABLE = False
+    REQUEST_ERRORS = ()
+    FAILOVER_ERRORS = ()
+
+# 设置日志
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# 计算p95使用的最近延迟样本数
+LATENCY_WINDOW = 50
+# 延迟样本少于该数量时不计算p95，也不发送对冲请求
+HEDGE_MIN_SAMPLES = 5
+# 延迟指数移动平均的平滑系数
+EWMA_ALPHA = 0.3
+# 连续失败时暂停时间最多为基础值的倍数
+MAX_COOLDOWN_FACTOR = 10
+
+T = TypeVar("T")
+
+class ModelEndpoint:
+    """一个模型服务（base_url + 模型），记录延迟和失败情况"""
+
+    def __init__(self, name: str, model: str, base_url: Optional[str] = None,
+                 api_key: Optional[str] = None, weight: float = 1.0):
+        self.name = name
+        self.model = model
+        self.base_url = base_url
+        self.api_key = api_key
+        self.weight = max(weight, 0.0)
+        self.latencies: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+        self.ewma_ms: Optional[float] = None
+        self.consecutive_failures = 0
+        self.cooldown_until = 0.0
+        self.requests = 0
+        self.failures = 0
+        self.hedges = 0
+        self.last_error: Optional[str] = None
+        self._client = None
+
+    @property
+    def client(self) -> "AsyncOpenAI":
+        """异步客户端（首次使用时创建）；关闭SDK自带的重试，由路由器切换服务"""
+        if self._client is None:
+            self._client = AsyncOpenAI(
+                api_key=self.api_key,
+                base_url=self.base_url,
+                timeout=settings.MODEL_REQUEST_TIMEOUT,
+                max_retries=0
+            )
+        return self._client
+
+    def available(self, now: float) -> bool:
+        return now >= self.cooldown_until
+
+    def p95_ms(self) -> Optional[float]:
+        if len(self.latencies) < HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+    def _observe(self, latency_ms: float) -> None:
+        self.ewma_ms = latency_ms if self.ewma_ms is None else EWMA_ALPHA * latency_ms + (1 - EWMA_ALPHA) * self.ewma_ms
+
+    def record_success(self, latency_ms: float) -> None:
+        self.latencies.append(latency_ms)
+        self._observe(latency_ms)
+        self.consecutive_failures = 0
+        self.cooldown_until = 0.0
+
+    def record_abandoned(self, elapsed_ms: float) -> None:
+        """请求因对冲请求先返回而被取消：实际延迟至少为elapsed_ms，只在更慢时计入平均延迟"""
+        if self.ewma_ms is None or elapsed_ms > self.ewma_ms:
+            self._observe(elapsed_ms)
+
+    def record_failure(self, error: Exception) -> None:
+        self.failures += 1
+        self.consecutive_failures += 1
+        self.last_error = f"{type(error).__name__}: {error}"[:500]
+        cooldown = settings.MODEL_FAILURE_COOLDOWN * min(2 ** (self.consecutive_failures - 1), MAX_COOLDOWN_FACTOR)
+        retry_after = _retry_after(error)
+        if retry_after is not None:
+            cooldown = retry_after
+        self.cooldown_until = time.monotonic() + cooldown
+
+    def status(self) -> ModelEndpointStatus:
+        p95 = self.p95_ms()
+        return ModelEndpointStatus(
+            name=self.name,
+            model=self.model,
+            base_url=self.base_url,
+            weight=self.weight,
+            available=self.available(time.monotonic()),
+            cooldown_seconds=round(max(0.0, self.cooldown_until - time.monotonic()), 1),
+            ewma_latency_ms=round(self.ewma_ms, 1) if self.ewma_ms is not None else None,
+            p95_latency_ms=round(p95, 1) if p95 is not None else None,
+            requests=self.requests,
+            failures=self.failures,
+            consecutive_failures=self.consecutive_failures,
+            hedges=self.hedges,
+            last_error=self.last_error
+        )
+
+def _retry_after(error: Exception) -> Optional[float]:
+    """限流错误携带的Retry-After秒数"""
+    if not isinstance(error, RateLimitError):
+        return None
+    try:
+        return float(error.response.headers.get("retry-after"))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+def load_endpoints() -> List[ModelEndpoint]:
+    """根据配置创建模型服务列表：MODEL_ENDPOINTS为空时使用MODEL_BASE_URL/MODEL_NAME单个服务"""
+    if not settings.MODEL_ENDPOINTS.strip():
+        if not settings.MODEL_API_KEY:
+            return []
+        return [ModelEndpoint("default", settings.MODEL_NAME, settings.MODEL_BASE_URL, settings.MODEL_API_KEY)]
+
+    try:
+        items = json.loads(settings.MODEL_ENDPOINTS)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"MODEL_ENDPOINTS不是合法的JSON: {e}")
+    if not isinstance(items, list):
+        raise ValueError("MODEL_ENDPOINTS必须是JSON数组")
+    endpoints = []
+    for i, item in enumerate(items):
+        if not isinstance(item, dict):
+            raise ValueError(f"MODEL_ENDPOINTS第{i + 1}项必须是对象")
+        endpoints.append(ModelEndpoint(
+            name=str(item.get("name") or f"endpoint-{i + 1}"),
+            model=item.get("model") or settings.MODEL_NAME,
+            base_url=item.get("base_url") or settings.MODEL_BASE_URL,
+            api_key=item.get("api_key") or settings.MODEL_API_KEY,
+            weight=float(item.get("weight", 1.0))
+        ))
+    return endpoints
+
+class ModelRouter:
+    """在多个模型服务之间分配请求
+
+    每次请求按 权重/平均延迟 加权随机选择一个可用服务（还没有延迟数据的服务按已知
+    服务的平均延迟估计，保证新服务也能被选到）。服务返回限流、5xx、网络错误等故障时
+    立即换下一个服务重发，出错的服务暂停一段时间（限流时按Retry-After）；所有服务都
+    失败才把最后一个错误抛给调用方。开启MODEL_HEDGE时，请求超过该服务近期p95延迟
+    仍未返回，会向另一个服务发送对冲请求，取先成功的结果并取消另一个。
+    """
+
+    def __init__(self, endpoints: List[ModelEndpoint]):
+        self.endpoints = endpoints
+
+    def _score(self, endpoint: ModelEndpoint, default_ms: float) -> float:
+        return endpoint.weight / max(endpoint.ewma_ms if endpoint.ewma_ms is not None else default_ms, 1.0)
+
+    def pick(self, exclude: Set[str]) -> Optional[ModelEndpoint]:
+        """选择一个未尝试过的服务；可用服务都已尝试时选最早恢复的暂停服务"""
+        candidates = [endpoint for endpoint in self.endpoints if endpoint.name not in exclude]
+        if not candidates:
+            return None
+        now = time.monotonic()
+        available = [endpoint for endpoint in candidates if endpoint.available(now) and endpoint.weight > 0]
+        if not available:
+            return min(candidates, key=lambda endpoint: endpoint.cooldown_until)
+        known = [endpoint.ewma_ms for endpoint in self.endpoints if endpoint.ewma_ms is not None]
+        default_ms = sum(known) / len(known) if known else 1.0
+        return random.choices(available, weights=[self._score(endpoint, default_ms) for endpoint in available])[0]
+
+    def hedge_delay(self, endpoint: ModelEndpoint) -> Optional[float]:
+        """发送对冲请求前等待的秒数，不对冲时返回None"""
+        if not settings.MODEL_HEDGE or len(self.endpoints) < 2:
+            return None
+        p95 = endpoint.p95_ms()
+        if p95 is None:
+            return None
+        return max(p95, settings.MODEL_HEDGE_MIN_MS) / 1000
+
+    async def complete(self, call: Callable[[ModelEndpoint], Awaitable[T]]) -> T:
+        """用选中的服务执行call(endpoint)，服务故障时切换到其他服务"""
+        if not self.endpoints:
+            raise ValueError("未配置模型服务")
+        tried: Set[str] = set()
+        last_error: Optional[Exception] = None
+        while True:
+            endpoint = self.pick(tried)
+            if endpoint is None:
+                raise last_error
+            tried.add(endpoint.name)
+            try:
+                return await self._hedged(call, endpoint, tried)
+            except REQUEST_ERRORS:
+                # 请求本身有问题（BadRequestError等也是APIError的子类），换服务重发也会失败
+                raise
+            except FAILOVER_ERRORS as e:
+                last_error = e
+                logger.warning(f"模型服务 {endpoint.name} 请求失败，切换到其他服务: {type(e).__name__}: {e}")
+
+    async def _attempt(self, call: Callable[[ModelEndpoint], Awaitable[T]], endpoint: ModelEndpoint) -> T:
+        endpoint.requests += 1
+        started = time.perf_counter()
+        try:
+            result = await call(endpoint)
+        except asyncio.CancelledError:
+            endpoint.record_abandoned((time.perf_counter() - started) * 1000)
+            raise
+        except REQUEST_ERRORS:
+            raise
+        except FAILOVER_ERRORS as e:
+            endpoint.record_failure(e)
+            raise
+        endpoint.record_success((time.perf_counter() - started) * 1000)
+        return result
+
+    async def _hedged(self, call: Callable[[ModelEndpoint], Awaitable[T]], primary: ModelEndpoint, tried: Set[str]) -> T:
+        delay = self.hedge_delay(primary)
+        if delay is None:
+            return await self._attempt(call, primary)
+
+        tasks = [asyncio.create_task(self._attempt(call, primary))]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done:
+                backup = self.pick(tried)
+                if backup is not None and backup.available(time.monotonic()):
+                    tried.add(backup.name)
+                    backup.hedges += 1
+                    logger.info(f"模型服务 {primary.name} 超过 {delay * 1000:.0f}ms 未返回，向 {backup.name} 发送对冲请求")
+                    tasks.append(asyncio.create_task(self._attempt(call, backup)))
+
+            # 取第一个成功的结果；请求本身有问题时立即抛出，不再等待另一个请求；全部失败时抛出最后一个错误
+            pending = set(tasks)
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+                    if isinstance(error, REQUEST_ERRORS):
+                        raise error
+            raise error
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    def status(self) -> List[ModelEndpointStatus]:
+        return [endpoint.status() for endpoint in self.endpoints]
+
+    async def aclose(self) -> None:
+        """关闭各服务的客户端连接（替换路由器前调用，不要依赖垃圾回收关闭连接池）"""
+        for endpoint in self.endpoints:
+            if endpoint._client is not None:
+                await endpoint._client.close()
+                endpoint._client = None
+
+# 进程内共享的路由器（保留各服务的延迟和失败统计）
+_router: Optional[ModelRouter] = None
+
+def get_model_router() -> ModelRouter:
+    """获取模型路由器（首次调用时按配置创建服务列表；未安装openai时为空）"""
+    global _router
+    if _router is None:
+        _router = ModelRouter(load_endpoints() if OPENAI_AVAILABLE else [])
+    return _router
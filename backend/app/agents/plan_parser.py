@@ -1,132 +1,49 @@
-from typing import List, Dict, Any, Optional
-import re
+from typing import List, Dict, Any, Optional, Tuple
+import time
+import asyncio
 import logging
 import json
-from datetime import datetime
-from tenacity import retry, stop_after_attempt, wait_random_exponential
+from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_random_exponential
 
-from ..models.schemas import Plan, Task, Comment, TaskStatus, CommentType
+from ..models.schemas import Plan, Task, Comment, TaskStatus, CommentType, LLMCallRecord
 from ..config import settings
+from ..utils.tokens import count_message_tokens, compact_whitespace
+from ..utils.json_repair import repair_json
+from .llm_metrics import llm_metrics
+from .model_router import ModelEndpoint, get_model_router
 
 # 尝试导入OpenAI支持，如果不可用则使用模拟解析器
 try:
-    from openai import OpenAI
-    from openai import BadRequestError, RateLimitError, APIError
+    from openai import BadRequestError, RateLimitError, APIConnectionError, APITimeoutError, InternalServerError
     OPENAI_AVAILABLE = True
+    # 可以原样重发的临时错误（限流、网络、服务端5xx）；所有服务都失败后才退避重试
+    TRANSIENT_ERRORS = (RateLimitError, APIConnectionError, APITimeoutError, InternalServerError)
 except ImportError:
     OPENAI_AVAILABLE = False
+    TRANSIENT_ERRORS = ()
 
 # 设置日志
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-class PlanParserAgent:
-    """计划解析代理，将文本计划转换为结构化JSON"""
-    
-    def __init__(self):
-        """初始化解析代理"""
-        self.openai_client = None
-        if OPENAI_AVAILABLE and settings.MODEL_API_KEY:
-            try:
-                self.openai_client = OpenAI(
-                    api_key=settings.MODEL_API_KEY,
-                    base_url=settings.MODEL_BASE_URL
-                )
-                logger.info("OpenAI 客户端初始化成功")
-            except Exception as e:
-                logger.error(f"OpenAI 客户端初始化失败: {e}")
-        
-    @retry(
-        stop=stop_after_attempt(3),
-        wait=wait_random_exponential(min=1, max=10),
-        reraise=True
-    )
-    async def _call_openai(self, text: str, name: Optional[str] = None) -> Dict[str, Any]:
-        """调用OpenAI API解析计划文本"""
-        if not self.openai_client:
-            raise ValueError("OpenAI客户端未配置")
-        
-        # 构建提示
-        prompt = self._build_prompt(text, name)
-        
-        # 最大重试次数
-        max_json_retries = 3
-        current_retry = 0
-        
-        while current_retry < max_json_retries:
-            try:
-                # 调用API
-                logger.info(f"使用模型 {settings.MODEL_NAME} 解析计划文本 (JSON解析尝试 {current_retry + 1}/{max_json_retries})")
-                response = self.openai_client.chat.completions.create(
-                    model=settings.MODEL_NAME,
-                    messages=[
-                        {"role": "system", "content": "你是一个专业的项目计划解析助手，能够将自然语言描述的项目计划转换为结构化的JSON格式。你擅长识别任务、注意事项和任务之间的依赖关系。"},
-                        {"role": "user", "content": prompt}
-                    ],
-                    temperature=0.2,
-                    response_format={"type": "json_object"}
-                )
-                
-                logger.info("OpenAI 响应已收到")
-                
-                # 提取JSON
-                content = response.choices[0].message.content
-                try:
-                    return json.loads(content)
-                except json.JSONDecodeError:
-                    # 尝试从文本中提取JSON部分
-                    match = re.search(r'```json\s*(.*?)\s*```', content, re.DOTALL)
-                    if match:
-                        try:
-                            return json.loads(match.group(1))
-                        except json.JSONDecodeError:
-                            pass
-                    
-                    # 如果还是失败，尝试提取花括号内容
-                    match = re.search(r'\{.*\}', content, re.DOTALL)
-                    if match:
-                        try:
-                            return json.loads(match.group(0))
-                        except json.JSONDecodeError:
-                            pass
-                    
-                    # 如果所有解析尝试都失败，增加重试计数
-                    current_retry += 1
-                    if current_retry >= max_json_retries:
-                        raise ValueError(f"多次尝试后仍无法解析OpenAI返回的内容为JSON: {content}")
-                    
-                    logger.warning(f"JSON解析失败，尝试第 {current_retry + 1} 次调用API，强调返回有效JSON")
-                    # 对提示进行增强，强调需要有效的JSON
-                    prompt += "\n\nIMPORTANT: Your previous response could not be parsed as valid JSON. Please ensure you return ONLY a valid JSON object with no additional text or formatting."
-            
-            except (BadRequestError, RateLimitError, APIError) as e:
-                logger.error(f"OpenAI API错误: {e}")
-                raise
-        
-    def _build_prompt(self, text: str, name: Optional[str] = None) -> str:
-        """构建提示，指导AI如何解析计划"""
-        plan_name_hint = f"with the name: {name}" if name else "inferring an appropriate name from the content"
-        
-        return f"""
-You are a professional Project Planning Assistant. Your task is to convert a natural language project plan description into a structured JSON format.
+# 模型输出无法解析为JSON时最多请求几次（包括第一次）
+MAX_JSON_ATTEMPTS = 2
+# 未设置MODEL_MAX_OUTPUT_TOKENS时为输出预留的token数
+DEFAULT_OUTPUT_RESERVE = 4096
 
-# INPUT
-The following is a project plan text {plan_name_hint}:
-
-```
-{text}
-```
+# 固定的解析指令放在system消息中，每次调用都完全相同，便于服务端复用提示缓存
+SYSTEM_PROMPT = """You are a professional Project Planning Assistant. Your task is to convert a natural language project plan description into a structured JSON format. You are good at identifying tasks, notes and the dependencies between tasks.
 
 # OUTPUT REQUIREMENTS
-Parse this text into a structured JSON format that follows these specifications exactly:
+Parse the text into a structured JSON format that follows these specifications exactly:
 
 ```json
-{{
+{
   "name": "Plan name - use the provided name or infer from content",
   "description": "Overall plan description or objective",
   "notes": ["Important note 1", "Important note 2", ...],
   "tasks": [
-    {{
+    {
       "title": "Task title - clear and concise",
       "description": "Detailed task description",
       "status": "Task status (Pending, Working, Pending For Review, Complete, Need Fixed)",
@@ -135,10 +52,10 @@ Parse this text into a structured JSON format that follows these specifications
       "comments": [
         "important details about the task, such as links user provided, path user provided, etc."
       ]
-    }},
+    },
     ...more tasks...
   ]
-}}
+}
 ```
 
 # PARSING RULES
@@ -161,8 +78,367 @@ Before submitting:
 3. Check that dependencies are correctly identified
 4. Ensure the response is valid JSON
 
-Return ONLY the JSON object without any additional text, explanations, or markdown formatting.
-"""
+Return ONLY the JSON object without any additional text, explanations, or markdown formatting."""
+
+# 输入超出token预算时使用的精简指令
+COMPACT_SYSTEM_PROMPT = """Convert the project plan text into JSON: {"name": str, "description": str, "notes": [str], "tasks": [{"title": str, "description": str, "status": "Pending"|"Working"|"Pending For Review"|"Complete"|"Need Fixed", "order": int, "dependencies": [titles of prerequisite tasks], "comments": [links, paths and other details]}]}.
+Extract ALL tasks, add nothing that is not in the text, default status is Pending, keep the input language. Return ONLY the JSON object."""
+
+# JSON解析失败后重新请求时附加的固定提醒（不累加）
+JSON_REMINDER = "Your previous response could not be parsed as valid JSON. Return ONLY a valid JSON object with no additional text or formatting."
+
+# 结构化输出（json_schema）使用的计划结构
+PLAN_JSON_SCHEMA = {
+    "name": "plan",
+    "strict": True,
+    "schema": {
+        "type": "object",
+        "properties": {
+            "name": {"type": "string"},
+            "description": {"type": "string"},
+            "notes": {"type": "array", "items": {"type": "string"}},
+            "tasks": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "title": {"type": "string"},
+                        "description": {"type": "string"},
+                        "status": {"type": "string", "enum": [status.value for status in TaskStatus]},
+                        "order": {"type": ["integer", "null"]},
+                        "dependencies": {"type": "array", "items": {"type": "string"}},
+                        "comments": {"type": "array", "items": {"type": "string"}}
+                    },
+                    "required": ["title", "description", "status", "order", "dependencies", "comments"],
+                    "additionalProperties": False
+                }
+            }
+        },
+        "required": ["name", "description", "notes", "tasks"],
+        "additionalProperties": False
+    }
+}
+
+# 各服务端是否支持json_schema结构化输出，按(base_url, 模型)记录，不支持时退回json_object
+_structured_output_support: Dict[Tuple[Optional[str], str], bool] = {}
+
+def _rejects_structured_output(error: Exception) -> bool:
+    """400错误是否因为服务端不支持json_schema结构化输出（而不是上下文过长、其他参数无效等）"""
+    param = getattr(error, "param", None) or ""
+    if param.startswith("response_format"):
+        return True
+    message = str(getattr(error, "message", None) or error).lower()
+    return "response_format" in message or "json_schema" in message
+
+class PlanParserAgent:
+    """计划解析代理，将文本计划转换为结构化JSON"""
+    
+    def __init__(self):
+        """初始化解析代理"""
+        self.router = None
+        if OPENAI_AVAILABLE:
+            try:
+                router = get_model_router()
+                if router.endpoints:
+                    self.router = router
+                    logger.info(f"OpenAI 客户端初始化成功: {', '.join(endpoint.name for endpoint in router.endpoints)}")
+            except Exception as e:
+                logger.error(f"OpenAI 客户端初始化失败: {e}")
+        
+    async def _call_openai(self, text: str, name: Optional[str] = None, excerpt: bool = False) -> Dict[str, Any]:
+        """调用OpenAI API解析计划文本（excerpt为True时文本是计划中被修改的部分）
+
+        模型输出无法解析时先在本地修复，修复失败才重新请求；重新请求使用原始消息加一条
+        固定提醒，提示长度不会随重试增长。
+        """
+        if not self.router:
+            raise ValueError("OpenAI客户端未配置")
+        
+        # 构建消息（发送前统计token并按预算压缩）
+        messages, estimated_tokens = self._build_messages(text, name, excerpt)
+        
+        content = ""
+        for attempt in range(1, MAX_JSON_ATTEMPTS + 1):
+            logger.info(f"使用模型解析计划文本 (尝试 {attempt}/{MAX_JSON_ATTEMPTS}，约 {estimated_tokens} 个输入token)")
+            request_messages = messages if attempt == 1 else messages + [{"role": "user", "content": JSON_REMINDER}]
+            content = await self._complete(request_messages, estimated_tokens, attempt)
+            
+            plan_data = self._parse_json(content)
+            if plan_data is not None:
+                return plan_data
+            
+            if attempt < MAX_JSON_ATTEMPTS:
+                llm_metrics.record_requery()
+                logger.warning("模型输出无法解析为JSON且本地修复失败，重新请求")
+        
+        raise ValueError(f"多次尝试后仍无法解析OpenAI返回的内容为JSON: {content[:500]}")
+    
+    @retry(
+        stop=stop_after_attempt(3),
+        wait=wait_random_exponential(min=1, max=10),
+        retry=retry_if_exception_type(TRANSIENT_ERRORS),
+        reraise=True
+    )
+    async def _complete(self, messages: List[Dict[str, str]], estimated_tokens: int, attempt: int) -> str:
+        """通过路由器发送请求：服务故障时立即切换到其他服务，所有服务都出现临时错误才退避重试"""
+        return await self.router.complete(lambda endpoint: self._request(endpoint, messages, estimated_tokens, attempt))
+    
+    async def _request(self, endpoint: ModelEndpoint, messages: List[Dict[str, str]], estimated_tokens: int, attempt: int) -> str:
+        """向一个模型服务发送一次请求并记录token、响应大小和延迟"""
+        response_format = self._response_format(endpoint)
+        record = LLMCallRecord(
+            model=endpoint.model,
+            endpoint=endpoint.name,
+            attempt=attempt,
+            response_format=response_format["type"],
+            estimated_prompt_tokens=estimated_tokens
+        )
+        request = {
+            "model": endpoint.model,
+            "messages": messages,
+            "temperature": 0.2,
+            "response_format": response_format
+        }
+        if settings.MODEL_MAX_OUTPUT_TOKENS:
+            request["max_tokens"] = settings.MODEL_MAX_OUTPUT_TOKENS
+        
+        started = time.perf_counter()
+        try:
+            response = await endpoint.client.chat.completions.create(**request)
+        except asyncio.CancelledError:
+            # 对冲请求中较慢的一个被取消
+            record.latency_ms = (time.perf_counter() - started) * 1000
+            record.outcome = "cancelled"
+            llm_metrics.record(record)
+            raise
+        except Exception as e:
+            record.latency_ms = (time.perf_counter() - started) * 1000
+            record.outcome = "error"
+            record.error = f"{type(e).__name__}: {e}"[:500]
+            llm_metrics.record(record)
+            if (
+                isinstance(e, BadRequestError) and _rejects_structured_output(e)
+                and response_format["type"] == "json_schema" and settings.MODEL_STRUCTURED_OUTPUT == "auto"
+            ):
+                # 服务端不支持结构化输出，记住后退回json_object模式
+                logger.warning(f"模型服务不支持json_schema结构化输出，改用json_object: {e}")
+                _structured_output_support[self._endpoint_key(endpoint)] = False
+                return await self._request(endpoint, messages, estimated_tokens, attempt)
+            logger.error(f"OpenAI API错误 ({endpoint.name}): {e}")
+            raise
+        
+        record.latency_ms = (time.perf_counter() - started) * 1000
+        choice = response.choices[0]
+        content = choice.message.content or ""
+        record.finish_reason = choice.finish_reason
+        record.response_bytes = len(content.encode("utf-8"))
+        if response.usage is not None:
+            record.prompt_tokens = response.usage.prompt_tokens
+            record.completion_tokens = response.usage.completion_tokens
+        llm_metrics.record(record)
+        if response_format["type"] == "json_schema":
+            _structured_output_support[self._endpoint_key(endpoint)] = True
+        
+        logger.info(
+            f"OpenAI 响应已收到 ({endpoint.name}): {record.latency_ms:.0f}ms, {record.response_bytes} 字节, "
+            f"token {record.prompt_tokens}/{record.completion_tokens}, finish_reason={record.finish_reason}"
+        )
+        if choice.finish_reason == "length":
+            logger.warning("模型输出因达到最大token数被截断")
+        return content
+    
+    def _endpoint_key(self, endpoint: ModelEndpoint) -> Tuple[Optional[str], str]:
+        return (endpoint.base_url, endpoint.model)
+    
+    def _response_format(self, endpoint: ModelEndpoint) -> Dict[str, Any]:
+        """选择输出格式：优先json_schema结构化输出，服务端不支持时使用json_object"""
+        mode = settings.MODEL_STRUCTURED_OUTPUT
+        if mode == "json_schema" or (mode == "auto" and _structured_output_support.get(self._endpoint_key(endpoint), True)):
+            return {"type": "json_schema", "json_schema": PLAN_JSON_SCHEMA}
+        return {"type": "json_object"}
+    
+    def _parse_json(self, content: str) -> Optional[Dict[str, Any]]:
+        """解析模型输出，失败时先在本地修复（截断、尾随逗号、未加引号的键等），仍失败返回None"""
+        try:
+            data = json.loads(content)
+        except json.JSONDecodeError:
+            data = repair_json(content)
+            if data is not None:
+                llm_metrics.record_local_repair()
+                logger.info("模型输出不是合法JSON，已在本地修复")
+        return self._salvage_plan_data(data)
+    
+    def _salvage_plan_data(self, data: Any) -> Optional[Dict[str, Any]]:
+        """按计划结构校验并清理解析结果，丢弃无法使用的任务而不是整体失败
+
+        兼容外层多包一层对象（如{"plan": {...}}）或直接返回任务列表的情况；
+        没有任何计划字段时返回None。
+        """
+        if isinstance(data, list):
+            data = {"tasks": data}
+        if isinstance(data, dict) and "tasks" not in data and len(data) == 1:
+            inner = next(iter(data.values()))
+            if isinstance(inner, dict):
+                data = inner
+        if not isinstance(data, dict) or not ({"name", "description", "notes", "tasks"} & set(data)):
+            return None
+        
+        def as_text(value: Any) -> str:
+            if value is None:
+                return ""
+            if isinstance(value, dict):
+                value = value.get("content") or value.get("title") or json.dumps(value, ensure_ascii=False)
+            return str(value)
+        
+        def as_text_list(value: Any) -> List[str]:
+            if value is None:
+                return []
+            if not isinstance(value, list):
+                value = [value]
+            return [text for text in (as_text(item) for item in value) if text]
+        
+        tasks = []
+        raw_tasks = data.get("tasks")
+        for task_data in raw_tasks if isinstance(raw_tasks, list) else []:
+            if isinstance(task_data, str):
+                task_data = {"title": task_data}
+            if not isinstance(task_data, dict) or not as_text(task_data.get("title")).strip():
+                continue
+            try:
+                order = int(task_data["order"]) if task_data.get("order") is not None else None
+            except (TypeError, ValueError):
+                order = None
+            task = {
+                "title": as_text(task_data["title"]).strip(),
+                "description": as_text(task_data.get("description")),
+                "order": order,
+                "dependencies": as_text_list(task_data.get("dependencies")),
+                "comments": as_text_list(task_data.get("comments"))
+            }
+            if isinstance(task_data.get("status"), str):
+                task["status"] = task_data["status"]
+            tasks.append(task)
+        
+        dropped = len(raw_tasks) - len(tasks) if isinstance(raw_tasks, list) else 0
+        if dropped:
+            logger.warning(f"丢弃了 {dropped} 个结构无效的任务")
+        
+        salvaged = {
+            "description": as_text(data.get("description")),
+            "notes": as_text_list(data.get("notes")),
+            "tasks": tasks
+        }
+        if as_text(data.get("name")).strip():
+            salvaged["name"] = as_text(data["name"]).strip()
+        return salvaged
+    
+    def _build_messages(self, text: str, name: Optional[str] = None, excerpt: bool = False) -> Tuple[List[Dict[str, str]], int]:
+        """构建消息并控制输入token预算，返回(消息, 估算的输入token数)
+
+        依次尝试：完整指令+原文、完整指令+压缩空白后的原文、精简指令+压缩空白后的原文；
+        仍超出预算时抛出ValueError（不截断原文，避免静默丢失任务）。
+        """
+        budget = settings.MODEL_CONTEXT_TOKENS - (settings.MODEL_MAX_OUTPUT_TOKENS or DEFAULT_OUTPUT_RESERVE)
+        compacted = compact_whitespace(text)
+        tokens = 0
+        for system_prompt, body in ((SYSTEM_PROMPT, text), (SYSTEM_PROMPT, compacted), (COMPACT_SYSTEM_PROMPT, compacted)):
+            messages = [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": self._build_prompt(body, name, excerpt)}
+            ]
+            tokens = count_message_tokens(messages, settings.MODEL_NAME)
+            if tokens <= budget:
+                if body is not text:
+                    logger.info(f"提示超出token预算 {budget}，已压缩为约 {tokens} 个token")
+                return messages, tokens
+        raise ValueError(f"计划文本过长：压缩后仍需约 {tokens} 个token，超过输入预算 {budget}")
+        
+    def _build_prompt(self, text: str, name: Optional[str] = None, excerpt: bool = False) -> str:
+        """构建用户消息（只包含计划名称提示和原文，解析指令在system消息中）"""
+        plan_name_hint = f"with the name: {name}" if name else "inferring an appropriate name from the content"
+        if excerpt:
+            # 只发送修改过的段落，system消息保持不变以复用提示缓存
+            return f"""The following is an excerpt (the edited sections) of a project plan text {plan_name_hint}. Extract only the tasks and notes in this excerpt:
+
+```
+{text}
+```"""
+        
+        return f"""The following is a project plan text {plan_name_hint}:
+
+```
+{text}
+```"""
+        
+    def _build_task(self, task_data: Dict[str, Any]) -> Task:
+        """把模型返回的任务数据转换为Task对象"""
+        # 默认所有任务为Pending状态
+        status = TaskStatus.PENDING
+        if "status" in task_data:
+            status_str = task_data["status"]
+            try:
+                status = TaskStatus(status_str)
+            except ValueError:
+                # 尝试匹配最相似的状态
+                status_map = {
+                    "pending": TaskStatus.PENDING,
+                    "working": TaskStatus.WORKING,
+                    "review": TaskStatus.PENDING_REVIEW,
+                    "complete": TaskStatus.COMPLETE,
+                    "fixed": TaskStatus.NEED_FIXED
+                }
+                for key, value in status_map.items():
+                    if key in status_str.lower():
+                        status = value
+                        break
+        
+        comments = []
+        temps= task_data.get("comments", [])
+        for temp in temps:
+            comments.append(Comment(
+                content=temp,
+                type=CommentType.SUGGESTION
+            ))
+        return Task(
+            title=task_data.get("title", "未命名任务"),
+            description=task_data.get("description", ""),
+            status=status,
+            order=task_data.get("order"),
+            dependencies=task_data.get("dependencies", []),
+            comments = comments
+        )
+    
+    async def parse_excerpt(self, text: str, name: Optional[str] = None) -> Tuple[List[Task], List[str]]:
+        """解析计划中被修改的部分，返回(任务, 注意事项)
+
+        与parse_text_to_plan不同，解析失败时直接抛出异常，调用方据此放弃合并。
+        """
+        plan_data = await self._call_openai(text, name, excerpt=True)
+        task_list = plan_data.get("tasks")
+        tasks = [self._build_task(task_data) for task_data in task_list] if isinstance(task_list, list) else []
+        return tasks, plan_data.get("notes", [])
+        
+    async def build_plan(self, text: str, name: Optional[str] = None) -> Plan:
+        """调用模型把文本解析为Plan对象，未配置模型或解析失败时抛出异常（后台解析任务据此标记失败）"""
+        logger.info("尝试使用OpenAI解析计划文本")
+        plan_data = await self._call_openai(text, name)
+        logger.info(f"OpenAI解析成功: {list(plan_data.keys())}")
+        
+        # 创建Plan对象（保存原文，修改文本后可以只重新解析变化的部分）
+        plan = Plan(
+            name=plan_data.get("name", name or "未命名计划"),
+            description=plan_data.get("description", ""),
+            notes=plan_data.get("notes", []),
+            tasks=[],
+            source_text=text
+        )
+        
+        # 处理任务
+        if "tasks" in plan_data and isinstance(plan_data["tasks"], list):
+            for task_data in plan_data["tasks"]:
+                plan.tasks.append(self._build_task(task_data))
+        
+        return plan
         
     async def parse_text_to_plan(self, text: str, name: Optional[str] = None) -> Plan:
         """
@@ -173,74 +449,10 @@ Return ONLY the JSON object without any additional text, explanations, or markdo
             name: 可选的计划名称
             
         Returns:
-            Plan: 结构化的计划对象
+            Plan: 结构化的计划对象（解析失败时返回说明失败原因的空计划）
         """
         try:
-            plan_data = None
-            
-            # 尝试使用OpenAI解析
-            if self.openai_client:
-                try:
-                    logger.info("尝试使用OpenAI解析计划文本")
-                    plan_data = await self._call_openai(text, name)
-                    logger.info(f"OpenAI解析成功: {list(plan_data.keys())}")
-                except Exception as e:
-                    logger.warning(f"OpenAI解析失败，使用后备方法: {e}", exc_info=True)
-                    raise e
-            else:
-                # 使用后备解析方法
-                logger.info("OpenAI客户端未配置，使用后备解析方法")
-                raise e
-            
-            # 创建Plan对象
-            plan = Plan(
-                name=plan_data.get("name", name or "未命名计划"),
-                description=plan_data.get("description", ""),
-                notes=plan_data.get("notes", []),
-                tasks=[]
-            )
-            
-            # 处理任务
-            if "tasks" in plan_data and isinstance(plan_data["tasks"], list):
-                for task_data in plan_data["tasks"]:
-                    # 默认所有任务为Pending状态
-                    status = TaskStatus.PENDING
-                    if "status" in task_data:
-                        status_str = task_data["status"]
-                        try:
-                            status = TaskStatus(status_str)
-                        except ValueError:
-                            # 尝试匹配最相似的状态
-                            status_map = {
-                                "pending": TaskStatus.PENDING,
-                                "working": TaskStatus.WORKING,
-                                "review": TaskStatus.PENDING_REVIEW,
-                                "complete": TaskStatus.COMPLETE,
-                                "fixed": TaskStatus.NEED_FIXED
-                            }
-                            for key, value in status_map.items():
-                                if key in status_str.lower():
-                                    status = value
-                                    break
-                    
-                    comments = []
-                    temps= task_data.get("comments", [])
-                    for temp in temps:
-                        comments.append(Comment(
-                            content=temp,
-                            type=CommentType.SUGGESTION
-                        ))
-                    task = Task(
-                        title=task_data.get("title", "未命名任务"),
-                        description=task_data.get("description", ""),
-                        status=status,
-                        order=task_data.get("order"),
-                        dependencies=task_data.get("dependencies", []),
-                        comments = comments
-                    )
-                    plan.tasks.append(task)
-            
-            return plan
+            return await self.build_plan(text, name)
         
         except Exception as e:
             logger.error(f"解析计划文本失败: {e}", exc_info=True)
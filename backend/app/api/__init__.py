@@ -1,8 +1,20 @@
 from fastapi import APIRouter
 from .plans import router as plans_router
+from .admin import router as admin_router
+from .jobs import router as jobs_router
+from .templates import router as templates_router
+from .health import router as health_router
+from .workspaces import router as workspaces_router
+from .dashboard import router as dashboard_router
 
 # 创建主路由
 router = APIRouter()
 
 # 包含子路由
-router.include_router(plans_router) 
\ No newline at end of file
+router.include_router(plans_router)
+router.include_router(jobs_router)
+router.include_router(templates_router)
+router.include_router(workspaces_router)
+router.include_router(dashboard_router)
+router.include_router(admin_router)
+router.include_router(health_router) 
\ No newline at end of file
@@ -0,0 +1,40 @@
+from typing import List
+from fastapi import APIRouter, HTTPException, Query, Request
+
+from ..models.schemas import LLMMetrics, ModelEndpointStatus, AdmissionLaneStatus, IntegrityReport
+from ..agents.llm_metrics import llm_metrics
+from ..services.integrity_service import get_integrity_service
+
+# 创建路由器
+router = APIRouter(prefix="/admin", tags=["admin"])
+
+@router.get("/llm-metrics", response_model=LLMMetrics)
+async def get_llm_metrics():
+    """获取当前进程内的模型调用统计（token、响应字节数、延迟和本地修复/重新请求次数）"""
+    return llm_metrics.snapshot()
+
+@router.get("/model-endpoints", response_model=List[ModelEndpointStatus])
+async def get_model_endpoints():
+    """获取各模型服务的可用状态、延迟（EWMA/p95）、失败和对冲请求次数"""
+    # 在请求时才导入，避免启动时加载openai
+    from ..agents.model_router import get_model_router
+    return get_model_router().status()
+
+@router.get("/admission", response_model=List[AdmissionLaneStatus])
+async def get_admission_status(request: Request):
+    """获取准入控制各通道的并发、排队和拒绝统计（未开启准入控制时返回空列表）"""
+    controller = getattr(request.app.state, "admission", None)
+    return controller.status() if controller is not None else []
+
+@router.get("/integrity", response_model=IntegrityReport)
+async def get_integrity_report():
+    """获取当前工作区最近一次存储完整性检查的结果（后台定期执行，见INTEGRITY_CHECK_INTERVAL）"""
+    report = await get_integrity_service().last_report()
+    if report is None:
+        raise HTTPException(status_code=404, detail="尚未执行过完整性检查")
+    return report
+
+@router.post("/integrity", response_model=IntegrityReport)
+async def run_integrity_check(repair: bool = Query(True, description="是否修复发现的问题，false时只报告")):
+    """立即检查当前工作区的存储，修复或隔离有问题的数据并压缩评论日志"""
+    return await get_integrity_service().check(repair=repair)
@@ -0,0 +1,29 @@
+from fastapi import APIRouter, Depends, Query, Request, Response
+
+from ..models.schemas import Dashboard
+from ..services.plan_service import PlanService
+
+# 创建路由器
+router = APIRouter(prefix="/dashboard", tags=["dashboard"])
+
+# 依赖项：获取PlanService实例
+def get_plan_service() -> PlanService:
+    return PlanService()
+
+@router.get("/", response_model=Dashboard)
+async def get_dashboard(
+    request: Request,
+    response: Response,
+    plans: bool = Query(True, description="是否包含各计划的汇总，false时只返回全局计数和最近变化的任务"),
+    plan_service: PlanService = Depends(get_plan_service)
+):
+    """获取所有计划按状态的任务数、完成百分比、可开始的任务数和最近变化的任务
+
+    汇总随每次修改增量维护，读取时不遍历计划和任务。响应带ETag，轮询时携带If-None-Match，
+    内容没有变化时返回304。
+    """
+    etag = await plan_service.get_dashboard_etag()
+    if etag in [tag.strip() for tag in request.headers.get("if-none-match", "").split(",")]:
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    return await plan_service.get_dashboard(plans)
@@ -0,0 +1,21 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+
+from ..models.schemas import HealthStatus, ReadinessStatus
+from ..services.health_service import warmup_state
+
+# 创建路由器
+router = APIRouter(tags=["health"])
+
+@router.get("/health", response_model=HealthStatus)
+async def health():
+    """存活检查：进程能处理请求即返回200，不访问数据文件"""
+    return warmup_state.health()
+
+@router.get("/ready", response_model=ReadinessStatus, responses={503: {"model": ReadinessStatus}})
+async def ready():
+    """就绪检查：预热（加载计划数据、启动后台任务队列）完成前返回503"""
+    status = warmup_state.readiness()
+    if not status.ready:
+        return JSONResponse(status_code=503, content=status.model_dump())
+    return status
@@ -0,0 +1,52 @@
+from typing import List, Optional
+from fastapi import APIRouter, HTTPException, Depends, Path, Body, Query
+
+from ..models.schemas import Job, JobStatus, TextToPlan
+from ..services.job_service import JobService, get_job_service
+
+# 创建路由器
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+# 依赖项：获取JobService实例
+def get_service() -> JobService:
+    return get_job_service()
+
+@router.post("/parse-plan", response_model=Job, status_code=202)
+async def submit_parse_plan(
+    text_data: TextToPlan = Body(...),
+    job_service: JobService = Depends(get_service)
+):
+    """提交文本转计划的后台任务，立即返回任务ID；解析完成后计划会被设置为当前计划"""
+    return await job_service.submit(text_data)
+
+@router.get("/", response_model=List[Job])
+async def list_jobs(
+    status: Optional[JobStatus] = Query(None, title="任务状态"),
+    limit: int = Query(50, ge=1, le=500, title="返回数量"),
+    job_service: JobService = Depends(get_service)
+):
+    """按创建时间倒序列出后台任务"""
+    return await job_service.list_jobs(status, limit)
+
+@router.get("/{job_id}", response_model=Job)
+async def get_job(
+    job_id: str = Path(..., title="任务ID"),
+    wait: float = Query(0, ge=0, le=60, title="最多等待任务完成的秒数（长轮询）"),
+    job_service: JobService = Depends(get_service)
+):
+    """获取后台任务状态，成功后plan_id为生成的计划ID"""
+    job = await job_service.wait(job_id, wait) if wait else await job_service.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="任务不存在")
+    return job
+
+@router.post("/{job_id}/cancel", response_model=Job)
+async def cancel_job(
+    job_id: str = Path(..., title="任务ID"),
+    job_service: JobService = Depends(get_service)
+):
+    """取消排队中或执行中的任务，已完成的任务保持不变"""
+    job = await job_service.cancel(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="任务不存在")
+    return job
@@ -1,13 +1,19 @@
-from typing import List, Optional
-from fastapi import APIRouter, HTTPException, Depends, Path, Body, Query
+from typing import List, Optional, Tuple
+from fastapi import APIRouter, HTTPException, Depends, Path, Body, Query, Request, Response
+from fastapi.responses import StreamingResponse
 
 from ..models.schemas import (
     Plan, PlanCreate, PlanUpdate, 
-    Task, TaskCreate, TaskUpdate, TaskStatusUpdate,
-    Comment, CommentCreate,
-    TextToPlan, APIResponse
+    Task, TaskCreate, TaskUpdate, TaskStatusUpdate, TaskStatus,
+    TaskClaim, TaskRelease,
+    Comment, CommentCreate, CommentMode,
+    TextToPlan, PlanReparse, PlanReparseResult, APIResponse,
+    PlanRevision, PlanRevisionDiff, ArchivedPlanSummary,
+    ImportConflictPolicy, PlanImportResult, PlanAnalytics, SimilarTask
 )
 from ..services.plan_service import PlanService
+from ..services.transfer_service import TransferService, iter_lines
+from ..services.similarity_service import DuplicateTaskError
 
 # 创建路由器
 router = APIRouter(prefix="/plans", tags=["plans"])
@@ -16,11 +22,21 @@ router = APIRouter(prefix="/plans", tags=["plans"])
 def get_plan_service():
     return PlanService()
 
+# 依赖项：读取计划/任务时附带评论的方式
+def get_comment_options(
+    comments: CommentMode = Query(CommentMode.ALL, title="附带评论的方式（all全部、latest每个任务最新几条、none不带评论）"),
+    comment_limit: int = Query(3, ge=1, le=100, title="comments=latest时每个任务附带的评论数")
+) -> Tuple[CommentMode, int]:
+    return comments, comment_limit
+
 # 计划管理API
 @router.get("/", response_model=List[Plan])
-async def get_all_plans(plan_service: PlanService = Depends(get_plan_service)):
+async def get_all_plans(
+    comment_options: Tuple[CommentMode, int] = Depends(get_comment_options),
+    plan_service: PlanService = Depends(get_plan_service)
+):
     """获取所有计划"""
-    return await plan_service.get_all_plans()
+    return [await plan_service.with_comments(plan, *comment_options) for plan in await plan_service.get_all_plans()]
 
 @router.post("/", response_model=Plan)
 async def create_plan(
@@ -31,12 +47,15 @@ async def create_plan(
     return await plan_service.create_plan(plan_data)
 
 @router.get("/current", response_model=Optional[Plan])
-async def get_current_plan(plan_service: PlanService = Depends(get_plan_service)):
+async def get_current_plan(
+    comment_options: Tuple[CommentMode, int] = Depends(get_comment_options),
+    plan_service: PlanService = Depends(get_plan_service)
+):
     """获取当前正在跟踪的计划"""
     plan = await plan_service.get_current_plan()
     if not plan:
         return None
-    return plan
+    return await plan_service.with_comments(plan, *comment_options)
 
 @router.post("/from-text", response_model=Plan)
 async def create_plan_from_text(
@@ -51,16 +70,101 @@ async def get_next_tasks(plan_service: PlanService = Depends(get_plan_service)):
     """获取下一步应该做的任务"""
     return await plan_service.get_next_tasks()
 
+@router.post("/claim-next", response_model=Optional[Task])
+async def claim_next_task(
+    claim: TaskClaim = Body(...),
+    plan_id: Optional[str] = Query(None, title="计划ID，默认为当前计划"),
+    plan_service: PlanService = Depends(get_plan_service)
+):
+    """认领下一个可执行的任务（置为Working并持有租约），没有可认领任务时返回null"""
+    return await plan_service.claim_next_task(claim, plan_id)
+
+# 批量导出/导入API
+@router.get("/export")
+async def export_plans(
+    include_archived: bool = Query(False, title="是否包含归档计划"),
+    plan_service: PlanService = Depends(get_plan_service)
+):
+    """以NDJSON流导出所有计划（每行一个计划）"""
+    transfer = TransferService(plan_service.store)
+    return StreamingResponse(
+        transfer.export_lines(include_archived),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="plans.ndjson"'}
+    )
+
+@router.post("/import", response_model=PlanImportResult)
+async def import_plans(
+    request: Request,
+    conflict: ImportConflictPolicy = Query(ImportConflictPolicy.SKIP, title="ID冲突时的处理策略"),
+    remap_ids: bool = Query(False, title="是否为导入的计划、任务和评论分配新ID"),
+    batch_size: int = Query(100, ge=1, le=10000, title="每批校验和提交的计划数"),
+    plan_service: PlanService = Depends(get_plan_service)
+):
+    """从NDJSON流导入计划（请求体每行一个计划）"""
+    transfer = TransferService(plan_service.store)
+    return await transfer.import_lines(
+        iter_lines(request.stream()),
+        conflict=conflict,
+        remap_ids=remap_ids,
+        batch_size=batch_size
+    )
+
+# 归档管理API
+@router.get("/archive", response_model=List[ArchivedPlanSummary])
+async def get_archived_plans(
+    q: Optional[str] = Query(None, title="检索关键词"),
+    deep: bool = Query(False, title="是否解压全文检索（包括评论）"),
+    plan_service: PlanService = Depends(get_plan_service)
+):
+    """列出或检索归档计划"""
+    return await plan_service.search_archived_plans(q, deep)
+
+@router.post("/archive/auto", response_model=APIResponse)
+async def archive_completed_plans(
+    older_than_days: Optional[int] = Query(None, ge=0, title="归档多少天前完成的计划"),
+    plan_service: PlanService = Depends(get_plan_service)
+):
+    """归档所有任务已完成的计划"""
+    archived = await plan_service.archive_completed_plans(older_than_days)
+    return APIResponse(message=f"已归档 {len(archived)} 个计划", data={"archived": archived})
+
+@router.get("/archive/{plan_id}", response_model=Plan)
+async def get_archived_plan(
+    plan_id: str = Path(..., title="计划ID"),
+    plan_service: PlanService = Depends(get_plan_service)
+):
+    """获取归档计划详情"""
+    plan = await plan_service.get_archived_plan(plan_id)
+    if not plan:
+        raise HTTPException(status_code=404, detail="归档计划不存在")
+    return plan
+
+@router.post("/archive/{plan_id}/restore", response_model=Plan)
+async def restore_plan(
+    plan_id: str = Path(..., title="计划ID"),
+    plan_service: PlanService = Depends(get_plan_service)
+):
+    """从归档恢复计划"""
+    try:
+        plan = await plan_service.restore_plan(plan_id)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if not plan:
+        raise HTTPException(status_code=404, detail="归档计划不存在")
+    return plan
+
 @router.get("/{plan_id}", response_model=Plan)
 async def get_plan_by_id(
     plan_id: str = Path(..., title="计划ID"),
+    comment_options: Tuple[CommentMode, int] = Depends(get_comment_options),
     plan_service: PlanService = Depends(get_plan_service)
 ):
     """获取特定计划详情"""
     plan = await plan_service.get_plan_by_id(plan_id)
     if not plan:
         raise HTTPException(status_code=404, detail="计划不存在")
-    return plan
+    return await plan_service.with_comments(plan, *comment_options)
 
 @router.put("/{plan_id}", response_model=Plan)
 async def update_plan(
@@ -74,6 +178,21 @@ async def update_plan(
         raise HTTPException(status_code=404, detail="计划不存在")
     return plan
 
+@router.post("/{plan_id}/reparse", response_model=PlanReparseResult)
+async def reparse_plan(
+    plan_id: str = Path(..., title="计划ID"),
+    reparse_data: PlanReparse = Body(...),
+    plan_service: PlanService = Depends(get_plan_service)
+):
+    """用修改后的文本增量更新计划（只重新解析有变化的段落）"""
+    try:
+        result = await plan_service.reparse_plan(plan_id, reparse_data.text)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not result:
+        raise HTTPException(status_code=404, detail="计划不存在")
+    return result
+
 @router.delete("/{plan_id}", response_model=APIResponse)
 async def delete_plan(
     plan_id: str = Path(..., title="计划ID"),
@@ -96,41 +215,165 @@ async def set_current_plan(
         raise HTTPException(status_code=404, detail="计划不存在")
     return APIResponse(message="当前计划已更新")
 
+@router.post("/{plan_id}/archive", response_model=APIResponse)
+async def archive_plan(
+    plan_id: str = Path(..., title="计划ID"),
+    plan_service: PlanService = Depends(get_plan_service)
+):
+    """把计划移入归档"""
+    summary = await plan_service.archive_plan(plan_id)
+    if not summary:
+        raise HTTPException(status_code=404, detail="计划不存在")
+    return APIResponse(message="计划已归档")
+
+@router.get("/{plan_id}/analytics", response_model=PlanAnalytics)
+async def get_plan_analytics(
+    plan_id: str = Path(..., title="计划ID"),
+    plan_service: PlanService = Depends(get_plan_service)
+):
+    """获取计划的依赖图分析（拓扑序、关键路径、任务层级、阻塞数和最大并行宽度）"""
+    analytics = await plan_service.get_plan_analytics(plan_id)
+    if not analytics:
+        raise HTTPException(status_code=404, detail="计划不存在")
+    return analytics
+
+# 修订历史API
+@router.get("/{plan_id}/revisions", response_model=List[PlanRevision])
+async def get_revisions(
+    plan_id: str = Path(..., title="计划ID"),
+    plan_service: PlanService = Depends(get_plan_service)
+):
+    """获取计划的修订列表"""
+    return await plan_service.get_revisions(plan_id)
+
+@router.get("/{plan_id}/revisions/diff", response_model=PlanRevisionDiff)
+async def diff_revisions(
+    plan_id: str = Path(..., title="计划ID"),
+    from_revision: int = Query(..., ge=1, alias="from", title="起始修订号"),
+    to_revision: int = Query(..., ge=1, alias="to", title="目标修订号"),
+    plan_service: PlanService = Depends(get_plan_service)
+):
+    """比较计划的两个修订"""
+    changes = await plan_service.diff_plan_revisions(plan_id, from_revision, to_revision)
+    if changes is None:
+        raise HTTPException(status_code=404, detail="修订不存在")
+    return PlanRevisionDiff(
+        plan_id=plan_id,
+        from_revision=from_revision,
+        to_revision=to_revision,
+        changes=changes
+    )
+
+@router.get("/{plan_id}/revisions/{revision}", response_model=Plan)
+async def get_plan_revision(
+    plan_id: str = Path(..., title="计划ID"),
+    revision: int = Path(..., ge=1, title="修订号"),
+    plan_service: PlanService = Depends(get_plan_service)
+):
+    """获取计划在指定修订时的内容"""
+    plan = await plan_service.get_plan_revision(plan_id, revision)
+    if not plan:
+        raise HTTPException(status_code=404, detail="修订不存在")
+    return plan
+
 # 任务管理API
 @router.get("/{plan_id}/tasks", response_model=List[Task])
 async def get_tasks(
+    response: Response,
     plan_id: str = Path(..., title="计划ID"),
+    status: Optional[List[TaskStatus]] = Query(None, title="任务状态（可重复指定多个）"),
+    order_min: Optional[int] = Query(None, title="最小顺序编号"),
+    order_max: Optional[int] = Query(None, title="最大顺序编号"),
+    has_comments: Optional[bool] = Query(None, title="是否有评论"),
+    dependency_of: Optional[str] = Query(None, title="只返回该任务所依赖的任务"),
+    q: Optional[str] = Query(None, title="标题或描述包含的文本"),
+    sort: Optional[str] = Query(None, title="排序字段（order/title/status/created_at/updated_at，前加-为降序）"),
+    limit: Optional[int] = Query(None, ge=1, title="返回数量"),
+    offset: int = Query(0, ge=0, title="跳过数量"),
+    comment_options: Tuple[CommentMode, int] = Depends(get_comment_options),
     plan_service: PlanService = Depends(get_plan_service)
 ):
-    """获取计划下所有任务"""
-    plan = await plan_service.get_plan_by_id(plan_id)
-    if not plan:
+    """获取计划下的任务，支持服务端过滤、排序和分页
+
+    符合条件的任务总数通过X-Total-Count响应头返回。
+    """
+    try:
+        result = await plan_service.query_tasks(
+            plan_id,
+            statuses=status,
+            order_min=order_min,
+            order_max=order_max,
+            has_comments=has_comments,
+            dependency_of=dependency_of,
+            text=q,
+            sort=sort,
+            limit=limit,
+            offset=offset
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if result is None:
         raise HTTPException(status_code=404, detail="计划不存在")
-    return plan.tasks
+    tasks, total = result
+    response.headers["X-Total-Count"] = str(total)
+    return await plan_service.tasks_with_comments(plan_id, tasks, *comment_options)
 
 @router.post("/{plan_id}/tasks", response_model=Task)
 async def create_task(
     plan_id: str = Path(..., title="计划ID"),
     task_data: TaskCreate = Body(...),
+    dedup: bool = Query(False, title="计划中已有相似任务时拒绝创建"),
     plan_service: PlanService = Depends(get_plan_service)
 ):
-    """添加新任务"""
-    task = await plan_service.create_task(plan_id, task_data)
+    """添加新任务
+
+    dedup为true且已有相似度达到DEDUP_THRESHOLD的任务时返回409，detail中给出重复的任务。
+    """
+    try:
+        task = await plan_service.create_task(plan_id, task_data, dedup=dedup)
+    except DuplicateTaskError as e:
+        raise HTTPException(status_code=409, detail={
+            "message": str(e),
+            "task_id": e.task.id,
+            "title": e.task.title,
+            "score": e.score
+        })
     if not task:
         raise HTTPException(status_code=404, detail="计划不存在")
     return task
 
+@router.get("/{plan_id}/tasks/similar", response_model=List[SimilarTask])
+async def get_similar_tasks(
+    plan_id: str = Path(..., title="计划ID"),
+    text: Optional[str] = Query(None, title="查询文本"),
+    task_id: Optional[str] = Query(None, title="查找与该任务相似的任务"),
+    limit: int = Query(10, ge=1, le=100, title="返回数量"),
+    threshold: float = Query(0.0, ge=-1.0, le=1.0, title="最低相似度"),
+    plan_service: PlanService = Depends(get_plan_service)
+):
+    """按标题和描述的文本相似度查找计划中的任务（需指定text或task_id）"""
+    if not text and not task_id:
+        raise HTTPException(status_code=400, detail="需要指定text或task_id")
+    try:
+        result = await plan_service.find_similar_tasks(plan_id, text=text, task_id=task_id, limit=limit, threshold=threshold)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="任务不存在")
+    if result is None:
+        raise HTTPException(status_code=404, detail="计划不存在")
+    return result
+
 @router.get("/{plan_id}/tasks/{task_id}", response_model=Task)
 async def get_task_by_id(
     plan_id: str = Path(..., title="计划ID"),
     task_id: str = Path(..., title="任务ID"),
+    comment_options: Tuple[CommentMode, int] = Depends(get_comment_options),
     plan_service: PlanService = Depends(get_plan_service)
 ):
     """获取特定任务详情"""
     task = await plan_service.get_task_by_id(plan_id, task_id)
     if not task:
         raise HTTPException(status_code=404, detail="任务不存在")
-    return task
+    return (await plan_service.tasks_with_comments(plan_id, [task], *comment_options))[0]
 
 @router.put("/{plan_id}/tasks/{task_id}", response_model=Task)
 async def update_task(
@@ -170,6 +413,55 @@ async def delete_task(
         raise HTTPException(status_code=404, detail="任务不存在")
     return APIResponse(message="任务已删除")
 
+# 任务认领API
+@router.post("/{plan_id}/tasks/{task_id}/claim", response_model=Task)
+async def claim_task(
+    plan_id: str = Path(..., title="计划ID"),
+    task_id: str = Path(..., title="任务ID"),
+    claim: TaskClaim = Body(...),
+    plan_service: PlanService = Depends(get_plan_service)
+):
+    """认领任务（置为Working并持有租约）"""
+    try:
+        task = await plan_service.claim_task(plan_id, task_id, claim)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if not task:
+        raise HTTPException(status_code=404, detail="任务不存在")
+    return task
+
+@router.post("/{plan_id}/tasks/{task_id}/renew", response_model=Task)
+async def renew_lease(
+    plan_id: str = Path(..., title="计划ID"),
+    task_id: str = Path(..., title="任务ID"),
+    claim: TaskClaim = Body(...),
+    plan_service: PlanService = Depends(get_plan_service)
+):
+    """延长任务认领租约"""
+    try:
+        task = await plan_service.renew_lease(plan_id, task_id, claim)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if not task:
+        raise HTTPException(status_code=404, detail="任务不存在")
+    return task
+
+@router.post("/{plan_id}/tasks/{task_id}/release", response_model=Task)
+async def release_task(
+    plan_id: str = Path(..., title="计划ID"),
+    task_id: str = Path(..., title="任务ID"),
+    release: TaskRelease = Body(...),
+    plan_service: PlanService = Depends(get_plan_service)
+):
+    """释放任务认领"""
+    try:
+        task = await plan_service.release_task(plan_id, task_id, release)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if not task:
+        raise HTTPException(status_code=404, detail="任务不存在")
+    return task
+
 # 评论管理API
 @router.post("/{plan_id}/tasks/{task_id}/comments", response_model=Comment)
 async def add_comment(
@@ -186,15 +478,28 @@ async def add_comment(
 
 @router.get("/{plan_id}/tasks/{task_id}/comments", response_model=List[Comment])
 async def get_comments(
+    response: Response,
     plan_id: str = Path(..., title="计划ID"),
     task_id: str = Path(..., title="任务ID"),
+    cursor: Optional[str] = Query(None, title="分页游标（上一页响应的X-Next-Cursor）"),
+    limit: Optional[int] = Query(None, ge=1, le=1000, title="返回数量，不指定时返回全部"),
     plan_service: PlanService = Depends(get_plan_service)
 ):
-    """获取任务下所有评论"""
-    task = await plan_service.get_task_by_id(plan_id, task_id)
-    if not task:
+    """按时间顺序获取任务下的评论，支持游标分页
+
+    评论总数通过X-Total-Count响应头返回；还有下一页时通过X-Next-Cursor响应头返回下一页的游标。
+    """
+    try:
+        result = await plan_service.get_comments(plan_id, task_id, cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if result is None:
         raise HTTPException(status_code=404, detail="任务不存在")
-    return task.comments
+    comments, next_cursor, total = result
+    response.headers["X-Total-Count"] = str(total)
+    if next_cursor is not None:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return comments
 
 @router.delete("/{plan_id}/tasks/{task_id}/comments/{comment_id}", response_model=APIResponse)
 async def delete_comment(
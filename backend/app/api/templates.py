@@ -0,0 +1,76 @@
+from typing import List
+from fastapi import APIRouter, HTTPException, Depends, Path, Body
+
+from ..models.schemas import (
+    Plan, APIResponse, PlanTemplate, PlanTemplateCreate, PlanTemplateFromPlan,
+    PlanTemplateSummary, TemplateInstantiate
+)
+from ..services.template_service import TemplateService, get_template_service
+
+# 创建路由器
+router = APIRouter(prefix="/templates", tags=["templates"])
+
+# 依赖项：获取TemplateService实例
+def get_service() -> TemplateService:
+    return get_template_service()
+
+@router.get("/", response_model=List[PlanTemplateSummary])
+async def list_templates(template_service: TemplateService = Depends(get_service)):
+    """列出所有计划模板"""
+    return await template_service.list_templates()
+
+@router.post("/", response_model=PlanTemplate)
+async def create_template(
+    template_data: PlanTemplateCreate = Body(...),
+    template_service: TemplateService = Depends(get_service)
+):
+    """创建计划模板，文本中可以使用{{变量名}}占位符"""
+    return await template_service.create(template_data)
+
+@router.post("/from-plan/{plan_id}", response_model=PlanTemplate)
+async def create_template_from_plan(
+    plan_id: str = Path(..., title="计划ID"),
+    template_data: PlanTemplateFromPlan = Body(...),
+    template_service: TemplateService = Depends(get_service)
+):
+    """把已有计划保存为模板"""
+    template = await template_service.create_from_plan(plan_id, template_data)
+    if not template:
+        raise HTTPException(status_code=404, detail="计划不存在")
+    return template
+
+@router.get("/{template_id}", response_model=PlanTemplate)
+async def get_template(
+    template_id: str = Path(..., title="模板ID"),
+    template_service: TemplateService = Depends(get_service)
+):
+    """获取计划模板详情"""
+    template = await template_service.get(template_id)
+    if not template:
+        raise HTTPException(status_code=404, detail="模板不存在")
+    return template
+
+@router.delete("/{template_id}", response_model=APIResponse)
+async def delete_template(
+    template_id: str = Path(..., title="模板ID"),
+    template_service: TemplateService = Depends(get_service)
+):
+    """删除计划模板"""
+    if not await template_service.delete(template_id):
+        raise HTTPException(status_code=404, detail="模板不存在")
+    return APIResponse(message="模板已删除")
+
+@router.post("/{template_id}/instantiate", response_model=Plan)
+async def instantiate_template(
+    template_id: str = Path(..., title="模板ID"),
+    request: TemplateInstantiate = Body(...),
+    template_service: TemplateService = Depends(get_service)
+):
+    """用变量值从模板创建计划（不调用模型），任务、评论和依赖使用新的ID"""
+    try:
+        plan = await template_service.instantiate(template_id, request)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not plan:
+        raise HTTPException(status_code=404, detail="模板不存在")
+    return plan
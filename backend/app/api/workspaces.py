@@ -0,0 +1,25 @@
+from typing import List
+from fastapi import APIRouter
+
+from ..models.schemas import WorkspaceSummary
+from ..services.plan_store import get_plan_store
+from ..utils.workspace import list_workspaces, workspace_data_dir
+
+# 创建路由器
+router = APIRouter(prefix="/workspaces", tags=["workspaces"])
+
+@router.get("/", response_model=List[WorkspaceSummary])
+async def get_workspaces():
+    """列出所有工作区及其当前计划和计划数
+
+    通过X-Workspace请求头或/w/<工作区>/路径前缀选择工作区，第一次写入时自动创建。
+    """
+    summaries = []
+    for workspace in list_workspaces():
+        store = get_plan_store(workspace_data_dir(workspace))
+        summaries.append(WorkspaceSummary(
+            name=workspace,
+            current_plan_id=await store.load_current_plan_id(),
+            plan_count=len(await store.load_plans())
+        ))
+    return summaries
@@ -0,0 +1,93 @@
+"""
+计划数据离线管理命令行工具，直接读写DATA_DIR，无需启动后端服务
+
+用法（在backend目录下运行）:
+    python -m app.cli export -o plans.ndjson [--include-archived]
+    python -m app.cli import plans.ndjson [--conflict skip|overwrite|rename|fail] [--remap-ids]
+    python -m app.cli --workspace repo1 export -o repo1.ndjson
+"""
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+from typing import AsyncIterator, Optional
+
+import aiofiles
+
+from .config import settings
+from .models.schemas import ImportConflictPolicy
+from .services.plan_store import get_plan_store
+from .services.transfer_service import TransferService
+from .utils.workspace import normalize_workspace
+
+async def _read_lines(path: Optional[str]) -> AsyncIterator[str]:
+    """逐行读取文件，路径为空或"-"时读取标准输入"""
+    if not path or path == "-":
+        for line in sys.stdin:
+            yield line.rstrip("\n")
+        return
+    async with aiofiles.open(path, 'r', encoding='utf-8') as f:
+        async for line in f:
+            yield line.rstrip("\n")
+
+async def export_plans(args: argparse.Namespace) -> None:
+    transfer = TransferService(get_plan_store(args.data_dir))
+    count = 0
+    if args.output and args.output != "-":
+        async with aiofiles.open(args.output, 'w', encoding='utf-8') as f:
+            async for line in transfer.export_lines(args.include_archived):
+                await f.write(line)
+                count += 1
+    else:
+        async for line in transfer.export_lines(args.include_archived):
+            sys.stdout.write(line)
+            count += 1
+    print(f"已导出 {count} 个计划", file=sys.stderr)
+
+async def import_plans(args: argparse.Namespace) -> None:
+    transfer = TransferService(get_plan_store(args.data_dir))
+    result = await transfer.import_lines(
+        _read_lines(args.input),
+        conflict=ImportConflictPolicy(args.conflict),
+        remap_ids=args.remap_ids,
+        batch_size=args.batch_size
+    )
+    print(result.model_dump_json(indent=2))
+    if result.aborted:
+        sys.exit(1)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="计划数据离线导出/导入")
+    parser.add_argument("--data-dir", type=Path, default=settings.data_dir_path, help="数据目录，默认使用DATA_DIR")
+    parser.add_argument("--workspace", help="工作区名称，默认为default工作区")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = subparsers.add_parser("export", help="导出计划为NDJSON")
+    export_parser.add_argument("-o", "--output", help="输出文件，默认输出到标准输出")
+    export_parser.add_argument("--include-archived", action="store_true", help="同时导出归档计划")
+    export_parser.set_defaults(handler=export_plans)
+
+    import_parser = subparsers.add_parser("import", help="从NDJSON导入计划")
+    import_parser.add_argument("input", nargs="?", help="输入文件，默认读取标准输入")
+    import_parser.add_argument(
+        "--conflict",
+        choices=[policy.value for policy in ImportConflictPolicy],
+        default=ImportConflictPolicy.SKIP.value,
+        help="ID冲突时的处理策略"
+    )
+    import_parser.add_argument("--remap-ids", action="store_true", help="为导入的计划、任务和评论分配新ID")
+    import_parser.add_argument("--batch-size", type=int, default=100, help="每批校验和提交的计划数")
+    import_parser.set_defaults(handler=import_plans)
+
+    args = parser.parse_args()
+    try:
+        workspace = normalize_workspace(args.workspace)
+    except ValueError as e:
+        parser.error(str(e))
+    if workspace:
+        args.data_dir = args.data_dir / settings.WORKSPACE_DIR / workspace
+    args.data_dir.mkdir(parents=True, exist_ok=True)
+    asyncio.run(args.handler(args))
+
+if __name__ == "__main__":
+    main()
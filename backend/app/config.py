@@ -11,15 +11,101 @@ load_dotenv()
 class Settings(BaseModel):
     PORT: int = int(os.getenv("BACKEND_PORT", "8000"))
     
+    # 服务进程配置（WORKERS大于1时为多进程生产模式，自动关闭reload）
+    WORKERS: int = int(os.getenv("BACKEND_WORKERS", "1"))
+    RELOAD: bool = os.getenv("BACKEND_RELOAD", "true").lower() == "true"
+    
+    # HTTP配置（超过COMPRESSION_MIN_SIZE字节的响应按Accept-Encoding压缩；空闲keep-alive连接保持秒数）
+    COMPRESSION_MIN_SIZE: int = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+    KEEP_ALIVE_TIMEOUT: int = int(os.getenv("KEEP_ALIVE_TIMEOUT", "60"))
+    
+    # 准入控制（每个worker进程内）：各通道的最大并发数，排队数为并发数的ADMISSION_QUEUE_FACTOR倍，
+    # 排队超过ADMISSION_MAX_WAIT_MS毫秒或队列已满时返回429
+    ADMISSION_CONTROL: bool = os.getenv("ADMISSION_CONTROL", "true").lower() == "true"
+    ADMISSION_STATUS_CONCURRENCY: int = int(os.getenv("ADMISSION_STATUS_CONCURRENCY", "64"))
+    ADMISSION_DEFAULT_CONCURRENCY: int = int(os.getenv("ADMISSION_DEFAULT_CONCURRENCY", "32"))
+    ADMISSION_BULK_CONCURRENCY: int = int(os.getenv("ADMISSION_BULK_CONCURRENCY", "4"))
+    ADMISSION_PARSE_CONCURRENCY: int = int(os.getenv("ADMISSION_PARSE_CONCURRENCY", "2"))
+    ADMISSION_QUEUE_FACTOR: int = int(os.getenv("ADMISSION_QUEUE_FACTOR", "4"))
+    ADMISSION_MAX_WAIT_MS: float = float(os.getenv("ADMISSION_MAX_WAIT_MS", "1000"))
+    
+    # 前端配置（SERVE_WEB为true时由后端进程同源提供web目录，不再需要单独的web_server.py）
+    SERVE_WEB: bool = os.getenv("SERVE_WEB", "false").lower() == "true"
+    WEB_DIR: str = os.getenv("WEB_DIR", str(Path(__file__).resolve().parents[2] / "web"))
+    
     # 数据存储配置
     DATA_DIR: str = os.getenv("DATA_DIR", "./data")
     PLANS_FILE: str = "plans.json"
     CURRENT_PLAN_FILE: str = "current_plan.json"
+    LOCK_FILE: str = ".plans.lock"
+    # plans.json的元数据（模式版本和sha256），两者匹配时跳过pydantic校验快速加载
+    PLANS_META_FILE: str = "plans.meta.json"
+    TRUSTED_LOAD: bool = os.getenv("TRUSTED_LOAD", "true").lower() == "true"
+    # 组提交窗口（毫秒）：窗口内到达的写事务合并为一次写入
+    GROUP_COMMIT_WINDOW_MS: float = float(os.getenv("GROUP_COMMIT_WINDOW_MS", "2"))
+    
+    # 修订历史配置（每隔多少个修订保存一次完整快照）
+    HISTORY_DIR: str = "history"
+    HISTORY_SNAPSHOT_INTERVAL: int = int(os.getenv("HISTORY_SNAPSHOT_INTERVAL", "20"))
+    
+    # 评论存储配置（每个计划的评论保存为一个只追加的日志文件）
+    COMMENT_DIR: str = "comments"
+    
+    # 仪表盘保留的最近变化任务数
+    DASHBOARD_RECENT_LIMIT: int = int(os.getenv("DASHBOARD_RECENT_LIMIT", "20"))
+    
+    # 完整性检查配置（每隔INTEGRITY_CHECK_INTERVAL秒检查并修复存储，0表示关闭；INTEGRITY_REPAIR为false时只报告；
+    # 每处理一批数据暂停INTEGRITY_THROTTLE_MS毫秒，前台有请求正在处理时继续等待）
+    INTEGRITY_CHECK_INTERVAL: int = int(os.getenv("INTEGRITY_CHECK_INTERVAL", "21600"))
+    INTEGRITY_REPAIR: bool = os.getenv("INTEGRITY_REPAIR", "true").lower() == "true"
+    INTEGRITY_THROTTLE_MS: float = float(os.getenv("INTEGRITY_THROTTLE_MS", "20"))
+    INTEGRITY_REPORT_FILE: str = "integrity.json"
+    QUARANTINE_DIR: str = "quarantine"
+    
+    # 工作区配置（默认工作区使用DATA_DIR，其他工作区的数据保存在DATA_DIR/workspaces/<名称>）
+    WORKSPACE_DIR: str = "workspaces"
+    
+    # 任务认领租约配置（默认租期和过期租约的回收间隔，单位秒）
+    LEASE_TTL_SECONDS: int = int(os.getenv("LEASE_TTL_SECONDS", "900"))
+    LEASE_SWEEP_INTERVAL: int = int(os.getenv("LEASE_SWEEP_INTERVAL", "30"))
+    
+    # 任务去重配置（新任务与已有任务的相似度达到该阈值时视为重复）
+    DEDUP_THRESHOLD: float = float(os.getenv("DEDUP_THRESHOLD", "0.9"))
+    
+    # 增量重新解析配置（重新解析得到的任务与受影响的旧任务相似度达到该阈值时视为同一任务，保留其ID和状态）
+    REPARSE_MATCH_THRESHOLD: float = float(os.getenv("REPARSE_MATCH_THRESHOLD", "0.5"))
+    
+    # 后台解析任务配置（并发执行数、完成后保留小时数）
+    JOB_DIR: str = "jobs"
+    JOB_WORKERS: int = int(os.getenv("JOB_WORKERS", "2"))
+    JOB_RETENTION_HOURS: int = int(os.getenv("JOB_RETENTION_HOURS", "24"))
+    
+    # 归档配置（所有任务完成且超过ARCHIVE_AFTER_DAYS天未更新的计划自动归档，0表示关闭）
+    ARCHIVE_DIR: str = "archive"
+    ARCHIVE_AFTER_DAYS: int = int(os.getenv("ARCHIVE_AFTER_DAYS", "0"))
+    ARCHIVE_CHECK_INTERVAL: int = int(os.getenv("ARCHIVE_CHECK_INTERVAL", "3600"))
+    
+    # 计划模板配置（每个模板单独保存在该目录下）
+    TEMPLATE_DIR: str = "templates"
     
     # OpenAI配置（用于文本解析Agent）
     MODEL_API_KEY: Optional[str] = os.getenv("MODEL_API_KEY")
     MODEL_NAME: str = os.getenv("MODEL_NAME", "gpt-3.5-turbo")
     MODEL_BASE_URL: Optional[str] = os.getenv("MODEL_BASE_URL")
+    # 模型上下文窗口和最大输出token数（0表示不限制输出，按4096预留），用于发送前的token预算
+    MODEL_CONTEXT_TOKENS: int = int(os.getenv("MODEL_CONTEXT_TOKENS", "128000"))
+    MODEL_MAX_OUTPUT_TOKENS: int = int(os.getenv("MODEL_MAX_OUTPUT_TOKENS", "0"))
+    # 输出格式：auto（优先json_schema，不支持时退回json_object）、json_schema、json_object
+    MODEL_STRUCTURED_OUTPUT: str = os.getenv("MODEL_STRUCTURED_OUTPUT", "auto")
+    # 多个模型服务（JSON数组，每项包含name、model、base_url、api_key、weight，省略的字段取上面的单服务配置），
+    # 为空时只使用上面的单个服务；请求按延迟加权分配，限流或出错时立即切换到其他服务
+    MODEL_ENDPOINTS: str = os.getenv("MODEL_ENDPOINTS", "")
+    # 单次请求超时秒数；服务出错后暂停使用的基础秒数（连续失败时翻倍，最多10倍）
+    MODEL_REQUEST_TIMEOUT: float = float(os.getenv("MODEL_REQUEST_TIMEOUT", "120"))
+    MODEL_FAILURE_COOLDOWN: float = float(os.getenv("MODEL_FAILURE_COOLDOWN", "30"))
+    # 对冲请求：请求耗时超过该服务近期延迟的p95（不低于MODEL_HEDGE_MIN_MS）时向另一个服务再发一次，取先返回的结果
+    MODEL_HEDGE: bool = os.getenv("MODEL_HEDGE", "false").lower() == "true"
+    MODEL_HEDGE_MIN_MS: float = float(os.getenv("MODEL_HEDGE_MIN_MS", "2000"))
     
     @property
     def data_dir_path(self) -> Path:
@@ -1,10 +1,19 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
+from datetime import datetime
+import asyncio
 import logging
 
 from .api import router as api_router
 from .config import settings
+from .services.plan_service import PlanService
+from .services.health_service import warmup_state
+from .services.integrity_service import get_integrity_service
+from .utils.compression import CompressionMiddleware
+from .utils.admission import AdmissionControlMiddleware, default_controller
+from .utils.static_assets import StaticAssets
+from .utils.workspace import WorkspaceMiddleware, list_workspaces, workspace_data_dir
 
 # 设置日志
 logging.basicConfig(level=logging.INFO)
@@ -17,6 +26,18 @@ app = FastAPI(
     version="1.0.0"
 )
 
+# 添加准入控制中间件（在CORS之内，429响应同样带有CORS头）
+if settings.ADMISSION_CONTROL:
+    app.state.admission = default_controller(
+        status_concurrency=settings.ADMISSION_STATUS_CONCURRENCY,
+        default_concurrency=settings.ADMISSION_DEFAULT_CONCURRENCY,
+        bulk_concurrency=settings.ADMISSION_BULK_CONCURRENCY,
+        parse_concurrency=settings.ADMISSION_PARSE_CONCURRENCY,
+        queue_factor=settings.ADMISSION_QUEUE_FACTOR,
+        max_wait=settings.ADMISSION_MAX_WAIT_MS / 1000
+    )
+    app.add_middleware(AdmissionControlMiddleware, controller=app.state.admission)
+
 # 添加CORS中间件
 app.add_middleware(
     CORSMiddleware,
@@ -26,24 +47,96 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 添加响应压缩中间件（gzip/brotli）
+app.add_middleware(CompressionMiddleware, minimum_size=settings.COMPRESSION_MIN_SIZE)
+
+# 添加工作区中间件（最外层：去掉/w/<工作区>前缀后，内层中间件和路由看到的路径与默认工作区相同）
+app.add_middleware(WorkspaceMiddleware)
+
 # 添加API路由
 app.include_router(api_router)
 
-# 根路由
-@app.get("/")
-async def root():
-    """API根路由，返回简单的欢迎信息"""
-    return {"message": "欢迎使用Cursor Planner API", "docs": "/docs"}
+async def auto_archive_loop():
+    """定期归档所有工作区中任务已完成且长时间未更新的计划"""
+    while True:
+        for workspace in list_workspaces():
+            try:
+                await PlanService(workspace_data_dir(workspace)).archive_completed_plans()
+            except Exception as e:
+                logger.error(f"自动归档失败（工作区 {workspace}）: {e}", exc_info=True)
+        await asyncio.sleep(settings.ARCHIVE_CHECK_INTERVAL)
+
+async def lease_sweeper_loop():
+    """定期回收所有工作区中过期的任务认领租约"""
+    while True:
+        await asyncio.sleep(settings.LEASE_SWEEP_INTERVAL)
+        for workspace in list_workspaces():
+            try:
+                await PlanService(workspace_data_dir(workspace)).reclaim_expired_leases()
+            except Exception as e:
+                logger.error(f"回收过期租约失败（工作区 {workspace}）: {e}", exc_info=True)
+
+def foreground_busy() -> bool:
+    """是否有前台请求正在处理（准入控制的各通道），后台检查据此让出
+
+    长轮询通道（poll）中的请求只是在等待任务状态变化，不占用资源，不计入。
+    """
+    controller = getattr(app.state, "admission", None)
+    return controller is not None and any(
+        lane.active for name, lane in controller.lanes.items() if name != "poll"
+    )
+
+async def integrity_check_loop():
+    """定期检查并修复所有工作区的存储（最近已由其他worker进程检查过的工作区跳过）"""
+    await asyncio.sleep(min(settings.INTEGRITY_CHECK_INTERVAL, 60))
+    while True:
+        for workspace in list_workspaces():
+            try:
+                service = get_integrity_service(workspace_data_dir(workspace))
+                last = await service.last_report()
+                if last is not None and last.finished_at is not None:
+                    if (datetime.now() - last.finished_at).total_seconds() < settings.INTEGRITY_CHECK_INTERVAL / 2:
+                        continue
+                await service.check(repair=settings.INTEGRITY_REPAIR, busy=foreground_busy)
+            except Exception as e:
+                logger.error(f"完整性检查失败（工作区 {workspace}）: {e}", exc_info=True)
+        await asyncio.sleep(settings.INTEGRITY_CHECK_INTERVAL)
+
+@app.on_event("startup")
+async def start_background_tasks():
+    """启动后台任务（数据加载在后台预热，不阻塞端口监听，完成后/ready返回200）"""
+    warmup_state.start()
+    asyncio.create_task(lease_sweeper_loop())
+    if settings.ARCHIVE_AFTER_DAYS > 0:
+        asyncio.create_task(auto_archive_loop())
+    if settings.INTEGRITY_CHECK_INTERVAL > 0:
+        asyncio.create_task(integrity_check_loop())
+
+if settings.SERVE_WEB:
+    # 同源提供前端页面（挂载在所有API路由之后），浏览器请求API不再需要CORS预检
+    app.mount("/", StaticAssets(
+        settings.WEB_DIR,
+        config_script="window.CODE_DOCK_CONFIG = { SAME_ORIGIN: true };",
+        minimum_size=settings.COMPRESSION_MIN_SIZE
+    ), name="web")
+else:
+    # 根路由
+    @app.get("/")
+    async def root():
+        """API根路由，返回简单的欢迎信息"""
+        return {"message": "欢迎使用Cursor Planner API", "docs": "/docs"}
 
 # 启动应用
 if __name__ == "__main__":
     # 确保数据目录存在
     settings.ensure_data_dir()
     
-    # 启动服务
+    # 启动服务（多worker模式下各进程通过文件锁共享数据目录，reload与多worker互斥）
     uvicorn.run(
         "app.main:app", 
         host='0.0.0.0', 
         port=settings.PORT,
-        reload=True
+        reload=settings.RELOAD and settings.WORKERS <= 1,
+        workers=settings.WORKERS,
+        timeout_keep_alive=settings.KEEP_ALIVE_TIMEOUT
     ) 
\ No newline at end of file
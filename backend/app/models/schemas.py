@@ -12,6 +12,19 @@ class TaskStatus(str, Enum):
     COMPLETE = "Complete"
     NEED_FIXED = "Need Fixed"
 
+class ImportConflictPolicy(str, Enum):
+    SKIP = "skip"
+    OVERWRITE = "overwrite"
+    RENAME = "rename"
+    FAIL = "fail"
+
+class JobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
 class CommentType(str, Enum):
     NOTE = "Note"
     QUESTION = "Question"
@@ -19,6 +32,12 @@ class CommentType(str, Enum):
     ISSUE = "Issue"
     OTHER = "Other"
 
+class CommentMode(str, Enum):
+    """读取计划/任务时附带评论的方式"""
+    ALL = "all"
+    LATEST = "latest"
+    NONE = "none"
+
 # 基础模型
 class BaseSchema(BaseModel):
     """基础模型，包含通用字段"""
@@ -57,6 +76,23 @@ class TaskStatusUpdate(BaseModel):
     """更新任务状态的输入模型"""
     status: TaskStatus
 
+class TaskLease(BaseModel):
+    """任务认领租约"""
+    owner: str
+    claimed_at: datetime = Field(default_factory=datetime.now)
+    expires_at: datetime
+    previous_status: TaskStatus = TaskStatus.PENDING  # 租约过期或释放时恢复的状态
+
+class TaskClaim(BaseModel):
+    """认领任务或续租的输入模型"""
+    owner: str
+    ttl_seconds: Optional[int] = Field(default=None, ge=1)
+
+class TaskRelease(BaseModel):
+    """释放任务认领的输入模型，status为空时恢复认领前的状态"""
+    owner: str
+    status: Optional[TaskStatus] = None
+
 class Task(BaseSchema):
     """任务模型"""
     title: str
@@ -65,6 +101,11 @@ class Task(BaseSchema):
     comments: List[Comment] = Field(default_factory=list)
     order: Optional[int] = None
     dependencies: List[str] = Field(default_factory=list)
+    lease: Optional[TaskLease] = None
+    # 评论单独保存在评论存储中，comments只在读取时按需附带；comment_count为评论总数
+    comment_count: int = 0
+    # 由文本解析得到的任务所属原文段落的内容标识，重新解析时用于判断任务是否受修改影响
+    source_section: Optional[str] = None
 
 # 计划模型
 class PlanCreate(BaseModel):
@@ -85,6 +126,168 @@ class Plan(BaseSchema):
     description: Optional[str] = None
     notes: List[str] = Field(default_factory=list)
     tasks: List[Task] = Field(default_factory=list)
+    # 由文本解析得到的计划保存原文，修改文本后只重新解析变化的段落
+    source_text: Optional[str] = None
+
+# 相似任务模型
+class SimilarTask(BaseModel):
+    """相似度查询结果"""
+    task: Task
+    score: float
+
+# 依赖图分析模型
+class TaskAnalytics(BaseModel):
+    """单个任务的依赖分析结果"""
+    task_id: str
+    depth: Optional[int] = None  # 在依赖图中的层级，处于环中时为空
+    blocked_by_count: int = 0    # 未完成的依赖数
+    dependents_count: int = 0    # 直接依赖该任务的任务数
+    ready: bool = False          # 是否可以立即开始
+
+class PlanAnalytics(BaseModel):
+    """计划依赖图分析结果"""
+    plan_id: str
+    revision: int = 0
+    topological_order: List[str] = Field(default_factory=list)
+    critical_path: List[str] = Field(default_factory=list)
+    critical_path_length: int = 0
+    remaining_critical_path: List[str] = Field(default_factory=list)
+    max_parallelism: int = 0
+    level_widths: List[int] = Field(default_factory=list)
+    ready_count: int = 0
+    has_cycle: bool = False
+    cycle_task_ids: List[str] = Field(default_factory=list)
+    tasks: List[TaskAnalytics] = Field(default_factory=list)
+
+# 仪表盘模型
+class PlanProgress(BaseModel):
+    """单个计划的进度汇总"""
+    plan_id: str
+    name: str
+    description: Optional[str] = None
+    task_count: int = 0
+    # 按任务状态的任务数（键为状态值，包含所有状态）
+    status_counts: Dict[str, int] = Field(default_factory=dict)
+    # 完成百分比（0-100，没有任务时为0）
+    completion: float = 0.0
+    # 可以立即开始的任务数（待处理或需修复、未被认领且依赖都已完成）
+    ready_count: int = 0
+    updated_at: Optional[datetime] = None
+
+class TaskChange(BaseModel):
+    """最近变化的任务"""
+    plan_id: str
+    plan_name: str
+    task_id: str
+    title: str
+    # created、updated或deleted
+    change: str
+    status: TaskStatus
+    previous_status: Optional[TaskStatus] = None
+    changed_at: datetime
+
+class Dashboard(BaseModel):
+    """所有计划的进度汇总"""
+    version: int = 0
+    current_plan_id: Optional[str] = None
+    plan_count: int = 0
+    task_count: int = 0
+    status_counts: Dict[str, int] = Field(default_factory=dict)
+    completion: float = 0.0
+    ready_count: int = 0
+    plans: List[PlanProgress] = Field(default_factory=list)
+    recent_tasks: List[TaskChange] = Field(default_factory=list)
+
+# 修订历史模型
+class PlanRevision(BaseModel):
+    """计划修订记录"""
+    revision: int
+    type: str  # snapshot 或 delta
+    created_at: datetime
+    changes: Optional[int] = None
+
+class PlanRevisionDiff(BaseModel):
+    """两个修订之间的差异"""
+    plan_id: str
+    from_revision: int
+    to_revision: int
+    changes: List[Dict[str, Any]] = Field(default_factory=list)
+
+# 归档模型
+class ArchivedPlanSummary(BaseModel):
+    """归档计划摘要"""
+    id: str
+    name: str
+    description: Optional[str] = None
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+    archived_at: datetime
+    task_count: int = 0
+
+# 计划模板模型
+class PlanTemplateCreate(BaseModel):
+    """创建计划模板的输入模型
+
+    计划名称、描述、注意事项以及任务的标题、描述和评论中可以使用{{变量名}}占位符，
+    实例化时替换为提供的值（未提供时使用defaults中的默认值）。
+    """
+    name: str
+    description: Optional[str] = None
+    plan_name: str
+    plan_description: Optional[str] = None
+    notes: List[str] = Field(default_factory=list)
+    tasks: List[Task] = Field(default_factory=list)
+    defaults: Dict[str, str] = Field(default_factory=dict)
+
+class PlanTemplateFromPlan(BaseModel):
+    """把已有计划保存为模板的输入模型（任务状态重置为Pending，不保留认领租约）"""
+    name: str
+    description: Optional[str] = None
+    include_comments: bool = True
+    defaults: Dict[str, str] = Field(default_factory=dict)
+
+class PlanTemplate(BaseSchema):
+    """计划模板，variables为内容中出现的占位符变量"""
+    name: str
+    description: Optional[str] = None
+    plan_name: str
+    plan_description: Optional[str] = None
+    notes: List[str] = Field(default_factory=list)
+    tasks: List[Task] = Field(default_factory=list)
+    defaults: Dict[str, str] = Field(default_factory=dict)
+    variables: List[str] = Field(default_factory=list)
+
+class PlanTemplateSummary(BaseModel):
+    """计划模板摘要"""
+    id: str
+    name: str
+    description: Optional[str] = None
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+    variables: List[str] = Field(default_factory=list)
+    task_count: int = 0
+
+class TemplateInstantiate(BaseModel):
+    """实例化模板的输入模型"""
+    variables: Dict[str, str] = Field(default_factory=dict)
+    name: Optional[str] = None
+    set_current: bool = False
+
+# 批量导入模型
+class PlanImportError(BaseModel):
+    """导入失败的行"""
+    line: int
+    error: str
+
+class PlanImportResult(BaseModel):
+    """批量导入结果"""
+    imported: int = 0
+    skipped: int = 0
+    replaced: int = 0
+    renamed: int = 0
+    failed: int = 0
+    aborted: bool = False
+    errors: List[PlanImportError] = Field(default_factory=list)
 
 # 文本转计划模型
 class TextToPlan(BaseModel):
@@ -92,6 +295,147 @@ class TextToPlan(BaseModel):
     text: str
     name: Optional[str] = None
 
+class PlanReparse(BaseModel):
+    """修改后的计划文本"""
+    text: str
+
+class PlanReparseResult(BaseModel):
+    """增量重新解析结果"""
+    plan: Plan
+    sections: int = 0
+    changed_sections: int = 0
+    tasks_added: int = 0
+    tasks_updated: int = 0
+    tasks_removed: int = 0
+    tasks_kept: int = 0
+
+# 模型调用统计模型
+class LLMCallRecord(BaseModel):
+    """一次模型调用的记录"""
+    model: str
+    # 处理该请求的模型服务名称（配置了多个服务时）
+    endpoint: Optional[str] = None
+    started_at: datetime = Field(default_factory=datetime.now)
+    attempt: int = 1
+    response_format: str
+    estimated_prompt_tokens: int
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+    response_bytes: int = 0
+    latency_ms: float = 0.0
+    finish_reason: Optional[str] = None
+    outcome: str = "ok"
+    error: Optional[str] = None
+
+class LLMMetrics(BaseModel):
+    """模型调用统计（当前进程内）"""
+    calls: int = 0
+    failed_calls: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    response_bytes: int = 0
+    total_latency_ms: float = 0.0
+    local_repairs: int = 0
+    requeries: int = 0
+    recent: List[LLMCallRecord] = Field(default_factory=list)
+
+class ModelEndpointStatus(BaseModel):
+    """模型服务的健康状况和延迟统计（当前进程内）"""
+    name: str
+    model: str
+    base_url: Optional[str] = None
+    weight: float = 1.0
+    available: bool = True
+    # 出错后暂停使用的剩余秒数
+    cooldown_seconds: float = 0.0
+    ewma_latency_ms: Optional[float] = None
+    p95_latency_ms: Optional[float] = None
+    requests: int = 0
+    failures: int = 0
+    consecutive_failures: int = 0
+    # 作为对冲请求被调用的次数
+    hedges: int = 0
+    last_error: Optional[str] = None
+
+class AdmissionLaneStatus(BaseModel):
+    """准入控制通道的当前状态和累计统计（当前进程内）"""
+    name: str
+    concurrency: int
+    queue_size: int
+    active: int = 0
+    waiting: int = 0
+    admitted: int = 0
+    # 曾经排队等待的请求数
+    queued: int = 0
+    rejected: int = 0
+    avg_duration_ms: Optional[float] = None
+
+# 后台任务模型
+class Job(BaseModel):
+    """后台解析任务（文本转计划）"""
+    id: str = Field(default_factory=lambda: str(uuid4()))
+    status: JobStatus = JobStatus.QUEUED
+    request: TextToPlan
+    plan_id: Optional[str] = None
+    error: Optional[str] = None
+    # 执行该任务的进程ID，用于重启后判断任务是否需要恢复
+    owner_pid: Optional[int] = None
+    created_at: datetime = Field(default_factory=datetime.now)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (JobStatus.SUCCEEDED, JobStatus.FAILED, JobStatus.CANCELLED)
+
+# 健康检查模型
+class HealthStatus(BaseModel):
+    """存活检查结果"""
+    status: str = "ok"
+    started_at: datetime
+    uptime_seconds: float
+
+class ReadinessStatus(BaseModel):
+    """就绪检查结果（预热完成前ready为False）"""
+    ready: bool
+    error: Optional[str] = None
+    warmup_ms: Optional[float] = None
+    # 各预热步骤的耗时（毫秒）
+    steps: Dict[str, float] = Field(default_factory=dict)
+    # 计划解析代理（及模型客户端）是否已经加载
+    parser_loaded: bool = False
+
+# 完整性检查模型
+class IntegrityIssue(BaseModel):
+    """完整性检查发现的问题"""
+    kind: str
+    plan_id: Optional[str] = None
+    task_id: Optional[str] = None
+    detail: str
+    # 采取的处理（repaired、quarantined、removed、compacted），只报告时为None
+    action: Optional[str] = None
+
+class IntegrityReport(BaseModel):
+    """一次完整性检查与压缩的结果"""
+    started_at: datetime
+    finished_at: Optional[datetime] = None
+    duration_ms: float = 0.0
+    repair: bool = True
+    plans_checked: int = 0
+    tasks_checked: int = 0
+    issues: List[IntegrityIssue] = Field(default_factory=list)
+    # 各类存储文件的总大小（字节）
+    file_sizes: Dict[str, int] = Field(default_factory=dict)
+    # 压缩和清理释放的字节数
+    reclaimed_bytes: int = 0
+
+# 工作区模型
+class WorkspaceSummary(BaseModel):
+    """工作区摘要"""
+    name: str
+    current_plan_id: Optional[str] = None
+    plan_count: int = 0
+
 # 当前计划模型
 class CurrentPlan(BaseModel):
     """当前计划的存储模型"""
@@ -0,0 +1,107 @@
+"""
+可信数据的快速构建：跳过pydantic校验直接构造模型
+
+plans.json由存储自己写入，写入时在旁边的元数据文件中记录模式版本和内容的sha256。
+读取时两者都匹配，说明文件是当前代码按当前模型写出的，可以不经校验直接构造模型，
+只解析已知的日期时间和枚举字段，不再逐字段校验、也不再生成随后被覆盖的默认ID和时间戳。
+模式版本由模型的字段定义计算得到，模型字段变化后旧文件自动回到完整校验。
+"""
+from datetime import datetime
+from enum import Enum
+from hashlib import sha1
+from inspect import isclass
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple, Type, TypeVar, Union, get_args, get_origin
+
+from pydantic import BaseModel
+
+from .schemas import Plan
+
+M = TypeVar("M", bound=BaseModel)
+
+# 修改模型的序列化格式（而不只是字段定义）时手动递增
+FORMAT_VERSION = 1
+
+Converter = Optional[Callable[[Any], Any]]
+
+def _parse_datetime(value: Any) -> Any:
+    return datetime.fromisoformat(value) if isinstance(value, str) else value
+
+def _converter(annotation: Any) -> Converter:
+    """字段值从JSON数据转换为模型属性的函数，不需要转换时返回None"""
+    origin = get_origin(annotation)
+    if origin is Union:
+        inner = [arg for arg in get_args(annotation) if arg is not type(None)]
+        convert = _converter(inner[0]) if len(inner) == 1 else None
+        if convert is None or convert is _parse_datetime:
+            # 日期时间解析本身已经跳过None
+            return convert
+        return lambda value: None if value is None else convert(value)
+    if origin in (list, List):
+        args = get_args(annotation)
+        convert = _converter(args[0]) if args else None
+        if convert is None:
+            return None
+        return lambda value: [convert(item) for item in value]
+    if annotation is datetime:
+        return _parse_datetime
+    if isclass(annotation) and issubclass(annotation, Enum):
+        # 直接查成员表，比调用枚举类快得多；未知的值抛出KeyError
+        return annotation._value2member_map_.__getitem__
+    if isclass(annotation) and issubclass(annotation, BaseModel):
+        return lambda value: construct(annotation, value)
+    return None
+
+FieldSpec = Tuple[List[Tuple[str, Converter]], Set[str]]
+
+# 模型类 -> ([(字段名, 转换函数)], 全部字段名)，按模型字段的定义顺序排列
+_fields: Dict[type, FieldSpec] = {}
+
+def _model_fields(model: Type[BaseModel]) -> FieldSpec:
+    fields = _fields.get(model)
+    if fields is None:
+        fields = _fields[model] = (
+            [(name, _converter(info.annotation)) for name, info in model.model_fields.items()],
+            set(model.model_fields)
+        )
+    return fields
+
+def construct(model: Type[M], data: Dict[str, Any]) -> M:
+    """不经校验地构造模型（含嵌套模型），数据缺少字段时抛出KeyError
+
+    与model_construct等价，但不处理默认值和额外字段（数据中总是包含全部字段），开销更小。
+    属性字典必须按字段定义的顺序构造，序列化结果才与校验得到的模型一致。
+    """
+    fields, all_fields = _model_fields(model)
+    values = {}
+    for name, convert in fields:
+        value = data[name]
+        values[name] = value if convert is None else convert(value)
+    obj = model.__new__(model)
+    object.__setattr__(obj, "__dict__", values)
+    # 所有字段都已设置，赋值时向其中添加字段名不会改变集合，因此同一模型的实例可以共享
+    object.__setattr__(obj, "__pydantic_fields_set__", all_fields)
+    object.__setattr__(obj, "__pydantic_extra__", None)
+    object.__setattr__(obj, "__pydantic_private__", None)
+    return obj
+
+def _schema_fingerprint(model: Type[BaseModel], seen: Optional[set] = None) -> List[str]:
+    """模型及其嵌套模型的字段定义"""
+    seen = seen if seen is not None else set()
+    if model in seen:
+        return []
+    seen.add(model)
+    parts = []
+    for name, info in model.model_fields.items():
+        parts.append(f"{model.__name__}.{name}:{info.annotation!r}")
+        stack = [info.annotation]
+        while stack:
+            annotation = stack.pop()
+            stack.extend(get_args(annotation))
+            if isclass(annotation) and issubclass(annotation, BaseModel):
+                parts.extend(_schema_fingerprint(annotation, seen))
+            elif isclass(annotation) and issubclass(annotation, Enum):
+                parts.append(f"{annotation.__name__}={[member.value for member in annotation]}")
+    return parts
+
+# plans.json的模式版本：格式版本 + 计划模型字段定义的摘要
+PLANS_SCHEMA_VERSION = f"{FORMAT_VERSION}-{sha1(chr(10).join(_schema_fingerprint(Plan)).encode('utf-8')).hexdigest()[:12]}"
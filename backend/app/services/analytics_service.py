@@ -0,0 +1,107 @@
+from collections import deque
+from typing import Dict, List
+
+from ..models.schemas import Plan, PlanAnalytics, TaskAnalytics, TaskStatus
+from .task_index import TaskIndex
+
+def analyze_plan(plan: Plan, index: TaskIndex) -> PlanAnalytics:
+    """分析计划任务依赖图（线性时间）
+
+    依赖边 dep -> task 表示task依赖dep。使用Kahn算法得到拓扑序，同时按拓扑序
+    计算每个任务的深度（最长依赖链上的位置）和以它结尾的最长链，关键路径即整张图
+    上的最长依赖链；最大并行宽度为同一深度上任务数的最大值。
+    剩余关键路径只统计未完成的任务，反映还需要多少轮串行工作。
+    存在环时环上的任务不会出现在拓扑序中，并在cycle_task_ids中列出。
+    """
+    tasks = index.tasks
+    position = index.position
+
+    # 建图（忽略找不到的依赖和自依赖，重复依赖只计一次）
+    dependents: List[List[int]] = [[] for _ in tasks]
+    parents: List[List[int]] = [[] for _ in tasks]
+    for i, task in enumerate(tasks):
+        seen = set()
+        for dependency in task.dependencies:
+            dep_task = index.resolve(dependency)
+            if dep_task is None:
+                continue
+            j = position[dep_task.id]
+            if j == i or j in seen:
+                continue
+            seen.add(j)
+            dependents[j].append(i)
+            parents[i].append(j)
+
+    in_degree = [len(p) for p in parents]
+    queue = deque(i for i in range(len(tasks)) if in_degree[i] == 0)
+    topo: List[int] = []
+    depth = [0] * len(tasks)
+    # 以任务结尾的最长链长度及前驱（分别针对全部任务和未完成任务）
+    longest = [1] * len(tasks)
+    longest_prev = [-1] * len(tasks)
+    remaining = [0] * len(tasks)
+    remaining_prev = [-1] * len(tasks)
+
+    while queue:
+        i = queue.popleft()
+        topo.append(i)
+        open_task = tasks[i].status != TaskStatus.COMPLETE
+        remaining[i] += 1 if open_task else 0
+        for j in dependents[i]:
+            if depth[i] + 1 > depth[j]:
+                depth[j] = depth[i] + 1
+            if longest[i] + 1 > longest[j]:
+                longest[j] = longest[i] + 1
+                longest_prev[j] = i
+            if remaining[i] > remaining[j]:
+                remaining[j] = remaining[i]
+                remaining_prev[j] = i
+            in_degree[j] -= 1
+            if in_degree[j] == 0:
+                queue.append(j)
+
+    critical_path = _trace(longest, longest_prev, topo)
+    remaining_path = [i for i in _trace(remaining, remaining_prev, topo)
+                      if tasks[i].status != TaskStatus.COMPLETE]
+
+    widths: Dict[int, int] = {}
+    for i in topo:
+        widths[depth[i]] = widths.get(depth[i], 0) + 1
+
+    in_topo = set(topo)
+    task_stats = []
+    for i, task in enumerate(tasks):
+        blocked_by = sum(1 for j in parents[i] if tasks[j].status != TaskStatus.COMPLETE)
+        task_stats.append(TaskAnalytics(
+            task_id=task.id,
+            depth=depth[i] if i in in_topo else None,
+            blocked_by_count=blocked_by,
+            dependents_count=len(dependents[i]),
+            ready=task.status in (TaskStatus.PENDING, TaskStatus.NEED_FIXED) and blocked_by == 0
+        ))
+
+    return PlanAnalytics(
+        plan_id=plan.id,
+        topological_order=[tasks[i].id for i in topo],
+        critical_path=[tasks[i].id for i in critical_path],
+        critical_path_length=len(critical_path),
+        remaining_critical_path=[tasks[i].id for i in remaining_path],
+        max_parallelism=max(widths.values(), default=0),
+        level_widths=[widths[level] for level in sorted(widths)],
+        ready_count=sum(1 for stat in task_stats if stat.ready),
+        has_cycle=len(topo) < len(tasks),
+        cycle_task_ids=[task.id for i, task in enumerate(tasks) if i not in in_topo],
+        tasks=task_stats
+    )
+
+def _trace(length: List[int], prev: List[int], topo: List[int]) -> List[int]:
+    """从最长链的终点沿前驱回溯出整条链"""
+    if not topo:
+        return []
+    end = max(topo, key=lambda i: length[i])
+    path = []
+    while end != -1:
+        path.append(end)
+        end = prev[end]
+    path.reverse()
+    return path
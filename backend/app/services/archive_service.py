@@ -0,0 +1,103 @@
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+import asyncio
+import gzip
+import json
+import logging
+
+from ..models.schemas import Plan, ArchivedPlanSummary
+from ..utils.file_handler import load_json, save_json, DateTimeEncoder, write_bytes_atomic
+from ..config import settings
+
+# 设置日志
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def _search_text(plan: Plan) -> str:
+    """提取用于检索的文本（计划名称、描述、注意事项和任务标题/描述）"""
+    parts = [plan.name, plan.description or ""] + list(plan.notes)
+    for task in plan.tasks:
+        parts.append(task.title)
+        parts.append(task.description or "")
+    return "\n".join(parts).lower()
+
+class ArchiveService:
+    """计划归档（冷存储）
+
+    每个归档计划单独保存为gzip压缩的JSON文件，不再参与plans.json的读写；
+    index.json保存摘要和检索文本，列表与检索只需读取索引。
+    写操作在存储事务（持有写锁）中执行：归档由调用方在事务中写入，
+    恢复后的删除由事务提交时在计划写回之后执行（见PlanTransaction.unarchive）。
+    计划文件先写入临时文件再原子替换。
+    """
+
+    def __init__(self, data_dir: Path):
+        self.archive_dir = Path(data_dir) / settings.ARCHIVE_DIR
+        self.index_path = self.archive_dir / "index.json"
+
+    def _plan_path(self, plan_id: str) -> Path:
+        return self.archive_dir / f"{plan_id}.json.gz"
+
+    async def _load_index(self) -> Dict[str, Dict[str, Any]]:
+        return await load_json(self.index_path)
+
+    def contains(self, plan_id: str) -> bool:
+        """计划是否已归档"""
+        return self._plan_path(plan_id).exists()
+
+    async def archive(self, plan: Plan) -> ArchivedPlanSummary:
+        """把计划写入冷存储"""
+        payload = json.dumps(plan.model_dump(), cls=DateTimeEncoder, ensure_ascii=False).encode('utf-8')
+        path = self._plan_path(plan.id)
+        compressed = await asyncio.to_thread(gzip.compress, payload)
+        await asyncio.to_thread(write_bytes_atomic, path, compressed)
+
+        summary = ArchivedPlanSummary(
+            id=plan.id,
+            name=plan.name,
+            description=plan.description,
+            created_at=plan.created_at,
+            updated_at=plan.updated_at,
+            archived_at=datetime.now(),
+            task_count=len(plan.tasks)
+        )
+        index = await self._load_index()
+        index[plan.id] = {**summary.model_dump(), "search_text": _search_text(plan)}
+        await save_json(self.index_path, index)
+        return summary
+
+    async def get(self, plan_id: str) -> Optional[Plan]:
+        """读取归档的计划"""
+        path = self._plan_path(plan_id)
+        if not path.exists():
+            return None
+        payload = await asyncio.to_thread(path.read_bytes)
+        data = json.loads(await asyncio.to_thread(gzip.decompress, payload))
+        return Plan.model_validate(data)
+
+    async def remove(self, plan_id: str) -> None:
+        """从冷存储中移除计划（恢复的计划写回之后由存储提交调用）"""
+        index = await self._load_index()
+        if index.pop(plan_id, None) is not None:
+            await save_json(self.index_path, index)
+        self._plan_path(plan_id).unlink(missing_ok=True)
+
+    async def search(self, query: Optional[str] = None, deep: bool = False) -> List[ArchivedPlanSummary]:
+        """列出或检索归档计划
+
+        默认只在索引的检索文本中匹配；deep为True时对索引未命中的计划
+        解压全文（包括评论）继续匹配。
+        """
+        index = await self._load_index()
+        keyword = (query or "").strip().lower()
+        results = []
+        for plan_id, entry in index.items():
+            matched = not keyword or keyword in entry.get("search_text", "")
+            if not matched and deep:
+                plan = await self.get(plan_id)
+                matched = plan is not None and keyword in plan.model_dump_json().lower()
+            if matched:
+                results.append(ArchivedPlanSummary.model_validate(entry))
+        results.sort(key=lambda s: s.archived_at, reverse=True)
+        return results
@@ -0,0 +1,318 @@
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+from uuid import uuid4
+import asyncio
+import json
+import logging
+import os
+
+from ..models.schemas import Comment, CommentMode, Plan, Task
+from ..utils.file_handler import datetime_parser, write_bytes_atomic
+from ..config import settings
+
+# 设置日志
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class CommentLog:
+    """一个计划的评论日志在内存中的状态
+
+    by_task中每个任务的评论按追加顺序排列，被删除的评论只记录在deleted中，
+    因此列表下标是稳定的，可以直接作为分页游标。
+    """
+
+    def __init__(self):
+        # 日志文件的标识（文件第一行），文件被删除重建后会变化
+        self.log_id: Optional[str] = None
+        self.inode: Optional[int] = None
+        # 已读取的字节数
+        self.offset = 0
+        self.by_task: Dict[str, List[Comment]] = {}
+        self.deleted: Set[str] = set()
+
+    def apply(self, record: Dict[str, Any]) -> None:
+        if "deleted" in record:
+            self.deleted.add(record["deleted"])
+        elif "comment" in record:
+            comment = Comment(**datetime_parser(record["comment"]))
+            self.by_task.setdefault(record["task_id"], []).append(comment)
+
+    def live(self, task_id: str) -> List[Comment]:
+        """任务的所有未删除评论"""
+        comments = self.by_task.get(task_id, [])
+        if not self.deleted:
+            return list(comments)
+        return [comment for comment in comments if comment.id not in self.deleted]
+
+    def latest(self, task_id: str, limit: int) -> List[Comment]:
+        """任务最新的limit条评论（按时间顺序）"""
+        result = []
+        for comment in reversed(self.by_task.get(task_id, [])):
+            if len(result) >= limit:
+                break
+            if comment.id not in self.deleted:
+                result.append(comment)
+        result.reverse()
+        return result
+
+class CommentStore:
+    """任务评论存储，每个计划一个只追加的JSONL文件（comments/<plan_id>.jsonl）
+
+    评论不再嵌套保存在plans.json中：添加评论只追加一行，不需要重写计划文件，
+    读取计划时也可以只带最新几条评论或不带评论。删除评论追加一条删除记录；
+    删除或整体替换计划（导入覆盖、恢复归档）时删除整个文件。
+
+    每个文件在内存中缓存解析结果，并记录已读取的位置；其他进程追加的内容
+    通过比较文件大小增量读取。写入只在计划存储的组提交中进行（持有跨进程文件锁），
+    因此不需要额外的锁。
+    """
+
+    def __init__(self, data_dir: Path):
+        self.comments_dir = Path(data_dir) / settings.COMMENT_DIR
+        self._logs: Dict[str, CommentLog] = {}
+
+    def _log_path(self, plan_id: str) -> Path:
+        return self.comments_dir / f"{plan_id}.jsonl"
+
+    def _refresh_sync(self, plan_id: str, log: CommentLog) -> CommentLog:
+        """读取日志文件中新增的内容，文件被删除或重建时重新读取"""
+        path = self._log_path(plan_id)
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            return CommentLog()
+        if stat.st_ino != log.inode or stat.st_size < log.offset:
+            log = CommentLog()
+        if stat.st_size == log.offset:
+            return log
+
+        with open(path, "rb") as f:
+            header = f.readline()
+            log_id = json.loads(header)["log"] if header.endswith(b"\n") else None
+            if log.log_id is not None and log_id != log.log_id:
+                log = CommentLog()
+            if log.offset == 0:
+                log.log_id = log_id
+                log.inode = stat.st_ino
+                log.offset = len(header) if log_id else 0
+            f.seek(log.offset)
+            data = f.read(stat.st_size - log.offset)
+
+        # 只处理完整的行，其他进程正在写入的半行留到下次读取
+        end = data.rfind(b"\n") + 1
+        for line in data[:end].splitlines():
+            if line:
+                log.apply(json.loads(line))
+        log.offset += end
+        return log
+
+    async def _load(self, plan_id: str) -> CommentLog:
+        log = self._logs.get(plan_id) or CommentLog()
+        try:
+            stat = self._log_path(plan_id).stat()
+        except FileNotFoundError:
+            self._logs.pop(plan_id, None)
+            return CommentLog()
+        # 文件没有变化时不需要进入线程
+        if stat.st_ino == log.inode and stat.st_size == log.offset:
+            return log
+        log = await asyncio.to_thread(self._refresh_sync, plan_id, log)
+        self._logs[plan_id] = log
+        return log
+
+    async def apply(self, ops: List[Tuple[str, str, Optional[str], Any]]) -> None:
+        """按顺序执行评论操作：("add", 计划ID, 任务ID, 评论)、("delete", 计划ID, 任务ID, 评论ID)、
+        ("clear", 计划ID, None, None)删除计划的全部评论、
+        ("compact", 计划ID, None, 任务ID集合)压缩日志并去掉不在集合中的任务的评论
+
+        只能在持有计划存储文件锁时调用。
+        """
+        cleared: Set[str] = set()
+        compacted: Dict[str, Set[str]] = {}
+        pending: Dict[str, List[Dict[str, Any]]] = {}
+        for kind, plan_id, task_id, value in ops:
+            if kind == "clear":
+                pending.pop(plan_id, None)
+                cleared.add(plan_id)
+                compacted.pop(plan_id, None)
+            elif kind == "compact":
+                compacted[plan_id] = value
+            elif kind == "add":
+                pending.setdefault(plan_id, []).append({"task_id": task_id, "comment": value.model_dump(mode="json")})
+            elif kind == "delete":
+                pending.setdefault(plan_id, []).append({"task_id": task_id, "deleted": value})
+
+        # 清空即删除文件，之后的评论写入新文件（新的日志标识让其他进程重新读取）
+        for plan_id in cleared:
+            self.drop(plan_id)
+        for plan_id, task_ids in compacted.items():
+            await self._compact(plan_id, task_ids)
+        for plan_id, records in pending.items():
+            await self._append(plan_id, records)
+
+    async def _append(self, plan_id: str, records: List[Dict[str, Any]]) -> None:
+        # 先读入其他进程追加的内容，再追加并直接更新内存状态
+        log = await self._load(plan_id)
+        path = self._log_path(plan_id)
+        header = ""
+        if log.offset == 0:
+            log = CommentLog()
+            log.log_id = str(uuid4())
+            header = json.dumps({"log": log.log_id}) + "\n"
+        content = header + "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records)
+
+        def write() -> int:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with open(path, "ab") as f:
+                f.write(content.encode("utf-8"))
+                f.flush()
+                os.fsync(f.fileno())
+            return path.stat().st_ino
+
+        log.inode = await asyncio.to_thread(write)
+        log.offset += len(content.encode("utf-8"))
+        for record in records:
+            log.apply(record)
+        self._logs[plan_id] = log
+
+    async def _compact(self, plan_id: str, task_ids: Set[str]) -> None:
+        """重写评论日志，去掉已删除的评论、删除记录和已删除任务的评论
+
+        新文件使用新的日志标识，其他进程会重新读取。分页游标是评论在日志中的位置，
+        压缩后之前返回的游标可能跳过或重复少量评论。
+        """
+        log = await self._load(plan_id)
+        if log.offset == 0 or not self._garbage(log, task_ids):
+            return
+        compacted = CommentLog()
+        compacted.log_id = str(uuid4())
+        lines = [json.dumps({"log": compacted.log_id}) + "\n"]
+        for task_id, comments in log.by_task.items():
+            if task_id not in task_ids:
+                continue
+            live = [comment for comment in comments if comment.id not in log.deleted]
+            if live:
+                compacted.by_task[task_id] = live
+            for comment in live:
+                record = {"task_id": task_id, "comment": comment.model_dump(mode="json")}
+                lines.append(json.dumps(record, ensure_ascii=False) + "\n")
+        content = "".join(lines).encode("utf-8")
+        path = self._log_path(plan_id)
+
+        def write() -> int:
+            write_bytes_atomic(path, content)
+            return path.stat().st_ino
+
+        compacted.inode = await asyncio.to_thread(write)
+        compacted.offset = len(content)
+        self._logs[plan_id] = compacted
+
+    def drop(self, plan_id: str) -> None:
+        """删除计划的评论日志"""
+        self._log_path(plan_id).unlink(missing_ok=True)
+        self._logs.pop(plan_id, None)
+
+    def plan_ids(self) -> List[str]:
+        """所有有评论日志的计划ID"""
+        if not self.comments_dir.is_dir():
+            return []
+        return [path.stem for path in self.comments_dir.glob("*.jsonl")]
+
+    async def live_counts(self, plan_id: str) -> Dict[str, int]:
+        """评论存储中每个任务的未删除评论数（不含旧数据中嵌套在任务里的评论）"""
+        log = await self._load(plan_id)
+        return {task_id: len(log.live(task_id)) for task_id in log.by_task}
+
+    async def garbage(self, plan_id: str, task_ids: Set[str]) -> int:
+        """日志中仍占用空间的无效评论数：已删除的评论，以及不在task_ids中（已删除任务）的评论"""
+        return self._garbage(await self._load(plan_id), task_ids)
+
+    @staticmethod
+    def _garbage(log: CommentLog, task_ids: Set[str]) -> int:
+        count = len(log.deleted)
+        for task_id, comments in log.by_task.items():
+            if task_id not in task_ids:
+                count += sum(1 for comment in comments if comment.id not in log.deleted)
+        return count
+
+    async def contains(self, plan_id: str, task_id: str, comment_id: str) -> bool:
+        """任务下是否有该评论（未删除）"""
+        log = await self._load(plan_id)
+        if comment_id in log.deleted:
+            return False
+        return any(comment.id == comment_id for comment in log.by_task.get(task_id, []))
+
+    async def page(
+        self,
+        plan_id: str,
+        task: Task,
+        cursor: Optional[str] = None,
+        limit: Optional[int] = None
+    ) -> Tuple[List[Comment], Optional[str], int]:
+        """按时间顺序分页读取任务的评论，返回(评论, 下一页游标, 总数)
+
+        游标是上一页返回的不透明字符串，非法时抛出ValueError。旧数据中仍嵌套在任务里的评论排在最前面。
+        """
+        log = await self._load(plan_id)
+        stored = log.by_task.get(task.id, [])
+        entries = task.comments + stored if task.comments else stored
+        try:
+            start = int(cursor) if cursor else 0
+        except ValueError:
+            raise ValueError(f"无效的游标: {cursor}")
+        if start < 0 or start > len(entries):
+            raise ValueError(f"无效的游标: {cursor}")
+
+        result = []
+        position = start
+        while position < len(entries) and (limit is None or len(result) < limit):
+            if entries[position].id not in log.deleted:
+                result.append(entries[position])
+            position += 1
+        # 跳过末尾已删除的评论，避免返回一个没有内容的下一页
+        while position < len(entries) and entries[position].id in log.deleted:
+            position += 1
+        next_cursor = str(position) if position < len(entries) else None
+        total = len(entries) - sum(1 for comment in entries if comment.id in log.deleted) if log.deleted else len(entries)
+        return result, next_cursor, total
+
+    async def attach(self, plan: Plan, mode: CommentMode = CommentMode.ALL, limit: int = 3) -> Plan:
+        """返回带评论的计划副本（ALL为全部评论，LATEST为每个任务最新limit条，NONE为不带评论）
+
+        不修改传入的计划；没有需要附带的评论时直接返回原计划。
+        """
+        if mode == CommentMode.NONE:
+            if not any(task.comments for task in plan.tasks):
+                return plan
+            return plan.model_copy(update={"tasks": [
+                task.model_copy(update={"comments": []}) if task.comments else task for task in plan.tasks
+            ]})
+
+        log = await self._load(plan.id)
+        if not log.by_task and mode == CommentMode.ALL:
+            return plan
+        tasks = [self._attach_task(log, task, mode, limit) for task in plan.tasks]
+        if all(new is old for new, old in zip(tasks, plan.tasks)):
+            return plan
+        return plan.model_copy(update={"tasks": tasks})
+
+    async def attach_tasks(self, plan_id: str, tasks: List[Task], mode: CommentMode = CommentMode.ALL, limit: int = 3) -> List[Task]:
+        """为同一计划下的一组任务附带评论（规则同attach）"""
+        if mode == CommentMode.NONE:
+            return [task.model_copy(update={"comments": []}) if task.comments else task for task in tasks]
+        log = await self._load(plan_id)
+        return [self._attach_task(log, task, mode, limit) for task in tasks]
+
+    @staticmethod
+    def _attach_task(log: CommentLog, task: Task, mode: CommentMode, limit: int) -> Task:
+        if task.id not in log.by_task:
+            if mode == CommentMode.LATEST and len(task.comments) > limit:
+                return task.model_copy(update={"comments": task.comments[-limit:]})
+            return task
+        if mode == CommentMode.LATEST:
+            comments = log.latest(task.id, limit)
+            if len(comments) < limit and task.comments:
+                comments = (task.comments + comments)[-limit:]
+        else:
+            comments = task.comments + log.live(task.id)
+        return task.model_copy(update={"comments": comments})
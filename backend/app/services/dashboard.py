@@ -0,0 +1,165 @@
+from collections import deque
+from datetime import datetime
+from typing import Deque, Dict, Iterable, Mapping, Optional, Tuple
+from uuid import uuid4
+
+from ..models.schemas import Dashboard, Plan, PlanProgress, Task, TaskChange, TaskStatus
+from ..config import settings
+
+# 可以开始的任务状态（与下一步任务一致）
+READY_STATUSES = (TaskStatus.PENDING, TaskStatus.NEED_FIXED)
+
+def _completion(complete: int, total: int) -> float:
+    return round(complete * 100 / total, 1) if total else 0.0
+
+def summarize_plan(plan: Plan) -> PlanProgress:
+    """计算单个计划的进度汇总（线性时间）
+
+    可以开始的任务与下一步任务的规则相同：待处理或需修复、未被认领、依赖（任务ID或标题）都已完成，
+    找不到的依赖视为已满足。
+    """
+    counts = {status.value: 0 for status in TaskStatus}
+    # 依赖引用 -> 状态，任务ID优先于标题（同TaskIndex.resolve）
+    status_by_ref: Dict[str, TaskStatus] = {}
+    for task in plan.tasks:
+        counts[task.status.value] += 1
+        status_by_ref.setdefault(task.title, task.status)
+    for task in plan.tasks:
+        status_by_ref[task.id] = task.status
+
+    ready = 0
+    for task in plan.tasks:
+        if task.status in READY_STATUSES and task.lease is None and all(
+            status_by_ref.get(dependency, TaskStatus.COMPLETE) == TaskStatus.COMPLETE for dependency in task.dependencies
+        ):
+            ready += 1
+
+    return PlanProgress(
+        plan_id=plan.id,
+        name=plan.name,
+        description=plan.description,
+        task_count=len(plan.tasks),
+        status_counts=counts,
+        completion=_completion(counts[TaskStatus.COMPLETE.value], len(plan.tasks)),
+        ready_count=ready,
+        updated_at=plan.updated_at or plan.created_at
+    )
+
+class DashboardAggregates:
+    """所有计划的进度汇总，随存储发布的快照增量维护
+
+    每个计划的汇总与计算它的计划对象一起缓存，全局计数是各计划汇总之和。本进程提交写事务后
+    只重新汇总被修改的计划、去掉被删除的计划，并从全局计数中减去旧汇总、加上新汇总，同时对比
+    新旧任务记录最近变化的任务。其他进程改写文件导致整体重新加载时只记下新的计划，第一次读取
+    仪表盘或本进程下一次提交时再汇总（计划对象没有变化的直接复用）。读取时直接返回维护好的计数，不遍历计划和任务。
+    """
+
+    def __init__(self):
+        # 每次汇总变化时递增，与实例标识一起作为ETag
+        self.version = 0
+        self._instance = uuid4().hex[:8]
+        self._summaries: Dict[str, Tuple[Plan, PlanProgress]] = {}
+        self._status_counts = {status.value: 0 for status in TaskStatus}
+        self._task_count = 0
+        self._ready_count = 0
+        self._recent: Deque[TaskChange] = deque(maxlen=settings.DASHBOARD_RECENT_LIMIT)
+        # 整体重新加载后尚未汇总的计划
+        self._pending: Optional[Mapping[str, Plan]] = None
+
+    def reload(self, plans: Mapping[str, Plan]) -> None:
+        """存储重新读取了全部计划（延迟到读取仪表盘时汇总）"""
+        self._pending = plans
+
+    def apply(self, changed: Mapping[str, Plan], deleted: Iterable[str]) -> None:
+        """本进程提交了写事务：只更新被修改和删除的计划
+
+        还有尚未汇总的重新加载时先汇总它（即本次事务所基于的快照），再与之对比记录最近变化。
+        """
+        self._refresh()
+        for plan_id in deleted:
+            self._remove(plan_id)
+        for plan in changed.values():
+            self._update(plan, track_new=True)
+        self.version += 1
+
+    def etag(self, current_plan_id: Optional[str]) -> str:
+        self._refresh()
+        return f'W/"{self._instance}-{self.version}-{current_plan_id or ""}"'
+
+    def snapshot(self, current_plan_id: Optional[str] = None, include_plans: bool = True) -> Dashboard:
+        """当前的汇总结果，include_plans为False时不包含各计划的汇总（与计划数无关）"""
+        self._refresh()
+        return Dashboard(
+            version=self.version,
+            current_plan_id=current_plan_id,
+            plan_count=len(self._summaries),
+            task_count=self._task_count,
+            status_counts=dict(self._status_counts),
+            completion=_completion(self._status_counts[TaskStatus.COMPLETE.value], self._task_count),
+            ready_count=self._ready_count,
+            plans=[summary for _, summary in self._summaries.values()] if include_plans else [],
+            recent_tasks=list(self._recent)
+        )
+
+    def _refresh(self) -> None:
+        plans = self._pending
+        if plans is None:
+            return
+        self._pending = None
+        changed = False
+        for plan_id in [plan_id for plan_id in self._summaries if plan_id not in plans]:
+            self._remove(plan_id)
+            changed = True
+        for plan in plans.values():
+            cached = self._summaries.get(plan.id)
+            if cached is None or cached[0] is not plan:
+                # 首次加载的计划不计入最近变化
+                self._update(plan, track_new=False)
+                changed = True
+        if changed:
+            self.version += 1
+
+    def _update(self, plan: Plan, track_new: bool) -> None:
+        old = self._summaries.get(plan.id)
+        progress = summarize_plan(plan)
+        if old is not None:
+            self._count(old[1], -1)
+            self._record_changes(old[0], plan)
+        elif track_new:
+            self._record_changes(None, plan)
+        self._count(progress, 1)
+        self._summaries[plan.id] = (plan, progress)
+
+    def _remove(self, plan_id: str) -> None:
+        old = self._summaries.pop(plan_id, None)
+        if old is not None:
+            self._count(old[1], -1)
+
+    def _count(self, progress: PlanProgress, sign: int) -> None:
+        self._task_count += sign * progress.task_count
+        self._ready_count += sign * progress.ready_count
+        for status, count in progress.status_counts.items():
+            self._status_counts[status] += sign * count
+
+    def _record_changes(self, old: Optional[Plan], new: Plan) -> None:
+        """对比新旧计划的任务，记录新增、修改和删除的任务"""
+        before: Dict[str, Task] = {task.id: task for task in old.tasks} if old is not None else {}
+        now = datetime.now()
+        for task in new.tasks:
+            previous = before.pop(task.id, None)
+            if previous is None:
+                change, changed_at = "created", task.created_at
+            elif (previous.status, previous.title, previous.updated_at) != (task.status, task.title, task.updated_at):
+                change, changed_at = "updated", task.updated_at or now
+            else:
+                continue
+            self._recent.appendleft(TaskChange(
+                plan_id=new.id, plan_name=new.name, task_id=task.id, title=task.title, change=change,
+                status=task.status, previous_status=previous.status if previous is not None else None,
+                changed_at=changed_at
+            ))
+        for task in before.values():
+            self._recent.appendleft(TaskChange(
+                plan_id=new.id, plan_name=new.name, task_id=task.id, title=task.title, change="deleted",
+                status=task.status, changed_at=now
+            ))
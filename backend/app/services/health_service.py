@@ -0,0 +1,83 @@
+from datetime import datetime
+from typing import Dict, Optional
+import asyncio
+import logging
+import sys
+import time
+
+from ..models.schemas import HealthStatus, ReadinessStatus
+from ..utils.workspace import list_workspaces, workspace_data_dir
+from .plan_store import get_plan_store
+from .job_service import get_job_service
+
+# 设置日志
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class WarmupState:
+    """进程预热状态
+
+    服务启动时不在startup事件中同步加载数据，而是立即开始监听端口（存活检查可以马上
+    通过），预热在后台执行：加载计划数据到缓存、启动后台任务队列。全部完成后就绪检查
+    才返回200，负载均衡和启动脚本据此判断何时可以转发请求。模型客户端不在预热范围内，
+    第一次解析时才导入。
+    """
+
+    def __init__(self):
+        self.started_at = datetime.now()
+        self._started = time.monotonic()
+        self.ready_after: Optional[float] = None
+        self.error: Optional[str] = None
+        # 各预热步骤的耗时（毫秒）
+        self.steps: Dict[str, float] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.ready_after is not None
+
+    def start(self) -> None:
+        """在后台开始预热（重复调用无效）"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._warm_up())
+
+    async def _step(self, name: str, coroutine) -> None:
+        began = time.monotonic()
+        await coroutine
+        self.steps[name] = round((time.monotonic() - began) * 1000, 1)
+
+    async def _warm_up(self) -> None:
+        try:
+            store = get_plan_store()
+            await self._step("load_plans", store.load_plans())
+            await self._step("migrate_comments", store.migrate_comments())
+            await self._step("load_current_plan", store.load_current_plan_id())
+            # 各工作区的任务队列都要启动，才能恢复上次未执行完的任务
+            await self._step("job_service", asyncio.gather(*(
+                get_job_service(workspace_data_dir(workspace)).start() for workspace in list_workspaces()
+            )))
+        except Exception as e:
+            self.error = str(e)
+            logger.error(f"服务预热失败: {e}", exc_info=True)
+            return
+        self.ready_after = time.monotonic() - self._started
+        logger.info(f"服务预热完成，用时 {self.ready_after * 1000:.0f}ms")
+
+    def health(self) -> HealthStatus:
+        return HealthStatus(
+            status="ok",
+            started_at=self.started_at,
+            uptime_seconds=round(time.monotonic() - self._started, 3)
+        )
+
+    def readiness(self) -> ReadinessStatus:
+        return ReadinessStatus(
+            ready=self.ready,
+            error=self.error,
+            warmup_ms=round(self.ready_after * 1000, 1) if self.ready else None,
+            steps=dict(self.steps),
+            parser_loaded="app.agents.plan_parser" in sys.modules
+        )
+
+# 进程内共享的预热状态
+warmup_state = WarmupState()
@@ -0,0 +1,146 @@
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+import json
+import logging
+
+import aiofiles
+
+from ..models.schemas import Plan, PlanRevision
+from ..utils.file_handler import file_signature
+from ..utils import json_delta
+from ..config import settings
+
+# 设置日志
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class HistoryService:
+    """计划修订历史，每个计划一个追加写入的JSONL文件
+
+    每行是一个修订记录，第N行即第N个修订。记录默认保存相对上一修订的差异，
+    每隔HISTORY_SNAPSHOT_INTERVAL个修订（或差异比完整数据还大时）保存一次完整快照，
+    因此重建任意修订最多只需回放一个快照间隔内的差异。
+    """
+
+    def __init__(self, data_dir: Path):
+        self.history_dir = Path(data_dir) / settings.HISTORY_DIR
+        self.snapshot_interval = max(1, settings.HISTORY_SNAPSHOT_INTERVAL)
+        # plan_id -> (文件签名, 最新修订号, 最新修订的数据)
+        self._latest: Dict[str, Tuple[Any, int, Dict[str, Any]]] = {}
+
+    def _history_path(self, plan_id: str) -> Path:
+        return self.history_dir / f"{plan_id}.jsonl"
+
+    async def _read_records(self, plan_id: str) -> List[str]:
+        """读取计划的所有修订记录（未解析的原始行）"""
+        path = self._history_path(plan_id)
+        if not path.exists():
+            return []
+        async with aiofiles.open(path, 'r', encoding='utf-8') as f:
+            content = await f.read()
+        return [line for line in content.split("\n") if line]
+
+    @staticmethod
+    def _replay(lines: List[str], revision: int) -> Optional[Dict[str, Any]]:
+        """从目标修订之前最近的快照开始回放差异"""
+        if revision < 1 or revision > len(lines):
+            return None
+        records = []
+        for line in reversed(lines[:revision]):
+            record = json.loads(line)
+            records.append(record)
+            if record["type"] == "snapshot":
+                break
+        state = None
+        for record in reversed(records):
+            if record["type"] == "snapshot":
+                state = record["data"]
+            else:
+                state = json_delta.apply(state, record["data"])
+        return state
+
+    async def _latest_state(self, plan_id: str) -> Tuple[int, Optional[Dict[str, Any]]]:
+        """获取最新修订号和数据，文件被其他进程追加过时重新读取"""
+        signature = file_signature(self._history_path(plan_id))
+        cached = self._latest.get(plan_id)
+        if cached and cached[0] == signature:
+            return cached[1], cached[2]
+        lines = await self._read_records(plan_id)
+        state = self._replay(lines, len(lines))
+        self._latest[plan_id] = (signature, len(lines), state)
+        return len(lines), state
+
+    async def record(self, plan: Plan) -> int:
+        """记录计划的新修订，返回修订号；内容与上一修订相同时不产生新修订
+
+        调用方需持有存储的写锁，保证修订号在多个进程间连续。
+        """
+        state = plan.model_dump(mode="json")
+        latest_revision, latest_state = await self._latest_state(plan.id)
+        revision = latest_revision + 1
+
+        record_type, data = "snapshot", state
+        if latest_state is not None and (revision - 1) % self.snapshot_interval != 0:
+            ops = json_delta.diff(latest_state, state)
+            if not ops:
+                return latest_revision
+            if len(json.dumps(ops, ensure_ascii=False)) < len(json.dumps(state, ensure_ascii=False)):
+                record_type, data = "delta", ops
+
+        line = json.dumps({
+            "revision": revision,
+            "type": record_type,
+            "created_at": datetime.now().isoformat(),
+            "data": data
+        }, ensure_ascii=False)
+
+        path = self._history_path(plan.id)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        async with aiofiles.open(path, 'a', encoding='utf-8') as f:
+            await f.write(line + "\n")
+
+        self._latest[plan.id] = (file_signature(path), revision, state)
+        return revision
+
+    def drop(self, plan_id: str) -> None:
+        """删除计划的修订历史"""
+        self._latest.pop(plan_id, None)
+        self._history_path(plan_id).unlink(missing_ok=True)
+
+    async def latest_revision(self, plan_id: str) -> int:
+        """获取计划的最新修订号，没有历史时返回0"""
+        revision, _ = await self._latest_state(plan_id)
+        return revision
+
+    async def list_revisions(self, plan_id: str) -> List[PlanRevision]:
+        """列出计划的所有修订"""
+        revisions = []
+        for line in await self._read_records(plan_id):
+            record = json.loads(line)
+            revisions.append(PlanRevision(
+                revision=record["revision"],
+                type=record["type"],
+                created_at=record["created_at"],
+                changes=len(record["data"]) if record["type"] == "delta" else None
+            ))
+        return revisions
+
+    async def get_revision_data(self, plan_id: str, revision: int) -> Optional[Dict[str, Any]]:
+        """重建计划在指定修订时的数据"""
+        lines = await self._read_records(plan_id)
+        return self._replay(lines, revision)
+
+    async def get_revision(self, plan_id: str, revision: int) -> Optional[Plan]:
+        """获取计划在指定修订时的内容"""
+        data = await self.get_revision_data(plan_id, revision)
+        return Plan.model_validate(data) if data is not None else None
+
+    async def diff_revisions(self, plan_id: str, from_revision: int, to_revision: int) -> Optional[List[Dict[str, Any]]]:
+        """比较两个修订，返回从from_revision到to_revision的差异操作"""
+        lines = await self._read_records(plan_id)
+        old = self._replay(lines, from_revision)
+        new = self._replay(lines, to_revision)
+        if old is None or new is None:
+            return None
+        return json_delta.diff(old, new)
@@ -0,0 +1,324 @@
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Mapping, Optional, Set, Tuple
+import asyncio
+import json
+import logging
+import time
+
+from ..models.schemas import IntegrityIssue, IntegrityReport, Plan, Task
+from ..utils.file_handler import load_json, save_json, datetime_parser, write_bytes_atomic
+from ..config import settings
+from ..utils.workspace import workspace_data_dir
+from .plan_store import PlanStore, PlanTransaction, get_plan_store
+
+# 设置日志
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# 每检查多少个任务让出一次
+BATCH_TASKS = 200
+# 前台繁忙时最多连续等待的秒数，请求持续不断时检查仍能缓慢推进
+MAX_BUSY_WAIT = 5.0
+BUSY_POLL = 0.05
+# 超过该时间（秒）的临时文件视为写入中断后遗留的文件
+STALE_TEMP_AGE = 3600
+
+# 可以修复的问题（其余只报告）
+FIXABLE = {
+    "unloadable_plan", "unverified_plans_file", "invalid_dependency", "comment_count_mismatch",
+    "orphaned_current_plan", "orphaned_comment_log", "comment_log_garbage", "orphaned_history", "stale_temp_file"
+}
+
+class Throttle:
+    """后台检查的节流：每处理一批数据暂停一段时间，前台有请求正在处理时继续等待"""
+
+    def __init__(self, busy: Optional[Callable[[], bool]] = None):
+        self.busy = busy
+        self._processed = 0
+
+    async def pause(self, amount: int = 1) -> None:
+        self._processed += amount
+        if self._processed < BATCH_TASKS:
+            return
+        self._processed = 0
+        await asyncio.sleep(settings.INTEGRITY_THROTTLE_MS / 1000)
+        waited = 0.0
+        while self.busy is not None and self.busy() and waited < MAX_BUSY_WAIT:
+            await asyncio.sleep(BUSY_POLL)
+            waited += BUSY_POLL
+
+def _invalid_dependencies(task: Task, task_ids: Set[str]) -> Tuple[List[str], List[str]]:
+    """返回(修复后的依赖列表, 问题描述)：去掉不存在的任务、自身和重复的依赖"""
+    cleaned = []
+    problems = []
+    for dependency in task.dependencies:
+        if dependency == task.id:
+            problems.append("依赖自身")
+        elif dependency not in task_ids:
+            problems.append(f"依赖不存在的任务 {dependency}")
+        elif dependency in cleaned:
+            problems.append(f"重复依赖 {dependency}")
+        else:
+            cleaned.append(dependency)
+    return cleaned, problems
+
+class IntegrityService:
+    """存储完整性检查与压缩
+
+    定期检查一个数据目录（工作区）中的数据，发现并修复长期运行后积累的问题：
+    plans.json中无法加载的计划（移到quarantine目录）、不存在的依赖、与评论存储不一致的评论数、
+    指向不存在计划的当前计划指针、已删除计划遗留的评论日志和修订历史、中断写入遗留的临时文件；
+    同时压缩评论日志（去掉已删除的评论），重写缺少校验元数据的plans.json以恢复快速加载。
+
+    检查分两步：先在当前快照上不加锁地扫描（节流，不影响前台请求），只有发现问题时才在
+    存储事务中（持有文件锁）重新确认并修复有问题的计划，持锁时间只与问题数量有关。
+    结果保存在integrity.json中，所有worker进程都可以读取。
+    """
+
+    def __init__(self, data_dir: Path, store: PlanStore):
+        self.data_dir = Path(data_dir)
+        self.store = store
+        self.quarantine_dir = self.data_dir / settings.QUARANTINE_DIR
+        self.report_path = self.data_dir / settings.INTEGRITY_REPORT_FILE
+        self._lock = asyncio.Lock()
+
+    async def last_report(self) -> Optional[IntegrityReport]:
+        """最近一次检查的结果（可能来自其他进程），从未检查过时返回None"""
+        data = await load_json(self.report_path)
+        return IntegrityReport(**datetime_parser(data)) if data else None
+
+    async def check(self, repair: bool = True, busy: Optional[Callable[[], bool]] = None) -> IntegrityReport:
+        """检查（repair为True时修复）存储并保存结果；busy返回True时表示前台繁忙，扫描会让出"""
+        async with self._lock:
+            began = time.monotonic()
+            report = IntegrityReport(started_at=datetime.now(), repair=repair)
+            plans = await self.store.load_plans()
+            current_plan_id = await self.store.load_current_plan_id()
+            issues = await self._inspect(plans, current_plan_id, report, throttle=Throttle(busy))
+
+            if repair and any(issue.kind in FIXABLE for issue in issues):
+                flagged = {issue.plan_id for issue in issues if issue.plan_id and issue.task_id}
+                sizes = self._comment_log_sizes()
+                async with self.store.transaction() as tx:
+                    issues = await self._inspect(tx.plans, tx.current_plan_id, report, tx=tx, plan_ids=flagged)
+                after = self._comment_log_sizes()
+                report.reclaimed_bytes += sum(size - after.get(plan_id, 0) for plan_id, size in sizes.items())
+
+            report.issues = issues
+            report.file_sizes = await asyncio.to_thread(self._file_sizes)
+            report.finished_at = datetime.now()
+            report.duration_ms = round((time.monotonic() - began) * 1000, 1)
+            await save_json(self.report_path, report.model_dump(mode="json"))
+            if issues:
+                logger.info(f"完整性检查（{self.data_dir}）发现 {len(issues)} 个问题")
+            return report
+
+    async def _inspect(
+        self,
+        plans: Mapping[str, Plan],
+        current_plan_id: Optional[str],
+        report: IntegrityReport,
+        tx: Optional[PlanTransaction] = None,
+        plan_ids: Optional[Set[str]] = None,
+        throttle: Optional[Throttle] = None
+    ) -> List[IntegrityIssue]:
+        """检查计划和存储文件；传入事务时修复发现的问题（plan_ids限定需要检查任务的计划）"""
+        issues: List[IntegrityIssue] = []
+        issues.extend(await self._inspect_plans_file(plans, tx))
+
+        if plan_ids is None:
+            report.plans_checked = len(plans)
+            report.tasks_checked = sum(len(plan.tasks) for plan in plans.values())
+        for plan_id in (plans if plan_ids is None else [plan_id for plan_id in plan_ids if plan_id in plans]):
+            issues.extend(await self._inspect_plan(plans[plan_id], tx))
+            if throttle is not None:
+                await throttle.pause(len(plans[plan_id].tasks) + 1)
+
+        if current_plan_id is not None and current_plan_id not in plans:
+            issues.append(IntegrityIssue(
+                kind="orphaned_current_plan", plan_id=current_plan_id,
+                detail="当前计划指针指向不存在的计划", action="repaired" if tx else None
+            ))
+            if tx is not None:
+                tx.set_current_plan_id(None)
+
+        issues.extend(await self._inspect_comment_logs(plans, tx))
+        issues.extend(self._inspect_history(plans, tx))
+        issues.extend(await asyncio.to_thread(self._inspect_temp_files, tx is not None))
+        return issues
+
+    async def _inspect_plans_file(self, plans: Mapping[str, Plan], tx: Optional[PlanTransaction]) -> List[IntegrityIssue]:
+        """plans.json中无法加载的计划（存储加载时只记录日志并跳过）和缺少校验元数据的文件"""
+        try:
+            raw = await asyncio.to_thread(self.store.read_raw_plans)
+        except ValueError as e:
+            return [IntegrityIssue(kind="corrupt_plans_file", detail=f"plans.json不是有效的JSON: {e}")]
+
+        issues = []
+        for plan_id, plan_data in raw.items():
+            if plan_id in plans:
+                continue
+            try:
+                Plan(**datetime_parser(plan_data))
+                detail = "计划没有被加载"
+            except Exception as e:
+                detail = f"计划无法加载: {str(e)[:200]}"
+            issues.append(IntegrityIssue(
+                kind="unloadable_plan", plan_id=plan_id, detail=detail, action="quarantined" if tx else None
+            ))
+            if tx is not None:
+                await asyncio.to_thread(self._quarantine, plan_id, plan_data)
+                tx.rewrite = True
+
+        if raw and not await asyncio.to_thread(self.store.file_trusted):
+            issues.append(IntegrityIssue(
+                kind="unverified_plans_file",
+                detail="plans.json与校验元数据不匹配（手动修改或旧版本写出），加载时需要完整校验",
+                action="rewritten" if tx else None
+            ))
+            if tx is not None:
+                tx.rewrite = True
+        return issues
+
+    def _quarantine(self, plan_id: str, plan_data: Any) -> Path:
+        """把无法加载的计划原样保存到quarantine目录"""
+        path = self.quarantine_dir / f"{plan_id}.{datetime.now().strftime('%Y%m%d%H%M%S')}.json"
+        write_bytes_atomic(path, json.dumps(plan_data, ensure_ascii=False, indent=2).encode("utf-8"))
+        logger.warning(f"无法加载的计划 {plan_id} 已移到 {path}")
+        return path
+
+    async def _inspect_plan(self, plan: Plan, tx: Optional[PlanTransaction]) -> List[IntegrityIssue]:
+        """检查计划中的任务：重复的任务ID、无效的依赖、评论数"""
+        issues = []
+        action = "repaired" if tx else None
+        task_ids: Set[str] = set()
+        for task in plan.tasks:
+            if task.id in task_ids:
+                issues.append(IntegrityIssue(
+                    kind="duplicate_task_id", plan_id=plan.id, task_id=task.id, detail="计划中有多个任务使用同一ID"
+                ))
+            task_ids.add(task.id)
+
+        counts = await self.store.comments.live_counts(plan.id)
+        # (任务下标, 字段, 修复后的值)
+        fixes: List[Tuple[int, str, Any]] = []
+        for position, task in enumerate(plan.tasks):
+            dependencies, problems = _invalid_dependencies(task, task_ids)
+            if problems:
+                issues.append(IntegrityIssue(
+                    kind="invalid_dependency", plan_id=plan.id, task_id=task.id, detail="；".join(problems), action=action
+                ))
+                fixes.append((position, "dependencies", dependencies))
+            expected = len(task.comments) + counts.get(task.id, 0)
+            if task.comment_count != expected:
+                issues.append(IntegrityIssue(
+                    kind="comment_count_mismatch", plan_id=plan.id, task_id=task.id,
+                    detail=f"评论数为 {task.comment_count}，实际有 {expected} 条评论", action=action
+                ))
+                fixes.append((position, "comment_count", expected))
+
+        if tx is not None and fixes:
+            # 维护性修复，不修改updated_at（自动归档依据它判断计划是否长时间未更新）
+            edited = tx.edit(plan.id)
+            for position, field, value in fixes:
+                setattr(edited.tasks[position], field, value)
+        return issues
+
+    async def _inspect_comment_logs(self, plans: Mapping[str, Plan], tx: Optional[PlanTransaction]) -> List[IntegrityIssue]:
+        """已删除计划遗留的评论日志，以及包含已删除评论（或已删除任务的评论）、可以压缩的评论日志"""
+        issues = []
+        for plan_id in self.store.comments.plan_ids():
+            if plan_id not in plans:
+                issues.append(IntegrityIssue(
+                    kind="orphaned_comment_log", plan_id=plan_id, detail="计划已不存在，评论日志仍然保留",
+                    action="removed" if tx else None
+                ))
+                if tx is not None:
+                    tx.comment_ops.append(("clear", plan_id, None, None))
+                continue
+            task_ids = {task.id for task in plans[plan_id].tasks}
+            garbage = await self.store.comments.garbage(plan_id, task_ids)
+            if garbage:
+                issues.append(IntegrityIssue(
+                    kind="comment_log_garbage", plan_id=plan_id,
+                    detail=f"评论日志中有 {garbage} 条已删除的评论或已删除任务的评论", action="compacted" if tx else None
+                ))
+                if tx is not None:
+                    tx.comment_ops.append(("compact", plan_id, None, task_ids))
+        return issues
+
+    def _inspect_history(self, plans: Mapping[str, Plan], tx: Optional[PlanTransaction]) -> List[IntegrityIssue]:
+        """已删除（且没有归档）计划遗留的修订历史"""
+        history_dir = self.store.history.history_dir
+        if not history_dir.is_dir():
+            return []
+        issues = []
+        for path in history_dir.glob("*.jsonl"):
+            plan_id = path.stem
+            if plan_id in plans or self.store.archive.contains(plan_id):
+                continue
+            issues.append(IntegrityIssue(
+                kind="orphaned_history", plan_id=plan_id, detail=f"计划已不存在，修订历史仍占用 {path.stat().st_size} 字节",
+                action="removed" if tx else None
+            ))
+            if tx is not None:
+                # 与评论操作一样在事务提交时执行，事务失败时不删除
+                tx.history_dropped.add(plan_id)
+        return issues
+
+    def _inspect_temp_files(self, remove: bool) -> List[IntegrityIssue]:
+        """写入中断后遗留的临时文件（数据目录及其子目录，不含其他工作区）"""
+        issues = []
+        now = time.time()
+        for path in list(self.data_dir.glob(".*.tmp")) + list(self.data_dir.glob("*/.*.tmp")):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            if now - stat.st_mtime < STALE_TEMP_AGE:
+                continue
+            issues.append(IntegrityIssue(
+                kind="stale_temp_file", detail=str(path.relative_to(self.data_dir)), action="removed" if remove else None
+            ))
+            if remove:
+                path.unlink(missing_ok=True)
+        return issues
+
+    def _comment_log_sizes(self) -> Dict[str, int]:
+        sizes = {}
+        for plan_id in self.store.comments.plan_ids():
+            try:
+                sizes[plan_id] = (self.store.comments.comments_dir / f"{plan_id}.jsonl").stat().st_size
+            except FileNotFoundError:
+                pass
+        return sizes
+
+    def _file_sizes(self) -> Dict[str, int]:
+        """各类存储文件的总大小"""
+        def size_of(path: Path) -> int:
+            if path.is_file():
+                return path.stat().st_size
+            if path.is_dir():
+                return sum(child.stat().st_size for child in path.rglob("*") if child.is_file())
+            return 0
+
+        return {
+            "plans": size_of(self.store.plans_file_path),
+            "comments": size_of(self.store.comments.comments_dir),
+            "history": size_of(self.store.history.history_dir),
+            "archive": size_of(self.store.archive.archive_dir),
+            "quarantine": size_of(self.quarantine_dir),
+        }
+
+# 每个数据目录在进程内共享一个完整性检查服务
+_services: Dict[Path, IntegrityService] = {}
+
+def get_integrity_service(data_dir: Optional[Path] = None) -> IntegrityService:
+    """获取数据目录（默认为当前工作区的数据目录）对应的完整性检查服务"""
+    path = Path(data_dir or workspace_data_dir()).resolve()
+    service = _services.get(path)
+    if service is None:
+        service = IntegrityService(path, get_plan_store(path))
+        _services[path] = service
+    return service
@@ -0,0 +1,229 @@
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional
+import asyncio
+import logging
+import os
+
+from ..models.schemas import Job, JobStatus, TextToPlan
+from ..utils.file_handler import load_json, save_json, datetime_parser, FileLock
+from ..config import settings
+from ..utils.workspace import workspace_data_dir
+from .plan_service import PlanService
+
+# 设置日志
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# 等待其他进程执行的任务时轮询任务文件的间隔（秒）
+POLL_INTERVAL = 0.5
+
+def _process_alive(pid: Optional[int]) -> bool:
+    if not pid:
+        return False
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+class JobService:
+    """文本转计划的后台任务队列
+
+    提交后立即返回任务，由固定数量的worker协程依次执行解析，HTTP连接不必等待模型返回。
+    每个任务单独保存为jobs/<id>.json，服务重启后由新进程恢复未完成的任务
+    （多worker进程时通过文件锁保证每个任务只被一个进程恢复）。
+    取消排队中的任务直接生效；取消执行中的任务会中断本进程内的执行，
+    若任务在其他进程执行，该进程完成解析后发现已取消会丢弃结果。
+    """
+
+    def __init__(self, data_dir: Path):
+        self.data_dir = Path(data_dir)
+        self.jobs_dir = self.data_dir / settings.JOB_DIR
+        self._lock = FileLock(self.jobs_dir / ".jobs.lock")
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        # 本进程正在执行的任务及其完成事件
+        self._running: Dict[str, asyncio.Task] = {}
+        self._done_events: Dict[str, asyncio.Event] = {}
+
+    def _job_path(self, job_id: str) -> Path:
+        return self.jobs_dir / f"{job_id}.json"
+
+    async def _save(self, job: Job) -> None:
+        await save_json(self._job_path(job.id), job.model_dump())
+
+    async def get(self, job_id: str) -> Optional[Job]:
+        """获取任务（任务ID非法或不存在时返回None）"""
+        path = self._job_path(job_id)
+        if path.parent != self.jobs_dir or not path.exists():
+            return None
+        data = await load_json(path)
+        return Job(**datetime_parser(data)) if data else None
+
+    async def list_jobs(self, status: Optional[JobStatus] = None, limit: int = 50) -> List[Job]:
+        """按创建时间倒序列出任务"""
+        jobs = []
+        for path in self.jobs_dir.glob("*.json"):
+            job = await self.get(path.stem)
+            if job and (status is None or job.status == status):
+                jobs.append(job)
+        jobs.sort(key=lambda job: job.created_at, reverse=True)
+        return jobs[:limit]
+
+    async def start(self) -> None:
+        """启动worker协程，并恢复上次未执行完的任务"""
+        if self._queue is not None:
+            return
+        self.jobs_dir.mkdir(parents=True, exist_ok=True)
+        self._queue = asyncio.Queue()
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(max(1, settings.JOB_WORKERS))]
+        await self._recover()
+
+    async def _recover(self) -> None:
+        """重新排队所属进程已经退出的未完成任务，并清理过期的已完成任务"""
+        expire_before = datetime.now() - timedelta(hours=settings.JOB_RETENTION_HOURS)
+        async with self._lock:
+            for path in self.jobs_dir.glob("*.json"):
+                try:
+                    job = await self.get(path.stem)
+                except Exception as e:
+                    logger.error(f"读取后台任务 {path.name} 失败: {e}")
+                    continue
+                if job is None:
+                    continue
+                if job.finished:
+                    if (job.finished_at or job.created_at) < expire_before:
+                        path.unlink(missing_ok=True)
+                    continue
+                if _process_alive(job.owner_pid):
+                    continue
+                logger.info(f"恢复未完成的后台任务 {job.id}")
+                job.status = JobStatus.QUEUED
+                job.owner_pid = os.getpid()
+                job.started_at = None
+                await self._save(job)
+                self._enqueue(job.id)
+
+    def _enqueue(self, job_id: str) -> None:
+        self._done_events.setdefault(job_id, asyncio.Event())
+        self._queue.put_nowait(job_id)
+
+    async def submit(self, request: TextToPlan) -> Job:
+        """提交文本转计划任务，立即返回排队中的任务"""
+        if self._queue is None:
+            await self.start()
+        job = Job(request=request, owner_pid=os.getpid())
+        await self._save(job)
+        self._enqueue(job.id)
+        return job
+
+    async def cancel(self, job_id: str) -> Optional[Job]:
+        """取消任务，已完成的任务保持不变；任务不存在时返回None"""
+        async with self._lock:
+            job = await self.get(job_id)
+            if job is None or job.finished:
+                return job
+            job.status = JobStatus.CANCELLED
+            job.finished_at = datetime.now()
+            await self._save(job)
+        running = self._running.get(job_id)
+        if running is not None:
+            running.cancel()
+        self._set_done(job_id)
+        return job
+
+    async def wait(self, job_id: str, timeout: float) -> Optional[Job]:
+        """等待任务完成（最多timeout秒），返回任务的最新状态"""
+        deadline = asyncio.get_running_loop().time() + timeout
+        while True:
+            job = await self.get(job_id)
+            remaining = deadline - asyncio.get_running_loop().time()
+            if job is None or job.finished or remaining <= 0:
+                return job
+            event = self._done_events.get(job_id)
+            try:
+                if event is not None:
+                    await asyncio.wait_for(event.wait(), remaining)
+                else:
+                    # 任务由其他进程执行，轮询任务文件
+                    await asyncio.sleep(min(POLL_INTERVAL, remaining))
+            except asyncio.TimeoutError:
+                pass
+
+    def _set_done(self, job_id: str) -> None:
+        event = self._done_events.pop(job_id, None)
+        if event is not None:
+            event.set()
+
+    async def _worker(self) -> None:
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run(job_id)
+            except Exception as e:
+                logger.error(f"执行后台任务 {job_id} 失败: {e}", exc_info=True)
+            finally:
+                self._queue.task_done()
+
+    async def _update(self, job_id: str, **changes) -> Optional[Job]:
+        """在锁内修改任务，任务已被取消（或已完成）时返回None"""
+        async with self._lock:
+            job = await self.get(job_id)
+            if job is None or job.finished:
+                return None
+            for key, value in changes.items():
+                setattr(job, key, value)
+            await self._save(job)
+            return job
+
+    async def _run(self, job_id: str) -> None:
+        job = await self._update(job_id, status=JobStatus.RUNNING, started_at=datetime.now(), owner_pid=os.getpid())
+        if job is None:
+            self._set_done(job_id)
+            return
+
+        plan_service = PlanService(self.data_dir)
+
+        # 使用解析失败时抛出异常的路径：失败的任务标记为FAILED，不保存计划
+        task = asyncio.create_task(plan_service.plan_parser.build_plan(job.request.text, job.request.name))
+        self._running[job_id] = task
+        try:
+            plan = await task
+        except asyncio.CancelledError:
+            if not task.cancelled():
+                raise
+            logger.info(f"后台任务 {job_id} 已取消")
+        except Exception as e:
+            await self._update(job_id, status=JobStatus.FAILED, error=str(e), finished_at=datetime.now())
+        else:
+            # 解析期间任务可能已被取消（包括在其他进程中取消），此时丢弃结果
+            async with self._lock:
+                latest = await self.get(job_id)
+                if latest is None or latest.finished:
+                    logger.info(f"后台任务 {job_id} 已取消，丢弃解析结果")
+                    return
+                await plan_service.save_parsed_plan(plan)
+                latest.status = JobStatus.SUCCEEDED
+                latest.plan_id = plan.id
+                latest.finished_at = datetime.now()
+                await self._save(latest)
+        finally:
+            self._running.pop(job_id, None)
+            self._set_done(job_id)
+
+# 每个数据目录在进程内共享一个任务队列
+_services: Dict[Path, JobService] = {}
+
+def get_job_service(data_dir: Optional[Path] = None) -> JobService:
+    """获取数据目录（默认为当前工作区的数据目录）对应的任务队列"""
+    path = Path(data_dir or workspace_data_dir()).resolve()
+    service = _services.get(path)
+    if service is None:
+        service = JobService(path)
+        _services[path] = service
+    return service
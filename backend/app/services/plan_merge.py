@@ -0,0 +1,186 @@
+"""
+增量重新解析的合并规则
+
+计划原文按段落划分（见utils.plan_text），每个由文本解析得到的任务记录所属段落的内容标识。
+修改原文后只解析内容有变化的段落，再把解析结果合并回已有计划：
+段落未变的任务原样保留；受影响的旧任务与新解析的任务先按标题、再按相似度一一配对，
+配对成功的任务保留ID、状态、评论和认领租约，只更新标题、描述和依赖；没有配对的旧任务删除，
+没有配对的新任务插入到所属段落之前的最后一个任务之后。
+"""
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence
+
+from ..models.schemas import Plan, PlanReparseResult, Task
+from ..utils.plan_text import section_key
+from .plan_store import PlanTransaction
+from .similarity_service import embed_task, embed_text, similarity_matrix
+
+def _normalize(text: str) -> str:
+    return " ".join(text.split()).lower()
+
+def attribute_sections(tasks: Sequence[Task], sections: Sequence[str]) -> None:
+    """为解析得到的任务设置所属段落
+
+    任务标题出现在段落中时归入该段落（从上一个任务所在段落开始向后查找，任务一般按原文顺序排列），
+    否则归入与任务标题和描述最相似的段落。
+    """
+    if not tasks or not sections:
+        return
+    keys = [section_key(section) for section in sections]
+    texts = [_normalize(section) for section in sections]
+    scores: Optional[List[List[float]]] = None
+    start = 0
+    for i, task in enumerate(tasks):
+        title = _normalize(task.title)
+        order = list(range(start, len(texts))) + list(range(start))
+        hit = next((j for j in order if title and title in texts[j]), None)
+        if hit is None:
+            if scores is None:
+                scores = similarity_matrix([embed_task(task) for task in tasks], [embed_text(section) for section in sections])
+            hit = max(range(len(sections)), key=scores[i].__getitem__)
+        task.source_section = keys[hit]
+        start = hit
+
+def match_tasks(candidates: Sequence[Task], parsed: Sequence[Task], threshold: float) -> Dict[int, Task]:
+    """为新解析的任务配对旧任务，返回{新任务下标: 旧任务}
+
+    先配对标题相同（忽略大小写和空白）的任务，其余按相似度从高到低贪心配对，相似度低于threshold的不配对。
+    """
+    matches: Dict[int, Task] = {}
+    by_title: Dict[str, List[Task]] = {}
+    for task in candidates:
+        by_title.setdefault(_normalize(task.title), []).append(task)
+    for i, task in enumerate(parsed):
+        same = by_title.get(_normalize(task.title))
+        if same:
+            matches[i] = same.pop(0)
+
+    matched_ids = {task.id for task in matches.values()}
+    rest_new = [i for i in range(len(parsed)) if i not in matches]
+    rest_old = [task for task in candidates if task.id not in matched_ids]
+    if not rest_new or not rest_old:
+        return matches
+    scores = similarity_matrix([embed_task(parsed[i]) for i in rest_new], [embed_task(task) for task in rest_old])
+    pairs = sorted(
+        ((score, a, b) for a, row in enumerate(scores) for b, score in enumerate(row) if score >= threshold),
+        key=lambda pair: (-pair[0], pair[1], pair[2])
+    )
+    used_new, used_old = set(), set()
+    for _, a, b in pairs:
+        if a in used_new or b in used_old:
+            continue
+        used_new.add(a)
+        used_old.add(b)
+        matches[rest_new[a]] = rest_old[b]
+    return matches
+
+def merge_reparsed(
+    tx: PlanTransaction,
+    plan: Plan,
+    sections: Sequence[str],
+    changed: int,
+    parsed: Sequence[Task],
+    notes: Sequence[str],
+    threshold: float
+) -> PlanReparseResult:
+    """把变化段落的解析结果合并到计划（plan必须是tx.edit得到的可修改副本）
+
+    parsed中的任务已经设置了所属段落，依赖是任务标题。计划没有原文时（不是由文本解析得到的），
+    全部任务都参与配对；否则只有所属段落已不在新文本中的任务参与配对，手动添加的任务（没有所属段落）保留。
+    """
+    keys = [section_key(section) for section in sections]
+    position: Dict[str, int] = {}
+    for i, key in enumerate(keys):
+        position.setdefault(key, i)
+    legacy = plan.source_text is None
+    candidates = [
+        task for task in plan.tasks
+        if legacy or (task.source_section is not None and task.source_section not in position)
+    ]
+    matches = match_tasks(candidates, parsed, threshold)
+    matched_ids = {task.id for task in matches.values()}
+    removed = [task for task in candidates if task.id not in matched_ids]
+    removed_ids = {task.id for task in removed}
+
+    # 依赖引用的标题 -> 任务ID：最终的标题，以及改名任务的旧标题
+    now = datetime.now()
+    title_to_id: Dict[str, str] = {}
+    renamed: Dict[str, str] = {}
+    updated = 0
+    results: List[Task] = []
+    for i, new in enumerate(parsed):
+        old = matches.get(i)
+        if old is None:
+            # 新任务中嵌套的评论移入评论存储
+            new.comment_count = len(new.comments)
+            for comment in new.comments:
+                tx.add_comment(plan.id, new.id, comment)
+            new.comments = []
+            results.append(new)
+            continue
+        if old.title != new.title:
+            renamed.setdefault(old.title, old.id)
+        if (old.title, old.description) != (new.title, new.description):
+            old.title = new.title
+            old.description = new.description
+            old.updated_at = now
+            updated += 1
+        old.source_section = new.source_section
+        old.dependencies = list(new.dependencies)
+        results.append(old)
+    for task in plan.tasks:
+        if task.id not in removed_ids:
+            title_to_id.setdefault(task.title, task.id)
+    for task in results:
+        title_to_id.setdefault(task.title, task.id)
+    for title, task_id in renamed.items():
+        title_to_id.setdefault(title, task_id)
+    removed_titles = {task.title for task in removed} - set(title_to_id)
+
+    # 保留原有任务的顺序，新任务插入到所属段落之前的最后一个任务之后
+    survivors = [task for task in plan.tasks if task.id not in removed_ids]
+    result_ids = {task.id for task in results}
+    tasks: List[Task] = []
+    task_positions: List[int] = []
+    last = -1
+    for task in survivors:
+        if task.id in result_ids:
+            # 配对成功的任务稍后与新任务一起按所属段落放置
+            continue
+        last = position.get(task.source_section, last) if task.source_section is not None else last
+        tasks.append(task)
+        task_positions.append(last)
+    for task in results:
+        at = position[task.source_section]
+        index = len(tasks)
+        while index > 0 and task_positions[index - 1] > at:
+            index -= 1
+        tasks.insert(index, task)
+        task_positions.insert(index, at)
+
+    for order, task in enumerate(tasks, 1):
+        task.order = order
+        dependencies = []
+        for dependency in task.dependencies:
+            if dependency in removed_ids or dependency in removed_titles:
+                continue
+            if task.id in result_ids or dependency in renamed:
+                dependency = title_to_id.get(dependency, dependency)
+            if dependency != task.id and dependency not in dependencies:
+                dependencies.append(dependency)
+        task.dependencies = dependencies
+    plan.tasks = tasks
+
+    for note in notes:
+        if note not in plan.notes:
+            plan.notes.append(note)
+
+    return PlanReparseResult(
+        plan=plan,
+        sections=len(sections),
+        changed_sections=changed,
+        tasks_added=len(parsed) - len(matches),
+        tasks_updated=updated,
+        tasks_removed=len(removed),
+        tasks_kept=len(tasks) - (len(parsed) - len(matches)) - updated
+    )
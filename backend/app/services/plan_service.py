@@ -1,58 +1,54 @@
-from datetime import datetime
-from typing import Dict, List, Optional, Union, Any
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Any
+import asyncio
 import logging
 
 from ..models.schemas import (
     Plan, PlanCreate, PlanUpdate,
     Task, TaskCreate, TaskUpdate, TaskStatusUpdate,
-    Comment, CommentCreate, CommentType,
-    CurrentPlan, TaskStatus
+    Comment, CommentCreate, CommentMode,
+    TaskStatus, PlanRevision, ArchivedPlanSummary, PlanAnalytics,
+    TaskLease, TaskClaim, TaskRelease, SimilarTask, Dashboard, PlanReparseResult
 )
-from ..utils.file_handler import load_json, save_json, datetime_parser
 from ..config import settings
-from ..agents.plan_parser import PlanParserAgent
+from .plan_store import get_plan_store, PlanTransaction
+from .analytics_service import analyze_plan
+from .similarity_service import DuplicateTaskError, embed_text
+from .plan_merge import attribute_sections, merge_reparsed
+from ..utils.plan_text import split_sections, changed_sections
 
 # 设置日志
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# 解析代理在第一次解析时才创建：导入openai客户端较慢，不应拖慢服务启动
+_plan_parser = None
+
+def get_plan_parser():
+    """获取进程内共享的计划解析代理（首次调用时导入并初始化模型客户端）"""
+    global _plan_parser
+    if _plan_parser is None:
+        from ..agents.plan_parser import PlanParserAgent
+        _plan_parser = PlanParserAgent()
+    return _plan_parser
+
 class PlanService:
     """计划管理服务，处理计划的CRUD操作"""
     
-    def __init__(self):
-        """初始化服务，确保数据目录存在"""
+    def __init__(self, data_dir: Optional[Path] = None):
+        """初始化服务，确保数据目录存在；data_dir为空时使用当前工作区的数据目录"""
         settings.ensure_data_dir()
-        self.plan_parser = PlanParserAgent()
+        self.store = get_plan_store(data_dir)
+
+    @property
+    def plan_parser(self):
+        """计划解析代理（延迟加载）"""
+        return get_plan_parser()
         
     async def _load_all_plans(self) -> Dict[str, Plan]:
-        """加载所有计划数据"""
-        # 加载JSON
-        data = await load_json(settings.plans_file_path)
-        
-        # 解析日期时间字符串
-        data = datetime_parser(data)
-        
-        # 转换为Plan对象字典
-        plans = {}
-        for plan_id, plan_data in data.items():
-            try:
-                # 创建Plan对象
-                plan = Plan(**plan_data)
-                plans[plan_id] = plan
-            except Exception as e:
-                logger.error(f"加载计划 {plan_id} 失败: {e}")
-        
-        return plans
-    
-    async def _save_all_plans(self, plans: Dict[str, Plan]) -> None:
-        """保存所有计划数据"""
-        # 转换为字典
-        data = {}
-        for plan_id, plan in plans.items():
-            data[plan_id] = plan.model_dump()
-        
-        # 保存到文件
-        await save_json(settings.plans_file_path, data)
+        """加载所有计划数据（文件未变化时使用进程内缓存）"""
+        return await self.store.load_plans()
         
     async def get_all_plans(self) -> List[Plan]:
         """获取所有计划"""
@@ -64,104 +60,119 @@ class PlanService:
         plans = await self._load_all_plans()
         return plans.get(plan_id)
     
+    async def with_comments(self, plan: Plan, mode: CommentMode = CommentMode.ALL, limit: int = 3) -> Plan:
+        """返回附带评论的计划（见CommentStore.attach），快照中的计划只保存评论数"""
+        return await self.store.comments.attach(plan, mode, limit)
+    
+    async def tasks_with_comments(
+        self, plan_id: str, tasks: List[Task], mode: CommentMode = CommentMode.ALL, limit: int = 3
+    ) -> List[Task]:
+        """返回附带评论的任务列表"""
+        return await self.store.comments.attach_tasks(plan_id, tasks, mode, limit)
+    
     async def create_plan(self, plan_data: PlanCreate) -> Plan:
         """创建新计划"""
-        # 加载现有计划
-        plans = await self._load_all_plans()
-        
         # 创建新计划
         plan = Plan(**plan_data.model_dump())
         
-        # 添加到计划字典
-        plans[plan.id] = plan
-        
-        # 保存
-        await self._save_all_plans(plans)
+        # 添加到计划字典并保存
+        async with self.store.transaction() as tx:
+            tx.put(plan)
         
         return plan
     
     async def update_plan(self, plan_id: str, plan_data: PlanUpdate) -> Optional[Plan]:
         """更新计划信息"""
-        # 加载现有计划
-        plans = await self._load_all_plans()
-        
-        # 检查计划是否存在
-        if plan_id not in plans:
-            return None
-        
-        # 获取现有计划
-        plan = plans[plan_id]
-        
-        # 更新数据（只更新非空字段）
-        update_data = plan_data.model_dump(exclude_unset=True)
-        for key, value in update_data.items():
-            setattr(plan, key, value)
+        async with self.store.transaction() as tx:
+            # 检查计划是否存在
+            plan = tx.edit(plan_id)
+            if not plan:
+                return None
             
-        # 更新时间
-        plan.updated_at = datetime.now()
-        
-        # 保存
-        await self._save_all_plans(plans)
+            # 更新数据（只更新非空字段）
+            update_data = plan_data.model_dump(exclude_unset=True)
+            for key, value in update_data.items():
+                setattr(plan, key, value)
+                
+            # 更新时间
+            plan.updated_at = datetime.now()
         
         return plan
     
     async def delete_plan(self, plan_id: str) -> bool:
-        """删除计划"""
-        # 加载现有计划
-        plans = await self._load_all_plans()
-        
-        # 检查计划是否存在
-        if plan_id not in plans:
-            return False
-        
-        # 删除计划
-        del plans[plan_id]
-        
-        # 保存
-        await self._save_all_plans(plans)
-        
-        # 检查当前计划
-        current_plan = await self.get_current_plan()
-        if current_plan and current_plan.id == plan_id:
-            await self.set_current_plan(None)
-        
-        return True
+        """删除计划（如果是当前计划则同时清除当前计划）"""
+        async with self.store.transaction() as tx:
+            return tx.delete(plan_id)
     
     async def create_plan_from_text(self, text: str, name: Optional[str] = None) -> Plan:
         """从文本创建计划"""
-        # 使用解析代理解析文本
+        # 使用解析代理解析文本（不持有锁，解析可能耗时很久）
         plan = await self.plan_parser.parse_text_to_plan(text, name)
-        
-        # 加载现有计划
-        plans = await self._load_all_plans()
-        
-        # 添加到计划字典
-        plans[plan.id] = plan
-        
-        # 保存
-        await self._save_all_plans(plans)
-        
-        # 设置为当前计划
-        await self.set_current_plan(plan.id)
-        
+        await self.save_parsed_plan(plan)
         return plan
     
+    async def save_parsed_plan(self, plan: Plan) -> None:
+        """保存解析得到的计划，并设置为当前计划"""
+        if plan.source_text is not None:
+            # 记录每个任务来自原文的哪个段落，修改原文后据此增量重新解析
+            attribute_sections(plan.tasks, split_sections(plan.source_text))
+        async with self.store.transaction() as tx:
+            tx.put(plan)
+            tx.set_current_plan_id(plan.id)
+    
+    async def reparse_plan(self, plan_id: str, text: str) -> Optional[PlanReparseResult]:
+        """用修改后的文本增量更新计划，计划不存在时返回None
+
+        与计划保存的原文比较，只把内容有变化的段落（相邻的合为一组，各组并发）交给模型解析，
+        再按plan_merge的规则合并：未受影响的任务原样保留，受影响的任务尽量保留ID、状态和评论。
+        文本没有变化时不调用模型。解析期间计划原文被其他请求修改时抛出ValueError。
+        """
+        plan = await self.get_plan_by_id(plan_id)
+        if plan is None:
+            return None
+        base = plan.source_text
+        sections = split_sections(text)
+        if text == base:
+            return PlanReparseResult(plan=plan, sections=len(sections), tasks_kept=len(plan.tasks))
+        hunks = changed_sections(base, sections)
+
+        # 解析不持有锁；任何一组解析失败都放弃本次合并
+        excerpts = ["\n\n".join(sections[i] for i in hunk) for hunk in hunks]
+        results = await asyncio.gather(*(self.plan_parser.parse_excerpt(excerpt, plan.name) for excerpt in excerpts))
+        parsed: List[Task] = []
+        notes: List[str] = []
+        for hunk, (tasks, hunk_notes) in zip(hunks, results):
+            attribute_sections(tasks, [sections[i] for i in hunk])
+            parsed.extend(tasks)
+            notes.extend(hunk_notes)
+
+        async with self.store.transaction() as tx:
+            current = tx.get(plan_id)
+            if current is None:
+                return None
+            if current.source_text != base:
+                raise ValueError("计划原文在解析期间已被修改，请重试")
+            plan = tx.edit(plan_id)
+            result = merge_reparsed(
+                tx, plan, sections, sum(len(hunk) for hunk in hunks), parsed, notes, settings.REPARSE_MATCH_THRESHOLD
+            )
+            plan.source_text = text
+            plan.updated_at = datetime.now()
+        return result
+    
     async def get_current_plan(self) -> Optional[Plan]:
         """获取当前计划"""
         try:
             # 加载当前计划ID
-            data = await load_json(settings.current_plan_file_path)
-            current_plan_data = CurrentPlan(**data)
+            plan_id = await self.store.load_current_plan_id()
             
             # 如果没有当前计划，返回None
-            if not current_plan_data.plan_id:
+            if not plan_id:
                 return None
             
-            # 加载所有计划
-            plans = await self._load_all_plans()
-            
             # 获取当前计划
-            return plans.get(current_plan_data.plan_id)
+            plans = await self._load_all_plans()
+            return plans.get(plan_id)
         except Exception as e:
             logger.error(f"获取当前计划失败: {e}")
             return None
@@ -169,57 +180,129 @@ class PlanService:
     async def set_current_plan(self, plan_id: Optional[str]) -> bool:
         """设置当前计划"""
         try:
-            # 如果plan_id不为空，检查计划是否存在
-            if plan_id:
-                plans = await self._load_all_plans()
-                if plan_id not in plans:
+            async with self.store.transaction() as tx:
+                # 如果plan_id不为空，检查计划是否存在
+                if plan_id and plan_id not in tx.plans:
                     return False
-            
-            # 创建CurrentPlan对象
-            current_plan = CurrentPlan(plan_id=plan_id)
-            
-            # 保存
-            await save_json(settings.current_plan_file_path, current_plan.model_dump())
+                tx.set_current_plan_id(plan_id)
             
             return True
         except Exception as e:
             logger.error(f"设置当前计划失败: {e}")
             return False
     
+    # 归档管理
+    async def archive_plan(self, plan_id: str) -> Optional[ArchivedPlanSummary]:
+        """把计划移入归档冷存储"""
+        async with self.store.transaction() as tx:
+            plan = tx.get(plan_id)
+            if not plan:
+                return None
+            # 归档文件中保存完整的评论
+            summary = await self.store.archive.archive(await self.with_comments(plan))
+            tx.delete(plan_id, keep_history=True)
+        return summary
+    
+    async def archive_completed_plans(self, older_than_days: Optional[int] = None) -> List[str]:
+        """归档所有任务已完成且超过指定天数未更新的计划（当前计划除外）"""
+        days = settings.ARCHIVE_AFTER_DAYS if older_than_days is None else older_than_days
+        threshold = datetime.now() - timedelta(days=days)
+        archived = []
+        async with self.store.transaction() as tx:
+            for plan in list(tx.plans.values()):
+                if plan.id == tx.current_plan_id or not plan.tasks:
+                    continue
+                if any(task.status != TaskStatus.COMPLETE for task in plan.tasks):
+                    continue
+                if (plan.updated_at or plan.created_at) > threshold:
+                    continue
+                await self.store.archive.archive(await self.with_comments(plan))
+                tx.delete(plan.id, keep_history=True)
+                archived.append(plan.id)
+        if archived:
+            logger.info(f"已自动归档 {len(archived)} 个已完成计划")
+        return archived
+    
+    async def search_archived_plans(self, query: Optional[str] = None, deep: bool = False) -> List[ArchivedPlanSummary]:
+        """列出或检索归档计划"""
+        return await self.store.archive.search(query, deep)
+    
+    async def get_archived_plan(self, plan_id: str) -> Optional[Plan]:
+        """读取归档计划"""
+        return await self.store.archive.get(plan_id)
+    
+    async def restore_plan(self, plan_id: str) -> Optional[Plan]:
+        """从归档恢复计划，计划ID已存在时抛出ValueError"""
+        plan = await self.store.archive.get(plan_id)
+        if not plan:
+            return None
+        async with self.store.transaction() as tx:
+            if plan_id in tx.plans:
+                raise ValueError(f"计划 {plan_id} 已存在")
+            tx.put(plan)
+            # 归档文件在计划写回之后由提交删除，不会出现计划既不在plans.json也不在归档中的情况
+            tx.unarchive(plan_id)
+        return plan
+    
+    # 修订历史
+    async def get_revisions(self, plan_id: str) -> List[PlanRevision]:
+        """获取计划的修订列表"""
+        return await self.store.history.list_revisions(plan_id)
+    
+    async def get_plan_revision(self, plan_id: str, revision: int) -> Optional[Plan]:
+        """获取计划在指定修订时的内容"""
+        return await self.store.history.get_revision(plan_id, revision)
+    
+    async def diff_plan_revisions(self, plan_id: str, from_revision: int, to_revision: int) -> Optional[List[Dict[str, Any]]]:
+        """比较计划的两个修订"""
+        return await self.store.history.diff_revisions(plan_id, from_revision, to_revision)
+    
+    # 依赖图分析
+    async def get_plan_analytics(self, plan_id: str) -> Optional[PlanAnalytics]:
+        """获取计划依赖图分析结果（按计划修订缓存）"""
+        index = await self.store.get_task_index(plan_id)
+        if index is None:
+            return None
+        if index.analytics is None:
+            # 使用建立索引时的计划对象，分析结果与索引对应同一版本
+            analytics = analyze_plan(index.plan, index)
+            analytics.revision = await self.store.history.latest_revision(plan_id)
+            index.analytics = analytics
+        return index.analytics
+    
+    async def get_dashboard(self, include_plans: bool = True) -> Dashboard:
+        """获取所有计划的进度汇总（增量维护，见DashboardAggregates）"""
+        await self.store.load_plans()
+        current_plan_id = await self.store.load_current_plan_id()
+        return self.store.dashboard.snapshot(current_plan_id, include_plans)
+
+    async def get_dashboard_etag(self) -> str:
+        """仪表盘当前内容的ETag，内容没有变化时不变"""
+        await self.store.load_plans()
+        return self.store.dashboard.etag(await self.store.load_current_plan_id())
+    
     async def get_next_tasks(self) -> List[Dict[str, Any]]:
         """获取下一步应该做的任务"""
         try:
             current_plan = await self.get_current_plan()
             if not current_plan:
                 return []
+            index = await self.store.get_task_index(current_plan.id)
             
             # 筛选状态为PENDING和NEED_FIXED的任务，这些是下一步可以做的
             next_tasks = []
-            for task in current_plan.tasks:
-                if task.status in [TaskStatus.PENDING, TaskStatus.NEED_FIXED]:
-                    # 检查依赖任务是否都已完成
-                    dependencies_met = True
-                    for dep_id in task.dependencies:
-                        # 查找依赖任务
-                        dep_task = next((t for t in current_plan.tasks if t.id == dep_id), None)
-                        # 如果没找到依赖任务ID，尝试查找标题匹配的任务
-                        if not dep_task:
-                            dep_task = next((t for t in current_plan.tasks if t.title == dep_id), None)
-                        
-                        # 如果依赖任务存在且未完成，则不满足依赖条件
-                        if dep_task and dep_task.status != TaskStatus.COMPLETE:
-                            dependencies_met = False
-                            break
-                    
-                    if dependencies_met:
-                        next_tasks.append({
-                            "id": task.id,
-                            "title": task.title,
-                            "description": task.description or "",
-                            "status": task.status.value,
-                            "order": task.order or 999,
-                            "dependencies": task.dependencies
-                        })
+            candidates, _ = index.query(statuses=[TaskStatus.PENDING, TaskStatus.NEED_FIXED])
+            for task in candidates:
+                # 排除已被认领的任务，并检查依赖任务是否都已完成（依赖可以是任务ID或标题）
+                if task.lease is None and index.dependencies_met(task):
+                    next_tasks.append({
+                        "id": task.id,
+                        "title": task.title,
+                        "description": task.description or "",
+                        "status": task.status.value,
+                        "order": task.order or 999,
+                        "dependencies": task.dependencies
+                    })
             
             # 按顺序编号排序
             next_tasks.sort(key=lambda x: x.get("order", 999))
@@ -237,6 +320,16 @@ class PlanService:
             return []
         return plan.tasks
     
+    async def query_tasks(self, plan_id: str, **filters: Any) -> Optional[Tuple[List[Task], int]]:
+        """按条件查询计划下的任务，返回(当前页任务, 总数)，计划不存在时返回None
+        
+        过滤条件见TaskIndex.query。
+        """
+        index = await self.store.get_task_index(plan_id)
+        if index is None:
+            return None
+        return index.query(**filters)
+    
     async def get_task_by_id(self, plan_id: str, task_id: str) -> Optional[Task]:
         """获取特定任务"""
         plan = await self.get_plan_by_id(plan_id)
@@ -250,222 +343,300 @@ class PlanService:
         
         return None
     
-    async def create_task(self, plan_id: str, task_data: TaskCreate) -> Optional[Task]:
-        """创建新任务"""
-        # 加载现有计划
-        plans = await self._load_all_plans()
-        
-        # 检查计划是否存在
-        if plan_id not in plans:
+    async def find_similar_tasks(
+        self,
+        plan_id: str,
+        text: Optional[str] = None,
+        task_id: Optional[str] = None,
+        limit: int = 10,
+        threshold: float = 0.0
+    ) -> Optional[List[SimilarTask]]:
+        """查找与给定文本或已有任务相似的任务，计划不存在时返回None
+
+        指定task_id时以该任务的标题和描述作为查询并排除它本身，任务不存在时抛出KeyError。
+        """
+        index = await self.store.get_task_index(plan_id)
+        if index is None:
             return None
-        
-        # 获取计划
-        plan = plans[plan_id]
-        
-        # 创建新任务
-        task = Task(**task_data.model_dump())
-        
-        # 添加到计划
-        plan.tasks.append(task)
-        plan.updated_at = datetime.now()
-        
-        # 保存
-        await self._save_all_plans(plans)
+        if task_id is not None:
+            task = index.by_id.get(task_id)
+            if task is None:
+                raise KeyError(task_id)
+            query = embed_text(task.title, task.description)
+        else:
+            query = embed_text(text or "")
+        matches = index.similarity.search([query], limit=limit, threshold=threshold, exclude=[task_id])[0]
+        return [SimilarTask(task=task, score=score) for task, score in matches]
+    
+    async def create_task(self, plan_id: str, task_data: TaskCreate, dedup: bool = False) -> Optional[Task]:
+        """创建新任务
+
+        dedup为True时，如果计划中已有相似度达到DEDUP_THRESHOLD的任务则抛出DuplicateTaskError。
+        """
+        async with self.store.transaction() as tx:
+            # 检查计划是否存在
+            if tx.get(plan_id) is None:
+                return None
+            if dedup:
+                index = self.store.index_for(tx.get(plan_id))
+                query = embed_text(task_data.title, task_data.description)
+                matches = index.similarity.search([query], limit=1, threshold=settings.DEDUP_THRESHOLD)[0]
+                if matches:
+                    raise DuplicateTaskError(*matches[0])
+            plan = tx.edit(plan_id)
+            
+            # 创建新任务
+            task = Task(**task_data.model_dump())
+            
+            # 添加到计划
+            plan.tasks.append(task)
+            plan.updated_at = datetime.now()
         
         return task
     
     async def update_task(self, plan_id: str, task_id: str, task_data: TaskUpdate) -> Optional[Task]:
         """更新任务"""
-        # 加载现有计划
-        plans = await self._load_all_plans()
-        
-        # 检查计划是否存在
-        if plan_id not in plans:
-            return None
-        
-        # 获取计划
-        plan = plans[plan_id]
-        
-        # 查找任务
-        task_index = None
-        for i, task in enumerate(plan.tasks):
-            if task.id == task_id:
-                task_index = i
-                break
-        
-        if task_index is None:
-            return None
-        
-        # 获取现有任务
-        task = plan.tasks[task_index]
-        
-        # 更新数据（只更新非空字段）
-        update_data = task_data.model_dump(exclude_unset=True)
-        for key, value in update_data.items():
-            setattr(task, key, value)
+        async with self.store.transaction() as tx:
+            # 查找任务
+            plan, task = self._edit_task(tx, plan_id, task_id)
+            if task is None:
+                return None
             
-        # 更新时间
-        task.updated_at = datetime.now()
-        plan.updated_at = datetime.now()
-        
-        # 保存
-        await self._save_all_plans(plans)
+            # 更新数据（只更新非空字段）
+            update_data = task_data.model_dump(exclude_unset=True)
+            for key, value in update_data.items():
+                setattr(task, key, value)
+            
+            # 状态离开WORKING时认领租约随之结束
+            if task.status != TaskStatus.WORKING:
+                task.lease = None
+                
+            # 更新时间
+            task.updated_at = datetime.now()
+            plan.updated_at = datetime.now()
         
         return task
     
     async def update_task_status(self, plan_id: str, task_id: str, status_data: TaskStatusUpdate) -> Optional[Task]:
         """更新任务状态"""
-        # 加载现有计划
-        plans = await self._load_all_plans()
-        
-        # 检查计划是否存在
-        if plan_id not in plans:
-            return None
-        
-        # 获取计划
-        plan = plans[plan_id]
-        
-        # 查找任务
-        task_index = None
-        for i, task in enumerate(plan.tasks):
-            if task.id == task_id:
-                task_index = i
-                break
-        
-        if task_index is None:
-            return None
-        
-        # 获取现有任务
-        task = plan.tasks[task_index]
-        
-        # 更新状态
-        task.status = status_data.status
-        task.updated_at = datetime.now()
-        plan.updated_at = datetime.now()
-        
-        # 保存
-        await self._save_all_plans(plans)
+        async with self.store.transaction() as tx:
+            # 查找任务
+            plan, task = self._edit_task(tx, plan_id, task_id)
+            if task is None:
+                return None
+            
+            # 更新状态（状态离开WORKING时认领租约随之结束）
+            task.status = status_data.status
+            if task.status != TaskStatus.WORKING:
+                task.lease = None
+            task.updated_at = datetime.now()
+            plan.updated_at = datetime.now()
         
         return task
     
     async def delete_task(self, plan_id: str, task_id: str) -> bool:
         """删除任务"""
-        # 加载现有计划
-        plans = await self._load_all_plans()
-        
-        # 检查计划是否存在
-        if plan_id not in plans:
-            return False
-        
-        # 获取计划
-        plan = plans[plan_id]
+        async with self.store.transaction() as tx:
+            # 查找任务
+            plan, task = self._edit_task(tx, plan_id, task_id)
+            if task is None:
+                return False
+            
+            # 删除任务
+            plan.tasks.remove(task)
+            plan.updated_at = datetime.now()
         
-        # 查找任务
-        task_index = None
-        for i, task in enumerate(plan.tasks):
-            if task.id == task_id:
-                task_index = i
-                break
+        return True
+    
+    # 任务认领
+    async def claim_task(self, plan_id: str, task_id: str, claim: TaskClaim) -> Optional[Task]:
+        """认领任务：原子地把就绪任务置为WORKING并记录租约
+        
+        任务不存在时返回None，任务不可认领时抛出ValueError。
+        """
+        async with self.store.transaction() as tx:
+            plan = tx.get(plan_id)
+            if self._find_task(plan, task_id) is None:
+                return None
+            index = self.store.index_for(plan)
+            now = datetime.now()
+            plan, task = self._edit_task(tx, plan_id, task_id)
+            self._expire_lease(task, now)
+            if task.lease is not None:
+                raise ValueError(f"任务已被 {task.lease.owner} 认领")
+            if task.status not in (TaskStatus.PENDING, TaskStatus.NEED_FIXED):
+                raise ValueError(f"任务状态为 {task.status.value}，不能认领")
+            if not index.dependencies_met(task):
+                raise ValueError("任务的依赖尚未完成")
+            self._grant_lease(plan, task, claim, now)
         
-        if task_index is None:
-            return False
+        return task
+    
+    async def claim_next_task(self, claim: TaskClaim, plan_id: Optional[str] = None) -> Optional[Task]:
+        """认领计划（默认当前计划）中下一个可执行的任务，没有可认领的任务时返回None"""
+        async with self.store.transaction() as tx:
+            plan_id = plan_id or tx.current_plan_id
+            plan = tx.get(plan_id) if plan_id else None
+            if not plan:
+                return None
+            index = self.store.index_for(plan)
+            candidates, _ = index.query(statuses=[TaskStatus.PENDING, TaskStatus.NEED_FIXED], sort="order")
+            task = next((t for t in candidates if t.lease is None and index.dependencies_met(t)), None)
+            if task is None:
+                return None
+            plan, task = self._edit_task(tx, plan_id, task.id)
+            self._grant_lease(plan, task, claim, datetime.now())
         
-        # 删除任务
-        del plan.tasks[task_index]
-        plan.updated_at = datetime.now()
+        return task
+    
+    async def renew_lease(self, plan_id: str, task_id: str, claim: TaskClaim) -> Optional[Task]:
+        """续租：延长认领者持有的租约，认领者不匹配时抛出ValueError"""
+        async with self.store.transaction() as tx:
+            task = self._find_task(tx.get(plan_id), task_id)
+            if task is None:
+                return None
+            if task.lease is None or task.lease.owner != claim.owner:
+                raise ValueError("任务未被该认领者认领")
+            now = datetime.now()
+            ttl = claim.ttl_seconds or settings.LEASE_TTL_SECONDS
+            _, task = self._edit_task(tx, plan_id, task_id)
+            task.lease = task.lease.model_copy(update={"expires_at": now + timedelta(seconds=ttl)})
         
-        # 保存
-        await self._save_all_plans(plans)
+        return task
+    
+    async def release_task(self, plan_id: str, task_id: str, release: TaskRelease) -> Optional[Task]:
+        """释放认领，任务恢复为指定状态（默认恢复认领前的状态）"""
+        async with self.store.transaction() as tx:
+            task = self._find_task(tx.get(plan_id), task_id)
+            if task is None:
+                return None
+            if task.lease is None or task.lease.owner != release.owner:
+                raise ValueError("任务未被该认领者认领")
+            plan, task = self._edit_task(tx, plan_id, task_id)
+            task.status = release.status or task.lease.previous_status
+            task.lease = None
+            task.updated_at = datetime.now()
+            plan.updated_at = datetime.now()
         
-        return True
+        return task
+    
+    async def reclaim_expired_leases(self) -> int:
+        """回收所有过期租约，返回回收的任务数"""
+        now = datetime.now()
+        plans = await self._load_all_plans()
+        if not any(self._is_expired(task, now) for plan in plans.values() for task in plan.tasks):
+            return 0
+        
+        reclaimed = 0
+        async with self.store.transaction() as tx:
+            for plan in list(tx.plans.values()):
+                if not any(self._is_expired(task, now) for task in plan.tasks):
+                    continue
+                for task in tx.edit(plan.id).tasks:
+                    if self._is_expired(task, now):
+                        self._expire_lease(task, now)
+                        reclaimed += 1
+        
+        if reclaimed:
+            logger.info(f"已回收 {reclaimed} 个过期的任务认领")
+        return reclaimed
+    
+    @staticmethod
+    def _is_expired(task: Task, now: datetime) -> bool:
+        return task.lease is not None and task.lease.expires_at <= now
+    
+    @classmethod
+    def _expire_lease(cls, task: Task, now: datetime) -> None:
+        """租约已过期时恢复任务认领前的状态"""
+        if cls._is_expired(task, now):
+            task.status = task.lease.previous_status
+            task.lease = None
+            task.updated_at = now
+    
+    @staticmethod
+    def _grant_lease(plan: Plan, task: Task, claim: TaskClaim, now: datetime) -> None:
+        """为任务创建租约并置为WORKING"""
+        ttl = claim.ttl_seconds or settings.LEASE_TTL_SECONDS
+        task.lease = TaskLease(
+            owner=claim.owner,
+            claimed_at=now,
+            expires_at=now + timedelta(seconds=ttl),
+            previous_status=task.status
+        )
+        task.status = TaskStatus.WORKING
+        task.updated_at = now
+        plan.updated_at = now
     
     # 评论管理
     async def add_comment(self, plan_id: str, task_id: str, comment_data: CommentCreate) -> Optional[Comment]:
-        """添加评论"""
-        # 加载现有计划
-        plans = await self._load_all_plans()
-        
-        # 检查计划是否存在
-        if plan_id not in plans:
-            return None
-        
-        # 获取计划
-        plan = plans[plan_id]
-        
-        # 查找任务
-        task_index = None
-        for i, task in enumerate(plan.tasks):
-            if task.id == task_id:
-                task_index = i
-                break
-        
-        if task_index is None:
-            return None
-        
-        # 获取任务
-        task = plan.tasks[task_index]
-        
-        # 创建新评论
-        comment = Comment(**comment_data.model_dump())
-        
-        # 添加到任务
-        task.comments.append(comment)
-        task.updated_at = datetime.now()
-        plan.updated_at = datetime.now()
-        
-        # 保存
-        await self._save_all_plans(plans)
+        """添加评论（追加到评论存储，计划中只更新评论数）"""
+        async with self.store.transaction() as tx:
+            # 查找任务
+            plan, task = self._edit_task(tx, plan_id, task_id)
+            if task is None:
+                return None
+            
+            # 创建新评论
+            comment = Comment(**comment_data.model_dump())
+            
+            # 添加到任务
+            tx.add_comment(plan_id, task_id, comment)
+            task.comment_count += 1
+            task.updated_at = datetime.now()
+            plan.updated_at = datetime.now()
         
         return comment
     
-    async def get_comments(self, plan_id: str, task_id: str) -> List[Comment]:
-        """获取任务下的所有评论"""
+    async def get_comments(
+        self, plan_id: str, task_id: str, cursor: Optional[str] = None, limit: Optional[int] = None
+    ) -> Optional[Tuple[List[Comment], Optional[str], int]]:
+        """按时间顺序分页获取任务下的评论，返回(评论, 下一页游标, 总数)，任务不存在时返回None
+        
+        游标非法时抛出ValueError。
+        """
         task = await self.get_task_by_id(plan_id, task_id)
         if not task:
-            return []
-        return task.comments
+            return None
+        return await self.store.comments.page(plan_id, task, cursor, limit)
     
     async def delete_comment(self, plan_id: str, task_id: str, comment_id: str) -> bool:
         """删除评论"""
-        # 加载现有计划
-        plans = await self._load_all_plans()
-        
-        # 检查计划是否存在
-        if plan_id not in plans:
-            return False
-        
-        # 获取计划
-        plan = plans[plan_id]
-        
-        # 查找任务
-        task_index = None
-        for i, task in enumerate(plan.tasks):
-            if task.id == task_id:
-                task_index = i
-                break
-        
-        if task_index is None:
-            return False
-        
-        # 获取任务
-        task = plan.tasks[task_index]
-        
-        # 查找评论
-        comment_index = None
-        for i, comment in enumerate(task.comments):
-            if comment.id == comment_id:
-                comment_index = i
-                break
-                
-        if comment_index is None:
-            return False
+        async with self.store.transaction() as tx:
+            # 查找任务
+            task = self._find_task(tx.get(plan_id), task_id)
+            if task is None:
+                return False
             
-        # 删除评论
-        del task.comments[comment_index]
-        task.updated_at = datetime.now()
-        plan.updated_at = datetime.now()
-        
-        # 保存
-        await self._save_all_plans(plans)
+            # 查找评论（旧数据中的评论可能仍嵌套在任务里）
+            if any(c.id == comment_id for c in task.comments):
+                plan, task = self._edit_task(tx, plan_id, task_id)
+                task.comments = [c for c in task.comments if c.id != comment_id]
+            elif await self.store.comments.contains(plan_id, task_id, comment_id):
+                plan, task = self._edit_task(tx, plan_id, task_id)
+                tx.delete_comment(plan_id, task_id, comment_id)
+                task.comment_count = max(0, task.comment_count - 1)
+            else:
+                return False
+                
+            task.updated_at = datetime.now()
+            plan.updated_at = datetime.now()
         
-        return True 
\ No newline at end of file
+        return True
+    
+    @staticmethod
+    def _find_task(plan: Optional[Plan], task_id: str) -> Optional[Task]:
+        """在计划中按ID查找任务"""
+        if plan is None:
+            return None
+        for task in plan.tasks:
+            if task.id == task_id:
+                return task
+        return None
+    
+    @classmethod
+    def _edit_task(cls, tx: PlanTransaction, plan_id: str, task_id: str) -> Tuple[Optional[Plan], Optional[Task]]:
+        """获取计划的可修改副本及其中的任务，任务不存在时不修改计划"""
+        if cls._find_task(tx.get(plan_id), task_id) is None:
+            return None, None
+        plan = tx.edit(plan_id)
+        return plan, cls._find_task(plan, task_id)
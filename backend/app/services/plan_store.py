@@ -0,0 +1,534 @@
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Mapping, Optional, Set, Tuple
+import asyncio
+import gc
+import hashlib
+import json
+import logging
+
+from ..models.schemas import Plan, Comment, CurrentPlan
+from ..models.trusted import PLANS_SCHEMA_VERSION, construct
+from ..utils.file_handler import (
+    load_json, save_json, datetime_parser, file_signature, FileLock, write_bytes_atomic, dump_json_fragment
+)
+from ..config import settings
+from ..utils.workspace import workspace_data_dir
+from .history_service import HistoryService
+from .archive_service import ArchiveService
+from .comment_store import CommentStore
+from .dashboard import DashboardAggregates
+from .task_index import TaskIndex
+
+# 设置日志
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class PlanSnapshot:
+    """某一版本的全部计划，发布后不再修改
+
+    读取方直接使用快照中的计划对象，不需要加锁；写事务修改计划前先复制，
+    提交时发布新的快照，未修改的计划对象在新旧快照之间共享。
+    """
+
+    def __init__(self, version: int, plans: Dict[str, Plan], signature: object):
+        self.version = version
+        self.plans = plans
+        # 对应的plans.json文件签名
+        self.signature = signature
+
+def copy_plan(plan: Plan) -> Plan:
+    """复制计划用于修改：复制计划、任务以及其中的列表，评论和租约对象仍与原计划共享
+
+    比深拷贝快一个数量级；修改评论或租约时应替换为新对象，不能原地修改。
+    """
+    return plan.model_copy(update={
+        "notes": list(plan.notes),
+        "tasks": [
+            task.model_copy(update={"comments": list(task.comments), "dependencies": list(task.dependencies)})
+            for task in plan.tasks
+        ]
+    })
+
+class PlanTransaction:
+    """一次读-改-写事务，记录本次被修改和删除的计划
+
+    get和plans返回的计划是共享的，不能修改；需要修改的计划必须通过edit获取，
+    第一次edit时复制出本事务私有的副本（见copy_plan）。事务失败时直接丢弃这些副本。
+    评论的增删记录在comment_ops中，提交时追加到评论存储（见CommentStore.apply）。
+    """
+
+    def __init__(self, plans: Dict[str, Plan], current_plan_id: Optional[str]):
+        self._plans = plans
+        self.current_plan_id = current_plan_id
+        self.changed: Dict[str, Plan] = {}
+        self.deleted: Set[str] = set()
+        self.history_kept: Set[str] = set()
+        # 提交时（plans.json写入之后）从归档冷存储中移除的计划
+        self.unarchived: Set[str] = set()
+        # 提交时删除修订历史的计划（已不存在的计划遗留的历史）
+        self.history_dropped: Set[str] = set()
+        self.comment_ops: List[Tuple[str, str, Optional[str], Any]] = []
+        self.current_plan_changed = False
+        # 没有计划被修改时也重写plans.json（去掉无法加载的记录、补写元数据）
+        self.rewrite = False
+
+    @property
+    def plans(self) -> Mapping[str, Plan]:
+        """事务看到的全部计划（只读）"""
+        return self._plans
+
+    def get(self, plan_id: str) -> Optional[Plan]:
+        """只读获取计划"""
+        return self._plans.get(plan_id)
+
+    def edit(self, plan_id: str) -> Optional[Plan]:
+        """获取计划的可修改副本，提交时会被写回"""
+        plan = self.changed.get(plan_id)
+        if plan is None:
+            plan = self._plans.get(plan_id)
+            if plan is None:
+                return None
+            plan = copy_plan(plan)
+            self._plans[plan_id] = plan
+            self.changed[plan_id] = plan
+        return plan
+
+    def put(self, plan: Plan) -> None:
+        """新增或替换计划（连同评论一起替换）
+
+        任务中嵌套的评论移入评论存储，保存的是去掉评论的副本；传入的计划只同步comment_count。
+        """
+        self.comment_ops.append(("clear", plan.id, None, None))
+        if any(task.comments or task.comment_count for task in plan.tasks):
+            for task in plan.tasks:
+                task.comment_count = len(task.comments)
+            plan = copy_plan(plan)
+            for task in plan.tasks:
+                for comment in task.comments:
+                    self.add_comment(plan.id, task.id, comment)
+                task.comments = []
+        self._plans[plan.id] = plan
+        self.changed[plan.id] = plan
+        self.deleted.discard(plan.id)
+
+    def delete(self, plan_id: str, keep_history: bool = False) -> bool:
+        """删除计划，如果是当前计划则同时清除当前计划指针
+
+        keep_history为True时保留修订历史（用于归档）。
+        """
+        if plan_id not in self._plans:
+            return False
+        del self._plans[plan_id]
+        self.changed.pop(plan_id, None)
+        self.deleted.add(plan_id)
+        self.comment_ops.append(("clear", plan_id, None, None))
+        if keep_history:
+            self.history_kept.add(plan_id)
+        if self.current_plan_id == plan_id:
+            self.set_current_plan_id(None)
+        return True
+
+    def unarchive(self, plan_id: str) -> None:
+        """从归档恢复的计划：提交时在计划写回之后删除其归档文件"""
+        self.unarchived.add(plan_id)
+
+    def add_comment(self, plan_id: str, task_id: str, comment: Comment) -> None:
+        """提交时追加评论（任务的comment_count由调用方维护）"""
+        self.comment_ops.append(("add", plan_id, task_id, comment))
+
+    def delete_comment(self, plan_id: str, task_id: str, comment_id: str) -> None:
+        """提交时删除评论存储中的评论（任务的comment_count由调用方维护）"""
+        self.comment_ops.append(("delete", plan_id, task_id, comment_id))
+
+    def set_current_plan_id(self, plan_id: Optional[str]) -> None:
+        """修改当前计划指针"""
+        self.current_plan_id = plan_id
+        self.current_plan_changed = True
+
+    @property
+    def dirty(self) -> bool:
+        return bool(self.changed or self.deleted or self.rewrite)
+
+    def begin(self) -> "PlanTransaction":
+        """在本事务当前内容之上开始一个子事务（复制计划字典，不复制计划）"""
+        return PlanTransaction(dict(self._plans), self.current_plan_id)
+
+    def merge(self, other: "PlanTransaction") -> None:
+        """把同一批次中一个已成功的子事务的修改合并进来"""
+        for plan_id in other.deleted:
+            self._plans.pop(plan_id, None)
+            self.changed.pop(plan_id, None)
+            self.deleted.add(plan_id)
+        for plan_id, plan in other.changed.items():
+            self._plans[plan_id] = plan
+            self.changed[plan_id] = plan
+            self.deleted.discard(plan_id)
+        self.history_kept |= other.history_kept
+        self.unarchived |= other.unarchived
+        self.history_dropped |= other.history_dropped
+        self.comment_ops.extend(other.comment_ops)
+        self.rewrite = self.rewrite or other.rewrite
+        if other.current_plan_changed:
+            self.set_current_plan_id(other.current_plan_id)
+
+class CommitBatch:
+    """一次组提交：持有文件锁期间依次执行的多个事务，最后一次性写回"""
+
+    def __init__(self, tx: PlanTransaction):
+        self.tx = tx
+        self.done: asyncio.Future = asyncio.get_running_loop().create_future()
+
+class PlanStore:
+    """计划数据存储，负责plans.json和current_plan.json的缓存、加锁与原子写入
+
+    同一数据目录在进程内只有一个实例（见get_plan_store）。多个worker进程之间
+    通过文件锁串行化写操作，并根据文件签名（inode/大小/mtime）判断其他进程是否
+    改写过文件，只有文件变化时才重新读取和解析。并发读取同一版本文件时共享
+    同一次读取；短时间内到达的多个写事务合并为一次写入（组提交）。
+
+    内存中的数据是不可变的版本化快照：写事务在计划副本上修改，写入文件后发布新快照，
+    读取方拿到的始终是某个完整版本，不会看到未提交的修改，也不需要等待写入。
+    写入时只重新序列化被修改的计划，序列化和写文件在线程中进行，不阻塞事件循环。
+    """
+
+    def __init__(self, data_dir: Path):
+        self.data_dir = Path(data_dir)
+        self.plans_file_path = self.data_dir / settings.PLANS_FILE
+        self.current_plan_file_path = self.data_dir / settings.CURRENT_PLAN_FILE
+        self.plans_meta_file_path = self.data_dir / settings.PLANS_META_FILE
+        self._lock = FileLock(self.data_dir / settings.LOCK_FILE)
+        self.history = HistoryService(self.data_dir)
+        self.archive = ArchiveService(self.data_dir)
+        self.comments = CommentStore(self.data_dir)
+        # 所有计划的进度汇总，随快照发布增量更新
+        self.dashboard = DashboardAggregates()
+        self._snapshot: Optional[PlanSnapshot] = None
+        # 快照版本号，每次发布或丢弃快照时递增，过期的读取结果不会覆盖较新的快照
+        self._generation = 0
+        # 本进程正在写plans.json：此时持有文件锁，文件签名的变化来自自己的写入
+        self._writing = False
+        # 正在进行的读取：(文件签名, 读取任务)
+        self._inflight_read: Optional[Tuple[object, asyncio.Future]] = None
+        # 进程内事务串行执行；当前正在收集事务的组提交批次
+        self._tx_lock = asyncio.Lock()
+        self._batch: Optional[CommitBatch] = None
+        # 按计划ID缓存的任务索引和序列化结果，对应的计划对象不同时失效
+        self._task_indexes: Dict[str, TaskIndex] = {}
+        self._fragments: Dict[str, Tuple[Plan, str]] = {}
+        self._current_plan_id: Optional[str] = None
+        self._current_signature = None
+        self._current_loaded = False
+
+    async def _read_plans(self) -> Dict[str, Plan]:
+        """从文件读取并解析所有计划（解析在线程中进行）"""
+        return await asyncio.to_thread(self._read_plans_sync)
+
+    def _read_plans_sync(self) -> Dict[str, Plan]:
+        try:
+            content = self.plans_file_path.read_bytes()
+        except FileNotFoundError:
+            return {}
+        # 一次性创建大量对象时暂停循环垃圾回收，避免反复扫描刚创建的对象（这些对象都会保留）
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            return self._parse_plans(content)
+        finally:
+            if gc_enabled:
+                gc.enable()
+
+    def _parse_plans(self, content: bytes) -> Dict[str, Plan]:
+        data = json.loads(content) if content else {}
+
+        # 元数据中的模式版本和校验和都匹配时是本服务写出的数据，跳过校验直接构造
+        if settings.TRUSTED_LOAD and self._trusted(content):
+            plans = {}
+            for plan_id, plan_data in data.items():
+                try:
+                    plans[plan_id] = construct(Plan, plan_data)
+                except Exception as e:
+                    logger.warning(f"快速加载计划 {plan_id} 失败，改为完整校验: {e}")
+                    plan = self._validate_plan(plan_id, plan_data)
+                    if plan is not None:
+                        plans[plan_id] = plan
+            return plans
+
+        # 转换为Plan对象字典（完整校验）
+        plans = {}
+        for plan_id, plan_data in data.items():
+            plan = self._validate_plan(plan_id, plan_data)
+            if plan is not None:
+                plans[plan_id] = plan
+        return plans
+
+    @staticmethod
+    def _validate_plan(plan_id: str, plan_data: Dict[str, Any]) -> Optional[Plan]:
+        try:
+            # 解析日期时间字符串
+            return Plan(**datetime_parser(plan_data))
+        except Exception as e:
+            logger.error(f"加载计划 {plan_id} 失败: {e}")
+            return None
+
+    def read_raw_plans(self) -> Dict[str, Any]:
+        """读取plans.json中未经解析的计划数据（用于检查无法加载的记录）"""
+        try:
+            content = self.plans_file_path.read_bytes()
+        except FileNotFoundError:
+            return {}
+        return json.loads(content) if content else {}
+
+    def file_trusted(self) -> bool:
+        """plans.json是否由当前版本写出（元数据匹配，可以快速加载）"""
+        try:
+            content = self.plans_file_path.read_bytes()
+        except FileNotFoundError:
+            return True
+        return self._trusted(content)
+
+    def _trusted(self, content: bytes) -> bool:
+        """plans.json是否与元数据记录的模式版本和校验和一致"""
+        try:
+            meta = json.loads(self.plans_meta_file_path.read_bytes())
+        except (FileNotFoundError, ValueError):
+            return False
+        return (
+            meta.get("schema_version") == PLANS_SCHEMA_VERSION
+            and meta.get("size") == len(content)
+            and meta.get("sha256") == hashlib.sha256(content).hexdigest()
+        )
+
+    @property
+    def version(self) -> int:
+        """当前快照的版本号"""
+        return self._snapshot.version if self._snapshot is not None else 0
+
+    async def load_plans(self) -> Mapping[str, Plan]:
+        """获取当前快照中的所有计划（只读），文件未被改写时直接返回快照"""
+        snapshot = self._snapshot
+        if snapshot is not None and self._writing:
+            return snapshot.plans
+        # 先取签名再读文件：若读取期间文件被替换，下次调用会因签名不一致而重新读取
+        signature = file_signature(self.plans_file_path)
+        if snapshot is not None and signature == snapshot.signature:
+            return snapshot.plans
+
+        # 同一版本文件的并发读取共享一次读取和解析
+        inflight = self._inflight_read
+        if inflight is None or inflight[0] != signature:
+            inflight = (signature, asyncio.ensure_future(self._read_plans()))
+            self._inflight_read = inflight
+        generation = self._generation
+        try:
+            # shield：某个调用方被取消不影响其他等待同一读取的调用方
+            plans = await asyncio.shield(inflight[1])
+        finally:
+            if self._inflight_read is inflight and inflight[1].done():
+                self._inflight_read = None
+
+        current = self._snapshot
+        if generation == self._generation and (current is None or signature != current.signature):
+            self._task_indexes.clear()
+            self._fragments.clear()
+            self._publish(plans, signature)
+            self.dashboard.reload(plans)
+        return plans
+
+    def _publish(self, plans: Dict[str, Plan], signature: object) -> None:
+        self._generation += 1
+        self._snapshot = PlanSnapshot(self._generation, plans, signature)
+
+    def index_for(self, plan: Plan) -> TaskIndex:
+        """获取计划对象的任务索引，计划被修改（换成新的对象）后才会重建"""
+        index = self._task_indexes.get(plan.id)
+        if index is None or index.plan is not plan:
+            index = TaskIndex(plan, index)
+            self._task_indexes[plan.id] = index
+        return index
+
+    async def get_task_index(self, plan_id: str) -> Optional[TaskIndex]:
+        """获取当前快照中计划的任务索引"""
+        plans = await self.load_plans()
+        plan = plans.get(plan_id)
+        if plan is None:
+            return None
+        return self.index_for(plan)
+
+    async def load_current_plan_id(self) -> Optional[str]:
+        """获取当前计划ID，文件未被改写时直接返回缓存"""
+        signature = file_signature(self.current_plan_file_path)
+        if not self._current_loaded or signature != self._current_signature:
+            try:
+                data = await load_json(self.current_plan_file_path)
+                self._current_plan_id = CurrentPlan(**data).plan_id
+            except Exception as e:
+                logger.error(f"读取当前计划失败: {e}")
+                self._current_plan_id = None
+            self._current_signature = signature
+            self._current_loaded = True
+        return self._current_plan_id
+
+    async def migrate_comments(self) -> int:
+        """把旧数据中嵌套在任务里的评论移入评论存储，返回移动的评论数"""
+        plans = await self.load_plans()
+        if not any(task.comments for plan in plans.values() for task in plan.tasks):
+            return 0
+        moved = 0
+        async with self.transaction() as tx:
+            for plan_id, plan in list(tx.plans.items()):
+                if not any(task.comments for task in plan.tasks):
+                    continue
+                for task in tx.edit(plan_id).tasks:
+                    for comment in task.comments:
+                        tx.add_comment(plan_id, task.id, comment)
+                    task.comment_count += len(task.comments)
+                    moved += len(task.comments)
+                    task.comments = []
+        logger.info(f"已把 {moved} 条评论移入评论存储")
+        return moved
+
+    @asynccontextmanager
+    async def transaction(self) -> AsyncIterator[PlanTransaction]:
+        """执行读-改-写，正常退出并且修改已写回文件后才返回
+
+        批次中第一个事务获取跨进程文件锁并按文件签名刷新快照，因此总是在最新数据上修改；
+        之后GROUP_COMMIT_WINDOW_MS毫秒内到达的事务依次在前面事务的结果之上执行，窗口结束时
+        一次性写回、发布新快照并释放文件锁，批次中的所有事务在写入完成后一起返回。
+        事务抛出异常时只丢弃它自己的修改（计划副本），不影响同批次的其他事务。
+        """
+        async with self._tx_lock:
+            batch = self._batch
+            if batch is None:
+                batch = await self._open_batch()
+            tx = batch.tx.begin()
+            yield tx
+            batch.tx.merge(tx)
+        await asyncio.shield(batch.done)
+
+    async def _open_batch(self) -> CommitBatch:
+        await self._lock.acquire()
+        try:
+            plans = await self.load_plans()
+            current_plan_id = await self.load_current_plan_id()
+        except BaseException:
+            self._lock.release()
+            raise
+        batch = CommitBatch(PlanTransaction(dict(plans), current_plan_id))
+        self._batch = batch
+        asyncio.ensure_future(self._commit_batch(batch))
+        return batch
+
+    def _discard_cache(self) -> None:
+        self._snapshot = None
+        self._task_indexes.clear()
+        self._fragments.clear()
+        self._current_loaded = False
+        self._generation += 1
+
+    async def _commit_batch(self, batch: CommitBatch) -> None:
+        """等待组提交窗口结束后写回批次中的所有修改并释放文件锁"""
+        try:
+            await asyncio.sleep(settings.GROUP_COMMIT_WINDOW_MS / 1000)
+            async with self._tx_lock:
+                self._batch = None
+            tx = batch.tx
+            if tx.comment_ops:
+                # 先写评论再写计划：失败时计划中的comment_count不会超前于评论存储
+                await self.comments.apply(tx.comment_ops)
+            if tx.dirty:
+                await self._write_plans(tx)
+                await self._record_history(tx)
+                await self._remove_unarchived(tx)
+            elif tx.history_dropped:
+                await self._record_history(tx)
+            if tx.current_plan_changed:
+                await self._write_current_plan_id(tx.current_plan_id)
+        except BaseException as e:
+            self._discard_cache()
+            batch.done.set_exception(e)
+            # 没有事务在等待时也不报"异常未被获取"
+            batch.done.exception()
+        else:
+            batch.done.set_result(None)
+        finally:
+            self._lock.release()
+
+    async def _write_plans(self, tx: PlanTransaction) -> None:
+        """在线程中保存所有计划数据，写入成功后发布新快照"""
+        plans = tx.plans
+        self._writing = True
+        try:
+            content, fragments = await asyncio.to_thread(self._dump_plans, plans, self._fragments)
+            await asyncio.to_thread(self._write_plans_file, content)
+            self._fragments = fragments
+            self._publish(plans, file_signature(self.plans_file_path))
+            self.dashboard.apply(tx.changed, tx.deleted)
+        finally:
+            self._writing = False
+        for plan_id in tx.deleted:
+            self._task_indexes.pop(plan_id, None)
+
+    def _write_plans_file(self, content: str) -> None:
+        """写入plans.json，再写入记录模式版本和校验和的元数据
+
+        两次写入之间其他进程读到的是新文件和旧元数据，校验和不匹配，会走完整校验。
+        """
+        data = content.encode("utf-8")
+        write_bytes_atomic(self.plans_file_path, data)
+        meta = {"schema_version": PLANS_SCHEMA_VERSION, "size": len(data), "sha256": hashlib.sha256(data).hexdigest()}
+        write_bytes_atomic(self.plans_meta_file_path, json.dumps(meta).encode("utf-8"))
+
+    @staticmethod
+    def _dump_plans(plans: Mapping[str, Plan], cache: Dict[str, Tuple[Plan, str]]) -> Tuple[str, Dict[str, Tuple[Plan, str]]]:
+        """序列化所有计划，未修改的计划（同一个对象）复用上次的序列化结果
+
+        输出与json.dumps(data, indent=2)相同，返回(文件内容, 新的序列化缓存)。
+        """
+        fragments = {}
+        lines = []
+        for plan_id, plan in plans.items():
+            cached = cache.get(plan_id)
+            if cached is None or cached[0] is not plan:
+                cached = (plan, dump_json_fragment(plan.model_dump(), 1))
+            fragments[plan_id] = cached
+            lines.append(f"  {dump_json_fragment(plan_id, 1)}: {cached[1]}")
+        content = "{\n" + ",\n".join(lines) + "\n}" if lines else "{}"
+        return content, fragments
+
+    async def _record_history(self, tx: PlanTransaction) -> None:
+        """为本次事务修改的计划记录修订历史（失败不影响已保存的数据）"""
+        try:
+            for plan in tx.changed.values():
+                await self.history.record(plan)
+            for plan_id in (tx.deleted - tx.history_kept) | tx.history_dropped:
+                self.history.drop(plan_id)
+        except Exception as e:
+            logger.error(f"记录修订历史失败: {e}", exc_info=True)
+
+    async def _remove_unarchived(self, tx: PlanTransaction) -> None:
+        """删除已恢复计划的归档文件（计划已写回plans.json，失败时只是留下多余的归档）"""
+        for plan_id in tx.unarchived:
+            try:
+                await self.archive.remove(plan_id)
+            except Exception as e:
+                logger.error(f"删除已恢复计划 {plan_id} 的归档失败: {e}", exc_info=True)
+
+    async def _write_current_plan_id(self, plan_id: Optional[str]) -> None:
+        """保存当前计划ID"""
+        await save_json(self.current_plan_file_path, CurrentPlan(plan_id=plan_id).model_dump())
+        self._current_plan_id = plan_id
+        self._current_signature = file_signature(self.current_plan_file_path)
+        self._current_loaded = True
+
+# 每个数据目录在进程内共享一个存储实例
+_stores: Dict[Path, PlanStore] = {}
+
+def get_plan_store(data_dir: Optional[Path] = None) -> PlanStore:
+    """获取数据目录（默认为当前工作区的数据目录）对应的存储实例"""
+    path = Path(data_dir or workspace_data_dir()).resolve()
+    store = _stores.get(path)
+    if store is None:
+        store = PlanStore(path)
+        _stores[path] = store
+    return store
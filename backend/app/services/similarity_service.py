@@ -0,0 +1,194 @@
+import importlib.util
+import math
+import re
+import zlib
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from ..models.schemas import Task
+
+# numpy为可选依赖，未安装时退回纯Python的稀疏向量点积（较慢）；
+# 只检查是否安装，第一次计算向量时才导入，避免拖慢服务启动
+NUMPY_AVAILABLE = importlib.util.find_spec("numpy") is not None
+
+# 哈希向量维度
+VECTOR_DIM = 256
+# 字符n-gram长度
+NGRAM_SIZES = (2, 3)
+# 标题特征的权重（描述为1）
+TITLE_WEIGHT = 2.0
+# 文本向量缓存的最大条目数，超出后整体清空
+VECTOR_CACHE_SIZE = 200_000
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+# 稀疏向量：(维度下标, 值)，已做L2归一化；安装numpy时为数组，否则为列表
+SparseVector = Tuple[List[int], List[float]]
+
+_vector_cache: Dict[str, SparseVector] = {}
+
+def _numpy():
+    import numpy
+    return numpy
+
+class DuplicateTaskError(ValueError):
+    """新任务与计划中已有任务高度相似"""
+
+    def __init__(self, task: Task, score: float):
+        super().__init__(f"与已有任务「{task.title}」重复（相似度 {score:.2f}）")
+        self.task = task
+        self.score = score
+
+def _add_features(features: Dict[int, float], text: str, weight: float) -> None:
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        padded = f" {token} "
+        for size in NGRAM_SIZES:
+            for i in range(len(padded) - size + 1):
+                # 带符号的特征哈希：低位决定维度，高位决定正负，减小冲突带来的偏差
+                h = zlib.crc32(padded[i:i + size].encode("utf-8"))
+                bucket = h % VECTOR_DIM
+                features[bucket] = features.get(bucket, 0.0) + (weight if h & 0x80000000 else -weight)
+
+def embed_text(title: str, description: Optional[str] = None) -> SparseVector:
+    """把任务标题和描述转换为哈希字符n-gram向量（本地计算，无需模型和网络）"""
+    key = f"{title}\x00{description or ''}"
+    vector = _vector_cache.get(key)
+    if vector is not None:
+        return vector
+
+    features: Dict[int, float] = {}
+    _add_features(features, title, TITLE_WEIGHT)
+    if description:
+        _add_features(features, description, 1.0)
+    norm = math.sqrt(sum(value * value for value in features.values())) or 1.0
+    indices = sorted(features)
+    values = [features[i] / norm for i in indices]
+    if NUMPY_AVAILABLE:
+        # 保存为数组，堆叠矩阵时可以直接拼接
+        np = _numpy()
+        vector = (np.array(indices, dtype=np.intp), np.array(values, dtype=np.float32))
+    else:
+        vector = (indices, values)
+
+    if len(_vector_cache) >= VECTOR_CACHE_SIZE:
+        _vector_cache.clear()
+    _vector_cache[key] = vector
+    return vector
+
+def embed_task(task: Task) -> SparseVector:
+    return embed_text(task.title, task.description)
+
+def _dense(vectors: Sequence[SparseVector]) -> "np.ndarray":
+    """把一批稀疏向量组装为(len, VECTOR_DIM)的float32矩阵"""
+    np = _numpy()
+    matrix = np.zeros((len(vectors), VECTOR_DIM), dtype=np.float32)
+    if vectors:
+        lengths = [len(indices) for indices, _ in vectors]
+        rows = np.repeat(np.arange(len(vectors)), lengths)
+        matrix[rows, np.concatenate([indices for indices, _ in vectors])] = \
+            np.concatenate([values for _, values in vectors])
+    return matrix
+
+class SimilarityIndex:
+    """单个计划的任务向量索引
+
+    所有任务向量堆叠为一个矩阵，一批查询通过一次矩阵乘法得到与全部任务的余弦
+    相似度，再用argpartition取top-k。随TaskIndex缓存，计划修改后重建：给出修改前的索引
+    且原有任务的ID和顺序不变时（修改状态或个别任务、在末尾添加任务），只为文本变化和新增的
+    任务计算向量和矩阵行，其余直接复用；删除或重排任务时完整重建。
+    """
+
+    def __init__(self, tasks: Sequence[Task], previous: Optional["SimilarityIndex"] = None):
+        self.tasks = list(tasks)
+        if previous is not None and self._extend(previous):
+            return
+        self.position = {task.id: i for i, task in enumerate(self.tasks)}
+        self.vectors = [embed_task(task) for task in self.tasks]
+        self.matrix = _dense(self.vectors) if NUMPY_AVAILABLE else None
+
+    def _extend(self, previous: "SimilarityIndex") -> bool:
+        """在旧索引的基础上增量构建，旧索引的任务不是新任务列表的前缀时返回False"""
+        old = previous.tasks
+        if len(self.tasks) < len(old) or any(task.id != before.id for task, before in zip(self.tasks, old)):
+            return False
+        changed = [
+            i for i, (task, before) in enumerate(zip(self.tasks, old))
+            if task.title != before.title or task.description != before.description
+        ]
+        added = range(len(old), len(self.tasks))
+
+        # 旧索引的结构不再修改，没有变化时直接共享
+        self.position = previous.position
+        self.vectors = previous.vectors
+        self.matrix = previous.matrix
+        if not changed and not added:
+            return True
+        self.vectors = list(previous.vectors)
+        for i in changed:
+            self.vectors[i] = embed_task(self.tasks[i])
+        self.vectors.extend(embed_task(self.tasks[i]) for i in added)
+        if added:
+            self.position = {**previous.position, **{self.tasks[i].id: i for i in added}}
+        if self.matrix is not None:
+            np = _numpy()
+            matrix = self.matrix.copy() if changed else self.matrix
+            if changed:
+                matrix[changed] = _dense([self.vectors[i] for i in changed])
+            if added:
+                matrix = np.vstack([matrix, _dense(self.vectors[len(old):])])
+            self.matrix = matrix
+        return True
+
+    def search(
+        self,
+        queries: Sequence[SparseVector],
+        limit: int = 10,
+        threshold: float = 0.0,
+        exclude: Optional[Sequence[Optional[str]]] = None
+    ) -> List[List[Tuple[Task, float]]]:
+        """批量查询最相似的任务，每个查询返回按相似度降序的(任务, 相似度)列表
+
+        exclude与queries一一对应，给出每个查询要排除的任务ID（通常是查询任务本身）。
+        """
+        if not queries:
+            return []
+        exclude = list(exclude) if exclude is not None else [None] * len(queries)
+        if not self.tasks:
+            return [[] for _ in queries]
+        if self.matrix is not None:
+            scores = _dense(queries) @ self.matrix.T
+            return [self._top(row, limit, threshold, task_id) for row, task_id in zip(scores, exclude)]
+        return [self._top_sparse(query, limit, threshold, task_id) for query, task_id in zip(queries, exclude)]
+
+    def _top(self, row: "np.ndarray", limit: int, threshold: float, exclude_id: Optional[str]) -> List[Tuple[Task, float]]:
+        np = _numpy()
+        if exclude_id in self.position:
+            row[self.position[exclude_id]] = -np.inf
+        candidates = np.flatnonzero(row >= threshold)
+        if len(candidates) > limit:
+            candidates = np.sort(candidates[np.argpartition(row[candidates], -limit)[-limit:]])
+        candidates = candidates[np.argsort(-row[candidates], kind="stable")]
+        return [(self.tasks[i], float(row[i])) for i in candidates]
+
+    def _top_sparse(self, query: SparseVector, limit: int, threshold: float, exclude_id: Optional[str]) -> List[Tuple[Task, float]]:
+        weights = dict(zip(*query))
+        results = []
+        for i, (indices, values) in enumerate(self.vectors):
+            if self.tasks[i].id == exclude_id:
+                continue
+            score = sum(weights.get(j, 0.0) * v for j, v in zip(indices, values))
+            if score >= threshold:
+                results.append((score, i))
+        results.sort(key=lambda item: (-item[0], item[1]))
+        return [(self.tasks[i], score) for score, i in results[:limit]]
+
+def similarity_matrix(queries: Sequence[SparseVector], targets: Sequence[SparseVector]) -> List[List[float]]:
+    """计算每个查询向量与每个目标向量的余弦相似度（行为查询，列为目标）"""
+    if not queries or not targets:
+        return [[] for _ in queries]
+    if NUMPY_AVAILABLE:
+        return (_dense(queries) @ _dense(targets).T).tolist()
+    rows = []
+    for query in queries:
+        weights = dict(zip(*query))
+        rows.append([sum(weights.get(j, 0.0) * v for j, v in zip(indices, values)) for indices, values in targets])
+    return rows
@@ -0,0 +1,147 @@
+from bisect import bisect_left, bisect_right
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from ..models.schemas import Plan, Task, TaskStatus, PlanAnalytics
+from .similarity_service import SimilarityIndex
+
+# 支持的排序字段
+SORT_FIELDS = ("order", "title", "status", "created_at", "updated_at")
+
+class TaskIndex:
+    """单个计划的任务二级索引
+
+    包含ID/标题映射、按状态分桶、按order排序的有序结构和有评论的任务列表，
+    在计划被修改时由存储整体重建（只重建被修改的计划）。
+    """
+
+    def __init__(self, plan: Plan, previous: Optional["TaskIndex"] = None):
+        # 建立索引时的计划对象，存储据此判断索引是否过期
+        self.plan = plan
+        self.tasks: List[Task] = list(plan.tasks)
+        self.position: Dict[str, int] = {}
+        self.by_id: Dict[str, Task] = {}
+        self.by_title: Dict[str, Task] = {}
+        self.by_status: Dict[TaskStatus, List[Task]] = {status: [] for status in TaskStatus}
+        self.with_comments: List[Task] = []
+        self._search_text: Dict[str, str] = {}
+        # 依赖图分析结果，随索引一起在计划修改后失效
+        self.analytics: Optional[PlanAnalytics] = None
+        # 任务相似度向量索引，首次相似度查询时构建（复用修改前索引中未变的向量）
+        self._similarity: Optional[SimilarityIndex] = None
+        self._previous_similarity = previous.similarity_base() if previous is not None else None
+
+        for i, task in enumerate(self.tasks):
+            self.position[task.id] = i
+            self.by_id[task.id] = task
+            self.by_title.setdefault(task.title, task)
+            self.by_status[task.status].append(task)
+            if task.comment_count or task.comments:
+                self.with_comments.append(task)
+
+        # 按order排序（order为空的任务不参与范围查询）
+        ordered = sorted(
+            (task for task in self.tasks if task.order is not None),
+            key=lambda task: (task.order, self.position[task.id])
+        )
+        self._order_keys: List[int] = [task.order for task in ordered]
+        self._ordered: List[Task] = ordered
+
+    def resolve(self, dependency: str) -> Optional[Task]:
+        """解析依赖引用（任务ID，或兼容旧数据的任务标题）"""
+        return self.by_id.get(dependency) or self.by_title.get(dependency)
+
+    def dependencies_met(self, task: Task) -> bool:
+        """任务的所有依赖是否都已完成（找不到的依赖视为已满足）"""
+        for dependency in task.dependencies:
+            dep_task = self.resolve(dependency)
+            if dep_task and dep_task.status != TaskStatus.COMPLETE:
+                return False
+        return True
+
+    @property
+    def similarity(self) -> SimilarityIndex:
+        if self._similarity is None:
+            self._similarity = SimilarityIndex(self.tasks, self._previous_similarity)
+            self._previous_similarity = None
+        return self._similarity
+
+    def similarity_base(self) -> Optional[SimilarityIndex]:
+        """计划修改后重建相似度索引时可以复用的索引（只保留最近一个，不形成链）"""
+        return self._similarity or self._previous_similarity
+
+    def order_range(self, order_min: Optional[int], order_max: Optional[int]) -> List[Task]:
+        """按order范围查询（闭区间）"""
+        start = 0 if order_min is None else bisect_left(self._order_keys, order_min)
+        end = len(self._ordered) if order_max is None else bisect_right(self._order_keys, order_max)
+        return self._ordered[start:end]
+
+    def _text(self, task: Task) -> str:
+        text = self._search_text.get(task.id)
+        if text is None:
+            text = f"{task.title}\n{task.description or ''}".lower()
+            self._search_text[task.id] = text
+        return text
+
+    def query(
+        self,
+        statuses: Optional[Sequence[TaskStatus]] = None,
+        order_min: Optional[int] = None,
+        order_max: Optional[int] = None,
+        has_comments: Optional[bool] = None,
+        dependency_of: Optional[str] = None,
+        text: Optional[str] = None,
+        sort: Optional[str] = None,
+        limit: Optional[int] = None,
+        offset: int = 0
+    ) -> Tuple[List[Task], int]:
+        """按条件查询任务，返回(当前页任务, 符合条件的总数)
+
+        先从最小的索引候选集出发，再用其余条件逐个过滤；不指定排序时保持计划中的原始顺序。
+        """
+        candidates: List[List[Task]] = []
+        if statuses:
+            bucket = [task for status in set(statuses) for task in self.by_status[status]]
+            candidates.append(bucket)
+        if order_min is not None or order_max is not None:
+            candidates.append(self.order_range(order_min, order_max))
+        if has_comments:
+            candidates.append(self.with_comments)
+        if dependency_of is not None:
+            owner = self.by_id.get(dependency_of)
+            deps = [self.resolve(dep) for dep in owner.dependencies] if owner else []
+            candidates.append([task for task in deps if task is not None])
+
+        if candidates:
+            candidates.sort(key=len)
+            result = candidates[0]
+            for other in candidates[1:]:
+                ids = {task.id for task in other}
+                result = [task for task in result if task.id in ids]
+        else:
+            result = self.tasks
+
+        if has_comments is False:
+            result = [task for task in result if not (task.comment_count or task.comments)]
+        if text:
+            keyword = text.lower()
+            result = [task for task in result if keyword in self._text(task)]
+
+        result = self._sort(result, sort)
+        total = len(result)
+        end = None if limit is None else offset + limit
+        return result[offset:end], total
+
+    def _sort(self, tasks: List[Task], sort: Optional[str]) -> List[Task]:
+        """排序，字段前加"-"表示降序；空值总是排在最后"""
+        if not sort:
+            # 候选集可能来自不同索引，恢复为计划中的原始顺序
+            return sorted(tasks, key=lambda task: self.position[task.id])
+        descending = sort.startswith("-")
+        field = sort.lstrip("-")
+        if field not in SORT_FIELDS:
+            raise ValueError(f"不支持的排序字段: {field}")
+
+        present = [task for task in tasks if getattr(task, field) is not None]
+        missing = [task for task in tasks if getattr(task, field) is None]
+        present.sort(key=lambda task: (getattr(task, field), self.position[task.id]), reverse=descending)
+        return present + missing
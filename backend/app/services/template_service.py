@@ -0,0 +1,222 @@
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import logging
+import re
+
+from ..models.schemas import (
+    Plan, Task, TaskStatus, PlanTemplate, PlanTemplateCreate, PlanTemplateFromPlan,
+    PlanTemplateSummary, TemplateInstantiate
+)
+from ..utils.file_handler import load_json, save_json, datetime_parser, file_signature
+from ..utils.id_remap import clone_plan_data
+from ..config import settings
+from ..utils.workspace import workspace_data_dir
+from .plan_store import PlanStore, get_plan_store
+
+# 设置日志
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# 模板占位符：{{变量名}}，变量名由字母、数字、下划线、点和短横线组成
+PLACEHOLDER = re.compile(r"\{\{\s*([A-Za-z_][\w.-]*)\s*\}\}")
+
+def _template_texts(template: PlanTemplateCreate) -> Iterable[str]:
+    """模板中可以包含占位符的文本"""
+    yield template.plan_name
+    yield template.plan_description or ""
+    yield from template.notes
+    for task in template.tasks:
+        yield task.title
+        yield task.description or ""
+        for comment in task.comments:
+            yield comment.content
+
+def find_variables(template: PlanTemplateCreate) -> List[str]:
+    """按首次出现的顺序列出模板中的占位符变量"""
+    variables: Dict[str, None] = {}
+    for text in _template_texts(template):
+        if "{{" in text:
+            for match in PLACEHOLDER.finditer(text):
+                variables.setdefault(match.group(1), None)
+    return list(variables)
+
+class TemplateService:
+    """计划模板的保存与实例化
+
+    每个模板单独保存为templates/<id>.json，读取后按文件签名缓存模板及其序列化数据。
+    实例化只需一次遍历：复制任务和评论、分配新ID、重映射依赖并替换占位符，
+    不调用模型，生成的计划直接写入存储。
+    """
+
+    def __init__(self, data_dir: Path, store: PlanStore):
+        self.templates_dir = Path(data_dir) / settings.TEMPLATE_DIR
+        self.store = store
+        # 模板ID -> (文件签名, 模板, 用于实例化的计划数据)
+        self._cache: Dict[str, Tuple[object, PlanTemplate, Dict[str, Any]]] = {}
+
+    def _template_path(self, template_id: str) -> Path:
+        return self.templates_dir / f"{template_id}.json"
+
+    async def _load(self, template_id: str) -> Optional[Tuple[PlanTemplate, Dict[str, Any]]]:
+        """读取模板（模板ID非法或不存在时返回None），文件未被改写时使用缓存"""
+        path = self._template_path(template_id)
+        if path.parent != self.templates_dir:
+            return None
+        signature = file_signature(path)
+        if signature is None:
+            self._cache.pop(template_id, None)
+            return None
+        cached = self._cache.get(template_id)
+        if cached is not None and cached[0] == signature:
+            return cached[1], cached[2]
+
+        data = await load_json(path)
+        if not data:
+            return None
+        template = PlanTemplate(**datetime_parser(data))
+        plan_data = self._plan_data(template)
+        self._cache[template_id] = (signature, template, plan_data)
+        return template, plan_data
+
+    @staticmethod
+    def _plan_data(template: PlanTemplate) -> Dict[str, Any]:
+        """模板对应的计划数据（实例化时复制这份数据，不再逐次序列化模板）"""
+        return {
+            "name": template.plan_name,
+            "description": template.plan_description,
+            "notes": list(template.notes),
+            "tasks": [task.model_dump() for task in template.tasks],
+        }
+
+    async def _save(self, template: PlanTemplate) -> PlanTemplate:
+        template.variables = find_variables(template)
+        await save_json(self._template_path(template.id), template.model_dump())
+        self._cache[template.id] = (
+            file_signature(self._template_path(template.id)), template, self._plan_data(template)
+        )
+        return template
+
+    async def list_templates(self) -> List[PlanTemplateSummary]:
+        """按名称列出所有模板摘要"""
+        summaries = []
+        if not self.templates_dir.exists():
+            return summaries
+        for path in self.templates_dir.glob("*.json"):
+            try:
+                loaded = await self._load(path.stem)
+            except Exception as e:
+                logger.error(f"读取模板 {path.name} 失败: {e}")
+                continue
+            if loaded is None:
+                continue
+            template = loaded[0]
+            summaries.append(PlanTemplateSummary(
+                id=template.id,
+                name=template.name,
+                description=template.description,
+                created_at=template.created_at,
+                updated_at=template.updated_at,
+                variables=template.variables,
+                task_count=len(template.tasks)
+            ))
+        summaries.sort(key=lambda summary: summary.name)
+        return summaries
+
+    async def get(self, template_id: str) -> Optional[PlanTemplate]:
+        """获取模板"""
+        loaded = await self._load(template_id)
+        return loaded[0] if loaded else None
+
+    async def create(self, data: PlanTemplateCreate) -> PlanTemplate:
+        """保存新模板（任务不保留认领租约）"""
+        template = PlanTemplate(**data.model_dump())
+        for task in template.tasks:
+            task.lease = None
+        return await self._save(template)
+
+    async def create_from_plan(self, plan_id: str, data: PlanTemplateFromPlan) -> Optional[PlanTemplate]:
+        """把已有计划保存为模板，计划不存在时返回None"""
+        plan = (await self.store.load_plans()).get(plan_id)
+        if plan is None:
+            return None
+        if data.include_comments:
+            plan = await self.store.comments.attach(plan)
+        tasks = []
+        for task in plan.tasks:
+            tasks.append(Task(
+                id=task.id,
+                title=task.title,
+                description=task.description,
+                order=task.order,
+                dependencies=list(task.dependencies),
+                comments=list(task.comments) if data.include_comments else [],
+                status=TaskStatus.PENDING
+            ))
+        template = PlanTemplate(
+            name=data.name,
+            description=data.description,
+            plan_name=plan.name,
+            plan_description=plan.description,
+            notes=list(plan.notes),
+            tasks=tasks,
+            defaults=data.defaults
+        )
+        return await self._save(template)
+
+    async def delete(self, template_id: str) -> bool:
+        """删除模板"""
+        path = self._template_path(template_id)
+        if path.parent != self.templates_dir or not path.exists():
+            return False
+        path.unlink(missing_ok=True)
+        self._cache.pop(template_id, None)
+        return True
+
+    def build_plan(self, template: PlanTemplate, plan_data: Dict[str, Any], request: TemplateInstantiate) -> Plan:
+        """用变量值实例化模板，缺少变量值时抛出ValueError"""
+        values = {**template.defaults, **request.variables}
+        missing = [name for name in template.variables if name not in values]
+        if missing:
+            raise ValueError(f"缺少模板变量: {', '.join(missing)}")
+
+        # 模板中重复的文本（例如每个任务相同的评论）只替换一次
+        filled: Dict[str, str] = {}
+
+        def fill(text: str) -> str:
+            if "{{" not in text:
+                return text
+            result = filled.get(text)
+            if result is None:
+                result = filled[text] = PLACEHOLDER.sub(lambda match: values.get(match.group(1), match.group(0)), text)
+            return result
+
+        now = datetime.now()
+        data = clone_plan_data(plan_data, fill, created_at=now, updated_at=None)
+        if request.name:
+            data["name"] = request.name
+        return Plan.model_validate(data)
+
+    async def instantiate(self, template_id: str, request: TemplateInstantiate) -> Optional[Plan]:
+        """从模板创建计划，模板不存在时返回None，缺少变量值时抛出ValueError"""
+        loaded = await self._load(template_id)
+        if loaded is None:
+            return None
+        plan = self.build_plan(*loaded, request)
+        async with self.store.transaction() as tx:
+            tx.put(plan)
+            if request.set_current:
+                tx.set_current_plan_id(plan.id)
+        return plan
+
+# 每个数据目录在进程内共享一个模板服务
+_services: Dict[Path, TemplateService] = {}
+
+def get_template_service(data_dir: Optional[Path] = None) -> TemplateService:
+    """获取数据目录（默认为当前工作区的数据目录）对应的模板服务"""
+    path = Path(data_dir or workspace_data_dir()).resolve()
+    service = _services.get(path)
+    if service is None:
+        service = TemplateService(path, get_plan_store(path))
+        _services[path] = service
+    return service
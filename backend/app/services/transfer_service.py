@@ -0,0 +1,119 @@
+from typing import AsyncIterable, AsyncIterator, List, Tuple
+import codecs
+import json
+import logging
+
+from ..models.schemas import Plan, ImportConflictPolicy, PlanImportResult, PlanImportError
+from ..utils.id_remap import remap_plan_ids
+from .plan_store import PlanStore
+
+# 设置日志
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# 导入结果中最多保留的错误条数
+MAX_REPORTED_ERRORS = 100
+
+async def iter_lines(chunks: AsyncIterable[bytes]) -> AsyncIterator[str]:
+    """把字节块流切分为文本行（正确处理跨块的多字节字符和换行）"""
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    buffer = ""
+    async for chunk in chunks:
+        buffer += decoder.decode(chunk)
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            yield line
+    buffer += decoder.decode(b"", final=True)
+    if buffer:
+        yield buffer
+
+class TransferService:
+    """计划的NDJSON批量导出/导入，每行一个计划，内存占用与数据总量无关"""
+
+    def __init__(self, store: PlanStore):
+        self.store = store
+
+    async def export_lines(self, include_archived: bool = False) -> AsyncIterator[str]:
+        """逐个序列化计划为NDJSON行（带完整评论）"""
+        plans = list((await self.store.load_plans()).values())
+        for plan in plans:
+            plan = await self.store.comments.attach(plan)
+            yield plan.model_dump_json() + "\n"
+        if include_archived:
+            for summary in await self.store.archive.search():
+                plan = await self.store.archive.get(summary.id)
+                if plan:
+                    yield plan.model_dump_json() + "\n"
+
+    async def import_lines(
+        self,
+        lines: AsyncIterable[str],
+        conflict: ImportConflictPolicy = ImportConflictPolicy.SKIP,
+        remap_ids: bool = False,
+        batch_size: int = 100
+    ) -> PlanImportResult:
+        """按批校验并导入NDJSON行
+
+        无法解析或校验失败的行会被跳过并记录错误；冲突策略为fail时，
+        遇到ID冲突会放弃所在批次并停止导入（之前的批次已提交）。
+        """
+        result = PlanImportResult()
+        batch: List[Tuple[int, Plan]] = []
+        line_no = 0
+
+        async for line in lines:
+            line_no += 1
+            if not line.strip():
+                continue
+            try:
+                data = json.loads(line)
+                if remap_ids:
+                    data = remap_plan_ids(data)
+                batch.append((line_no, Plan.model_validate(data)))
+            except Exception as e:
+                self._add_error(result, line_no, f"无效的计划数据: {e}")
+                continue
+
+            if len(batch) >= batch_size:
+                if not await self._commit_batch(batch, conflict, result):
+                    return result
+                batch = []
+
+        if batch:
+            await self._commit_batch(batch, conflict, result)
+        return result
+
+    async def _commit_batch(
+        self,
+        batch: List[Tuple[int, Plan]],
+        conflict: ImportConflictPolicy,
+        result: PlanImportResult
+    ) -> bool:
+        """在一个事务中提交一批计划，返回是否继续导入"""
+        async with self.store.transaction() as tx:
+            if conflict == ImportConflictPolicy.FAIL:
+                for line_no, plan in batch:
+                    if plan.id in tx.plans:
+                        self._add_error(result, line_no, f"计划 {plan.id} 已存在")
+                        result.aborted = True
+                        return False
+
+            for line_no, plan in batch:
+                if plan.id in tx.plans:
+                    if conflict == ImportConflictPolicy.SKIP:
+                        result.skipped += 1
+                        continue
+                    if conflict == ImportConflictPolicy.RENAME:
+                        plan = Plan.model_validate(remap_plan_ids(plan.model_dump()))
+                        result.renamed += 1
+                    else:
+                        result.replaced += 1
+                tx.put(plan)
+                result.imported += 1
+        return True
+
+    @staticmethod
+    def _add_error(result: PlanImportResult, line_no: int, message: str) -> None:
+        result.failed += 1
+        if len(result.errors) < MAX_REPORTED_ERRORS:
+            result.errors.append(PlanImportError(line=line_no, error=message))
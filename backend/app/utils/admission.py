@@ -0,0 +1,247 @@
+import asyncio
+import json
+import math
+import re
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional, Pattern, Sequence, Tuple
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from ..models.schemas import AdmissionLaneStatus
+
+# 平均处理时间的指数移动平均平滑系数
+EWMA_ALPHA = 0.2
+# Retry-After的上下限（秒）
+MIN_RETRY_AFTER = 1
+MAX_RETRY_AFTER = 60
+
+class Lane:
+    """一条准入通道：最多concurrency个请求同时处理，最多queue_size个请求排队等待
+
+    空位按先到先得交给排队的请求，排队超过max_wait秒或队列已满时拒绝。priority越小
+    优先级越高：有更高优先级的请求正在处理时，本通道只保留一个处理名额，其余请求
+    排队等高优先级通道空闲后再开始（保证一个名额，低优先级通道不会被完全饿死）。
+    priority为None的通道不参与优先级调度。
+    """
+
+    def __init__(self, name: str, concurrency: int, queue_size: int, max_wait: float, priority: Optional[int] = None):
+        self.name = name
+        self.concurrency = max(1, concurrency)
+        self.queue_size = max(0, queue_size)
+        self.max_wait = max_wait
+        self.priority = priority
+        self.controller: Optional["AdmissionController"] = None
+        self.active = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self.ewma_seconds: Optional[float] = None
+        self.admitted = 0
+        self.rejected = 0
+        self.queued = 0
+
+    def _can_start(self) -> bool:
+        if self.active >= self.concurrency:
+            return False
+        if (self.active >= 1 and self.priority is not None and self.controller is not None
+                and self.controller.busy_above(self.priority)):
+            return False
+        return True
+
+    async def acquire(self) -> bool:
+        """申请一个处理名额，被拒绝时返回False"""
+        if not self._waiters and self._can_start():
+            self.active += 1
+            self.admitted += 1
+            return True
+        if len(self._waiters) >= self.queue_size:
+            self.rejected += 1
+            return False
+
+        self.queued += 1
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait([waiter], timeout=self.max_wait)
+        except asyncio.CancelledError:
+            # 客户端在排队时断开：名额已经移交过来就归还
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            else:
+                waiter.cancel()
+                self._remove(waiter)
+            raise
+        if waiter.done():
+            self.admitted += 1
+            return True
+        waiter.cancel()
+        self._remove(waiter)
+        self.rejected += 1
+        return False
+
+    def _remove(self, waiter: asyncio.Future) -> None:
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
+
+    def release(self) -> None:
+        """释放名额，并让排队的请求（包括低优先级通道中被推迟的请求）开始处理"""
+        self.active -= 1
+        if self.controller is not None and self.priority is not None:
+            self.controller.pump()
+        else:
+            self.pump()
+
+    def pump(self) -> None:
+        """按先到先得把空出的名额交给排队的请求"""
+        while self._waiters and self._can_start():
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.active += 1
+                waiter.set_result(None)
+
+    def observe(self, seconds: float) -> None:
+        self.ewma_seconds = seconds if self.ewma_seconds is None else EWMA_ALPHA * seconds + (1 - EWMA_ALPHA) * self.ewma_seconds
+
+    def retry_after(self) -> int:
+        """按平均处理时间估计排在前面的请求处理完需要的秒数"""
+        if self.ewma_seconds is None:
+            return MIN_RETRY_AFTER
+        estimate = self.ewma_seconds * (len(self._waiters) + 1) / self.concurrency
+        return min(MAX_RETRY_AFTER, max(MIN_RETRY_AFTER, math.ceil(estimate)))
+
+    def status(self) -> AdmissionLaneStatus:
+        return AdmissionLaneStatus(
+            name=self.name,
+            concurrency=self.concurrency,
+            queue_size=self.queue_size,
+            active=self.active,
+            waiting=len(self._waiters),
+            admitted=self.admitted,
+            queued=self.queued,
+            rejected=self.rejected,
+            avg_duration_ms=round(self.ewma_seconds * 1000, 1) if self.ewma_seconds is not None else None
+        )
+
+# 路由规则：(请求方法, 路径正则, 通道名)，按顺序匹配第一条
+Rule = Tuple[Sequence[str], Pattern, str]
+
+class AdmissionController:
+    """按路由把请求分到不同的准入通道
+
+    昂贵的请求（文本解析、全量列表、导入导出、修订历史）使用并发很小的独立通道，
+    agent上报进度的轻量写请求（更新状态、认领/续租/释放、评论）和读取当前计划使用
+    单独的最高优先级通道：它们处理期间昂贵请求不再开始新的处理（只保留一个名额），
+    避免事件循环被大响应的序列化占满。未匹配任何规则的路径不受限制。
+    """
+
+    def __init__(self, lanes: List[Lane], rules: List[Rule]):
+        self.lanes: Dict[str, Lane] = {lane.name: lane for lane in lanes}
+        self.rules = rules
+        for lane in lanes:
+            lane.controller = self
+        # 高优先级通道先分配名额
+        self._prioritized = sorted(
+            (lane for lane in lanes if lane.priority is not None), key=lambda lane: lane.priority
+        )
+
+    def busy_above(self, priority: int) -> bool:
+        """是否有更高优先级的请求正在处理"""
+        return any(lane.active for lane in self._prioritized if lane.priority < priority)
+
+    def pump(self) -> None:
+        for lane in self._prioritized:
+            lane.pump()
+
+    def classify(self, method: str, path: str) -> Optional[Lane]:
+        for methods, pattern, lane in self.rules:
+            if method in methods and pattern.match(path):
+                return self.lanes[lane]
+        return None
+
+    def status(self) -> List[AdmissionLaneStatus]:
+        return [lane.status() for lane in self.lanes.values()]
+
+def default_controller(
+    status_concurrency: int,
+    default_concurrency: int,
+    bulk_concurrency: int,
+    parse_concurrency: int,
+    queue_factor: int,
+    max_wait: float
+) -> AdmissionController:
+    """本服务使用的通道和路由规则"""
+    def lane(name: str, concurrency: int, priority: int) -> Lane:
+        return Lane(name, concurrency, concurrency * queue_factor, max_wait, priority)
+
+    task = r"/plans/[^/]+/tasks/[^/]+"
+    rules: List[Rule] = [
+        (("PUT",), rf"^{task}/status$", "status"),
+        (("POST",), rf"^{task}/(claim|renew|release|comments)$", "status"),
+        (("POST",), r"^/plans/claim-next$", "status"),
+        (("GET",), r"^/plans/(current|next-tasks)$", "status"),
+        # 仪表盘读取增量维护的汇总，与计划数无关
+        (("GET",), r"^/dashboard/?$", "status"),
+        (("POST",), r"^/plans/(from-text|[^/]+/reparse)$", "parse"),
+        (("GET",), r"^/plans/?$", "bulk"),
+        (("GET",), r"^/plans/(export|archive)(/.*)?$", "bulk"),
+        (("POST",), r"^/plans/import$", "bulk"),
+        (("GET",), r"^/plans/[^/]+/(revisions|analytics|tasks/similar)(/.*)?$", "bulk"),
+        # 长轮询任务状态只是等待，不占用其他通道的名额
+        (("GET",), r"^/jobs/[^/]+$", "poll"),
+        (("GET", "POST", "PUT", "DELETE", "PATCH"), r"^/(plans|jobs|templates)(/.*)?$", "default"),
+    ]
+    return AdmissionController(
+        lanes=[
+            lane("status", status_concurrency, priority=0),
+            lane("default", default_concurrency, priority=1),
+            lane("bulk", bulk_concurrency, priority=2),
+            lane("parse", parse_concurrency, priority=2),
+            # 长轮询只是等待事件，不消耗CPU，不参与优先级调度
+            Lane("poll", default_concurrency * queue_factor, 0, max_wait),
+        ],
+        rules=[(methods, re.compile(pattern), name) for methods, pattern, name in rules]
+    )
+
+class AdmissionControlMiddleware:
+    """准入控制中间件：通道已满且排队超时（或队列已满）时立即返回429和Retry-After"""
+
+    def __init__(self, app: ASGIApp, controller: AdmissionController):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        lane = self.controller.classify(scope["method"], scope["path"])
+        if lane is None:
+            await self.app(scope, receive, send)
+            return
+
+        if not await lane.acquire():
+            await self._reject(lane, send)
+            return
+        started = time.monotonic()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            lane.release()
+            lane.observe(time.monotonic() - started)
+
+    async def _reject(self, lane: Lane, send: Send) -> None:
+        retry_after = lane.retry_after()
+        body = json.dumps(
+            {"detail": f"服务繁忙（{lane.name}），请在 {retry_after} 秒后重试"},
+            ensure_ascii=False
+        ).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode("latin-1")),
+                (b"retry-after", str(retry_after).encode("latin-1")),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -1,12 +1,20 @@
+import asyncio
 import json
 import os
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, List, Optional, TypeVar, Type, Union
+from typing import Any, Dict, Optional, Tuple, TypeVar, Type, Union
 
 import aiofiles
 from pydantic import BaseModel
 
+# fcntl仅在类Unix系统上可用，不可用时文件锁退化为进程内锁
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:
+    FCNTL_AVAILABLE = False
+
 # 类型变量，用于泛型函数
 T = TypeVar('T', bound=BaseModel)
 
@@ -28,13 +36,90 @@ async def load_json(file_path: Union[str, Path]) -> Dict[str, Any]:
         return json.loads(content) if content else {}
 
 async def save_json(file_path: Union[str, Path], data: Dict[str, Any]) -> None:
-    """异步保存JSON数据到文件"""
+    """异步保存JSON数据到文件
+    
+    先写入同目录下的临时文件再原子替换，其他进程不会读到写了一半的内容。
+    """
     file_path = Path(file_path)
     file_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = file_path.with_name(f".{file_path.name}.{os.getpid()}.tmp")
     
-    async with aiofiles.open(file_path, 'w', encoding='utf-8') as f:
+    async with aiofiles.open(tmp_path, 'w', encoding='utf-8') as f:
         json_str = json.dumps(data, cls=DateTimeEncoder, ensure_ascii=False, indent=2)
         await f.write(json_str)
+    os.replace(tmp_path, file_path)
+
+def write_bytes_atomic(file_path: Union[str, Path], content: bytes) -> None:
+    """同步写入文件（临时文件 + 原子替换），供在线程中调用"""
+    file_path = Path(file_path)
+    file_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = file_path.with_name(f".{file_path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, 'wb') as f:
+        f.write(content)
+    os.replace(tmp_path, file_path)
+
+def write_text_atomic(file_path: Union[str, Path], content: str) -> None:
+    """同步写入文本文件（临时文件 + 原子替换），供在线程中调用"""
+    write_bytes_atomic(file_path, content.encode("utf-8"))
+
+def dump_json_fragment(data: Any, level: int) -> str:
+    """把数据序列化为嵌套在第level层的JSON文本（与json.dumps(indent=2)整体输出的对应片段一致）"""
+    text = json.dumps(data, cls=DateTimeEncoder, ensure_ascii=False, indent=2)
+    # JSON字符串中的换行都已转义，只有结构换行需要补缩进
+    return text.replace("\n", "\n" + "  " * level)
+
+def file_signature(file_path: Union[str, Path]) -> Optional[Tuple[int, int, int]]:
+    """获取文件签名(inode, 大小, 修改时间)，用于判断文件是否被其他进程改写"""
+    try:
+        stat = os.stat(file_path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+class FileLock:
+    """跨进程的异步文件锁
+    
+    进程内先通过asyncio.Lock排队，再在线程中获取fcntl排他锁，
+    因此等待其他进程释放锁时不会阻塞事件循环。
+    """
+    def __init__(self, lock_path: Union[str, Path]):
+        self.lock_path = Path(lock_path)
+        self._lock = asyncio.Lock()
+        self._fd: Optional[int] = None
+
+    async def acquire(self) -> None:
+        await self._lock.acquire()
+        if not FCNTL_AVAILABLE:
+            return
+        try:
+            self.lock_path.parent.mkdir(parents=True, exist_ok=True)
+            fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                await asyncio.to_thread(fcntl.flock, fd, fcntl.LOCK_EX)
+            except BaseException:
+                os.close(fd)
+                raise
+            self._fd = fd
+        except BaseException:
+            self._lock.release()
+            raise
+
+    def release(self) -> None:
+        if self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+        self._lock.release()
+
+    def locked(self) -> bool:
+        return self._lock.locked()
+
+    async def __aenter__(self) -> "FileLock":
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        self.release()
 
 def pydantic_to_dict(obj: BaseModel) -> Dict[str, Any]:
     """将Pydantic模型转换为字典"""
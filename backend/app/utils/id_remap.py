@@ -0,0 +1,75 @@
+from typing import Any, Callable, Dict, Optional
+from uuid import uuid4
+
+def remap_plan_ids(data: Dict[str, Any]) -> Dict[str, Any]:
+    """为计划数据中的计划、任务和评论分配新ID（原地修改并返回）
+
+    任务依赖中引用旧任务ID的条目会同步替换为新ID，按标题引用的依赖保持不变。
+    """
+    data["id"] = str(uuid4())
+    id_map: Dict[str, str] = {}
+    tasks = data.get("tasks") or []
+    for task in tasks:
+        new_id = str(uuid4())
+        if task.get("id"):
+            id_map[task["id"]] = new_id
+        task["id"] = new_id
+        for comment in task.get("comments") or []:
+            comment["id"] = str(uuid4())
+    for task in tasks:
+        dependencies = task.get("dependencies")
+        if dependencies:
+            task["dependencies"] = [id_map.get(dep, dep) for dep in dependencies]
+    return data
+
+def clone_plan_data(
+    data: Dict[str, Any],
+    fill: Optional[Callable[[str], str]] = None,
+    **overrides: Any
+) -> Dict[str, Any]:
+    """复制计划数据并分配新ID，不修改输入
+
+    一次遍历完成任务和评论的复制、ID分配和依赖重映射：依赖引用的任务排在后面时
+    提前为它分配ID，轮到该任务时使用同一个ID。fill用于替换名称、描述、注意事项、
+    任务标题/描述和评论内容中的文本；overrides中的字段（例如时间戳）覆盖到计划、
+    任务和评论上。
+    """
+    fill = fill or (lambda text: text)
+    tasks = data.get("tasks") or []
+    task_ids = {task["id"] for task in tasks if task.get("id")}
+    id_map: Dict[str, str] = {}
+
+    def new_task_id(old_id: str) -> str:
+        new_id = id_map.get(old_id)
+        if new_id is None:
+            new_id = id_map[old_id] = str(uuid4())
+        return new_id
+
+    def fill_optional(text: Optional[str]) -> Optional[str]:
+        return fill(text) if text else text
+
+    cloned_tasks = []
+    for task in tasks:
+        cloned = {
+            **task,
+            **overrides,
+            "id": new_task_id(task["id"]) if task.get("id") else str(uuid4()),
+            "title": fill(task["title"]),
+            "description": fill_optional(task.get("description")),
+            "dependencies": [new_task_id(dep) if dep in task_ids else dep for dep in task.get("dependencies") or []],
+            "comments": [
+                {**comment, **overrides, "id": str(uuid4()), "content": fill(comment["content"])}
+                for comment in task.get("comments") or []
+            ],
+        }
+        cloned_tasks.append(cloned)
+
+    return {
+        **data,
+        **overrides,
+        "id": str(uuid4()),
+        "name": fill(data["name"]),
+        "description": fill_optional(data.get("description")),
+        "notes": [fill(note) for note in data.get("notes") or []],
+        "tasks": cloned_tasks,
+    }
@@ -0,0 +1,66 @@
+from typing import Any, Dict, List, Union
+
+# 路径由字典键和列表下标组成
+PathType = List[Union[str, int]]
+
+def diff(old: Any, new: Any) -> List[Dict[str, Any]]:
+    """计算两个JSON文档之间的差异操作列表
+
+    操作格式:
+        {"op": "set", "path": [...], "value": v}       设置字典键或列表元素（下标等于长度时为追加）
+        {"op": "delete", "path": [...]}                删除字典键
+        {"op": "truncate", "path": [...], "value": n}  把列表截断为n个元素
+    """
+    ops: List[Dict[str, Any]] = []
+    _diff(old, new, [], ops)
+    return ops
+
+def _diff(old: Any, new: Any, path: PathType, ops: List[Dict[str, Any]]) -> None:
+    if isinstance(old, dict) and isinstance(new, dict):
+        for key in old:
+            if key not in new:
+                ops.append({"op": "delete", "path": path + [key]})
+        for key, value in new.items():
+            if key in old:
+                _diff(old[key], value, path + [key], ops)
+            else:
+                ops.append({"op": "set", "path": path + [key], "value": value})
+    elif isinstance(old, list) and isinstance(new, list):
+        common = min(len(old), len(new))
+        for i in range(common):
+            _diff(old[i], new[i], path + [i], ops)
+        if len(new) < len(old):
+            ops.append({"op": "truncate", "path": path, "value": len(new)})
+        for i in range(common, len(new)):
+            ops.append({"op": "set", "path": path + [i], "value": new[i]})
+    elif type(old) is not type(new) or old != new:
+        ops.append({"op": "set", "path": path, "value": new})
+
+def apply(doc: Any, ops: List[Dict[str, Any]]) -> Any:
+    """把差异操作应用到文档上（原地修改），返回结果文档"""
+    for op in ops:
+        path = op["path"]
+        if not path:
+            if op["op"] == "truncate":
+                del doc[op["value"]:]
+            else:
+                doc = op.get("value")
+            continue
+
+        parent = doc
+        for key in path[:-1]:
+            parent = parent[key]
+        key = path[-1]
+
+        if op["op"] == "set":
+            if isinstance(parent, list) and key == len(parent):
+                parent.append(op["value"])
+            else:
+                parent[key] = op["value"]
+        elif op["op"] == "delete":
+            del parent[key]
+        elif op["op"] == "truncate":
+            del parent[key][op["value"]:]
+        else:
+            raise ValueError(f"未知的差异操作: {op['op']}")
+    return doc
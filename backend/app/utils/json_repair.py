@@ -0,0 +1,185 @@
+import json
+import re
+from typing import Any, Iterator, List, Optional, Tuple
+
+# 截断输出时最多回退尝试的截断点数量
+MAX_CUT_ATTEMPTS = 64
+
+FENCE_PATTERN = re.compile(r"```(?:json)?\s*(.*?)(?:```|$)", re.DOTALL)
+UNQUOTED_KEY = re.compile(r"([{,]\s*)([A-Za-z_$][\w$-]*)(\s*:)")
+TRAILING_COMMA = re.compile(r",(\s*[}\]])")
+PYTHON_LITERALS = {"True": "true", "False": "false", "None": "null"}
+PYTHON_LITERAL = re.compile(r"\b(True|False|None)\b")
+
+_decoder = json.JSONDecoder()
+
+def _segments(text: str) -> Iterator[Tuple[bool, str]]:
+    """把文本切分为(是否字符串, 片段)，字符串片段包含引号；未闭合的字符串延续到文本末尾"""
+    i = 0
+    start = 0
+    length = len(text)
+    # 上一个非空白字符
+    previous = ""
+    while i < length:
+        char = text[i]
+        # 单引号只在值或键的位置才视为字符串起点，避免把英文撇号当成字符串
+        if char == '"' or (char == "'" and previous in ("{", "[", ",", ":")):
+            if start < i:
+                yield False, text[start:i]
+            quote = char
+            j = i + 1
+            while j < length and text[j] != quote:
+                j += 2 if text[j] == "\\" else 1
+            yield True, text[i:j + 1]
+            i = start = j + 1
+            previous = quote
+        else:
+            if not char.isspace():
+                previous = char
+            i += 1
+    if start < length:
+        yield False, text[start:]
+
+def _normalize_string(segment: str) -> str:
+    """单引号字符串转为双引号字符串，未闭合的字符串补上引号"""
+    quote = segment[0]
+    closed = len(segment) > 1 and segment.endswith(quote) and not segment.endswith("\\" + quote)
+    body = segment[1:-1] if closed else segment[1:]
+    if body.endswith("\\") and not body.endswith("\\\\"):
+        body = body[:-1]
+    if quote == "'":
+        body = body.replace('\\\'', "'").replace('"', '\\"')
+    # 字符串中不允许出现未转义的控制字符
+    body = body.replace("\n", "\\n").replace("\r", "\\r").replace("\t", "\\t")
+    return f'"{body}"'
+
+def normalize(text: str) -> str:
+    """修正常见的非标准JSON写法：单引号字符串、未加引号的键、尾随逗号和Python字面量"""
+    parts: List[str] = []
+    for is_string, segment in _segments(text):
+        if is_string:
+            parts.append(_normalize_string(segment))
+        else:
+            segment = PYTHON_LITERAL.sub(lambda m: PYTHON_LITERALS[m.group(1)], segment)
+            parts.append(segment)
+    normalized = "".join(parts)
+    # 未加引号的键和尾随逗号只在字符串外修正，第二轮切分保证不改动字符串内容
+    parts = []
+    for is_string, segment in _segments(normalized):
+        if not is_string:
+            segment = UNQUOTED_KEY.sub(r'\1"\2"\3', segment)
+            segment = TRAILING_COMMA.sub(r"\1", segment)
+        parts.append(segment)
+    return "".join(parts)
+
+def _strip_trailing_commas(text: str) -> str:
+    parts = []
+    for is_string, segment in _segments(text):
+        parts.append(segment if is_string else TRAILING_COMMA.sub(r"\1", segment))
+    return "".join(parts)
+
+def _close_truncated(text: str) -> Optional[Any]:
+    """补全被截断的JSON：闭合字符串和括号，必要时回退到最近的逗号或左括号处再闭合"""
+    stack: List[str] = []
+    # 可以安全截断的位置及当时的括号栈
+    cuts: List[Tuple[int, str]] = []
+    in_string = False
+    escape = False
+    for i, char in enumerate(text):
+        if in_string:
+            if escape:
+                escape = False
+            elif char == "\\":
+                escape = True
+            elif char == '"':
+                in_string = False
+            continue
+        if char == '"':
+            in_string = True
+        elif char in "{[":
+            stack.append("}" if char == "{" else "]")
+            cuts.append((i + 1, "".join(reversed(stack))))
+        elif char in "}]":
+            if not stack or stack.pop() != char:
+                # 括号不匹配，不是简单的截断
+                return None
+            if not stack:
+                # 根对象已经完整
+                return _loads(text[:i + 1])
+        elif char == ",":
+            cuts.append((i, "".join(reversed(stack))))
+
+    tail = text
+    if in_string:
+        tail = tail[:-1] if escape else tail
+        tail += '"'
+    candidate = _loads(tail.rstrip().rstrip(",") + "".join(reversed(stack)))
+    if candidate is not None:
+        return candidate
+    for position, closers in reversed(cuts[-MAX_CUT_ATTEMPTS:]):
+        candidate = _loads(text[:position] + closers)
+        if candidate is not None:
+            return candidate
+    return None
+
+def _loads(text: str) -> Optional[Any]:
+    try:
+        return json.loads(_strip_trailing_commas(text))
+    except json.JSONDecodeError:
+        return None
+
+def _object_starts(text: str) -> List[int]:
+    """字符串外所有左花括号的位置"""
+    starts = []
+    offset = 0
+    for is_string, segment in _segments(text):
+        if not is_string:
+            starts.extend(offset + i for i, char in enumerate(segment) if char == "{")
+        offset += len(segment)
+    return starts
+
+def repair_json(text: str) -> Optional[Any]:
+    """尽量从模型输出中恢复JSON对象，无法恢复时返回None
+
+    依次尝试：去掉Markdown代码块并修正非标准写法后直接解析；从第一个左花括号解析出
+    完整对象（忽略其后的多余文本）；补全被截断的根对象；最后在所有位置中找出能
+    解析的最大对象。
+    """
+    if not text:
+        return None
+    fenced = FENCE_PATTERN.search(text)
+    if fenced and "{" in fenced.group(1):
+        text = fenced.group(1)
+    # 丢弃JSON之前的说明文字
+    start = text.find("{")
+    if start < 0:
+        return None
+    text = normalize(text[start:].strip())
+
+    data = _loads(text)
+    if isinstance(data, dict):
+        return data
+
+    starts = _object_starts(text)
+    if not starts:
+        return None
+    try:
+        data, _ = _decoder.raw_decode(text, starts[0])
+        if isinstance(data, dict):
+            return data
+    except json.JSONDecodeError:
+        pass
+
+    data = _close_truncated(text[starts[0]:])
+    if isinstance(data, dict):
+        return data
+
+    best, best_size = None, 0
+    for start in starts[1:]:
+        try:
+            data, end = _decoder.raw_decode(text, start)
+        except json.JSONDecodeError:
+            continue
+        if isinstance(data, dict) and end - start > best_size:
+            best, best_size = data, end - start
+    return best
@@ -0,0 +1,53 @@
+import re
+from hashlib import sha1
+from typing import List, Optional, Set
+
+# 标题行（Markdown）
+HEADING = re.compile(r"^#{1,6}\s")
+# 顶层列表项：无序列表、数字编号（1. 1) 1、）和中文编号（一、）
+LIST_ITEM = re.compile(r"^(?:[-*+]\s|\d+[.)、]|[一二三四五六七八九十]+[、.])")
+
+def split_sections(text: str) -> List[str]:
+    """把计划文本分为段落
+
+    标题行、顶层列表项和空行之后的非缩进行开始新的一段，缩进的行属于上一段；
+    标题（包括连续的多级标题）与紧随其后的内容合为一段。段落内的空行被去掉，行尾空白被去掉。
+    """
+    sections: List[List[str]] = []
+    current: List[str] = []
+    after_blank = False
+    for line in text.splitlines():
+        if not line.strip():
+            after_blank = True
+            continue
+        indented = line[:1] in (" ", "\t")
+        starts = not indented and (after_blank or HEADING.match(line) or LIST_ITEM.match(line))
+        only_heading = all(HEADING.match(previous) for previous in current)
+        if starts and current and not only_heading:
+            sections.append(current)
+            current = []
+        current.append(line.rstrip())
+        after_blank = False
+    if current:
+        sections.append(current)
+    return ["\n".join(lines) for lines in sections]
+
+def section_key(section: str) -> str:
+    """段落的内容标识（忽略空白差异）"""
+    return sha1(" ".join(section.split()).encode("utf-8")).hexdigest()[:12]
+
+def changed_sections(old_text: Optional[str], sections: List[str]) -> List[List[int]]:
+    """新文本中内容有变化（旧文本中没有相同内容）的段落下标，相邻的段落分为一组
+
+    old_text为None时所有段落都视为有变化。只移动了位置的段落不算变化。
+    """
+    old_keys: Set[str] = {section_key(section) for section in split_sections(old_text)} if old_text is not None else set()
+    hunks: List[List[int]] = []
+    for i, section in enumerate(sections):
+        if section_key(section) in old_keys:
+            continue
+        if hunks and hunks[-1][-1] == i - 1:
+            hunks[-1].append(i)
+        else:
+            hunks.append([i])
+    return hunks
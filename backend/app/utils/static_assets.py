@@ -0,0 +1,143 @@
+import gzip
+import hashlib
+import mimetypes
+import re
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+from typing import Dict, Optional
+
+from starlette.datastructures import Headers
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+
+from .compression import BROTLI_AVAILABLE, choose_encoding
+
+if BROTLI_AVAILABLE:
+    import brotli
+
+# 可以压缩的内容类型前缀
+COMPRESSIBLE_TYPES = ("text/", "application/javascript", "application/json", "image/svg+xml")
+# HTML中引用本地脚本和样式表的属性，用于追加内容哈希
+ASSET_REFERENCE = re.compile(r'(src|href)="(/[^"?#]+\.(?:js|css))"')
+
+class StaticAsset:
+    """启动时加载到内存的静态文件，预先计算压缩内容、ETag和Last-Modified"""
+
+    def __init__(self, body: bytes, content_type: str, minimum_size: int, mtime: float):
+        self.body = body
+        self.content_type = content_type
+        self.digest = hashlib.sha1(body).hexdigest()[:16]
+        self.etag = f'"{self.digest}"'
+        # HTTP日期只精确到秒
+        self.mtime = int(mtime)
+        self.last_modified = formatdate(self.mtime, usegmt=True)
+        self.encoded: Dict[str, bytes] = {}
+        if len(body) >= minimum_size and content_type.startswith(COMPRESSIBLE_TYPES):
+            self.encoded["gzip"] = gzip.compress(body, compresslevel=9)
+            if BROTLI_AVAILABLE:
+                self.encoded["br"] = brotli.compress(body, quality=11)
+
+class StaticAssets:
+    """同源提供web前端的ASGI应用
+
+    启动时一次性读取目录下所有文件并预压缩；HTML在加载时注入CODE_DOCK_CONFIG，
+    并给本地js/css引用追加内容哈希（?v=...），带哈希的请求可以被浏览器长期缓存，
+    HTML本身每次都需要用ETag或Last-Modified重新验证（同时带两者时以If-None-Match为准，
+    与StaticFiles一致）。请求时只查内存表，不访问文件系统。
+    """
+
+    def __init__(self, directory: Path, config_script: str, minimum_size: int = 1024):
+        self.directory = Path(directory)
+        self.config_script = config_script
+        self.minimum_size = minimum_size
+        self.assets: Dict[str, StaticAsset] = {}
+        self._load()
+
+    def _load(self) -> None:
+        pages = []
+        latest = 0.0
+        for path in sorted(self.directory.rglob("*")):
+            if not path.is_file() or path.name.startswith("."):
+                continue
+            url_path = "/" + path.relative_to(self.directory).as_posix()
+            if path.suffix == ".html":
+                pages.append((url_path, path))
+                continue
+            asset = self._asset(path.read_bytes(), path, path.stat().st_mtime)
+            self.assets[url_path] = asset
+            latest = max(latest, asset.mtime)
+
+        # HTML最后处理，这样才能引用到其他资源的内容哈希；引用的资源变化时HTML内容也随之变化，
+        # 因此修改时间取HTML文件和其他资源中最新的一个
+        for url_path, path in pages:
+            html = path.read_text(encoding="utf-8")
+            html = ASSET_REFERENCE.sub(self._versioned_reference, html)
+            html = html.replace("</head>", f"<script>{self.config_script}</script>\n</head>", 1)
+            self.assets[url_path] = self._asset(html.encode("utf-8"), path, max(path.stat().st_mtime, latest))
+
+    def _asset(self, body: bytes, path: Path, mtime: float) -> StaticAsset:
+        content_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+        # text/*类型由Response自动追加charset
+        if content_type == "application/javascript":
+            content_type += "; charset=utf-8"
+        return StaticAsset(body, content_type, self.minimum_size, mtime)
+
+    def _versioned_reference(self, match: "re.Match[str]") -> str:
+        attribute, url_path = match.groups()
+        asset = self.assets.get(url_path)
+        if asset is None:
+            return match.group(0)
+        return f'{attribute}="{url_path}?v={asset.digest}"'
+
+    @staticmethod
+    def not_modified(asset: StaticAsset, request_headers: Headers) -> bool:
+        """客户端缓存是否仍然有效：有If-None-Match时只比较ETag，否则比较If-Modified-Since"""
+        if_none_match = request_headers.get("if-none-match")
+        if if_none_match:
+            return if_none_match.strip() == "*" or asset.etag in [tag.strip() for tag in if_none_match.split(",")]
+        if_modified_since = request_headers.get("if-modified-since")
+        if if_modified_since:
+            try:
+                return asset.mtime <= parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    def lookup(self, path: str) -> Optional[StaticAsset]:
+        if path.endswith("/"):
+            path += "index.html"
+        return self.assets.get(path)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        assert scope["type"] == "http"
+        asset = self.lookup(scope["path"])
+        if asset is None or scope["method"] not in ("GET", "HEAD"):
+            status = 404 if asset is None else 405
+            await Response("Not Found" if status == 404 else "Method Not Allowed", status_code=status)(scope, receive, send)
+            return
+
+        request_headers = Headers(scope=scope)
+        headers = {"ETag": asset.etag, "Last-Modified": asset.last_modified}
+        query = scope.get("query_string", b"").decode("latin-1")
+        if f"v={asset.digest}" in query:
+            # 带内容哈希的URL在内容变化后会变成另一个URL，可以永久缓存
+            headers["Cache-Control"] = "public, max-age=31536000, immutable"
+        else:
+            headers["Cache-Control"] = "no-cache"
+        if asset.encoded:
+            headers["Vary"] = "Accept-Encoding"
+
+        if self.not_modified(asset, request_headers):
+            await Response(status_code=304, headers=headers)(scope, receive, send)
+            return
+
+        body = asset.body
+        encoding = choose_encoding(request_headers.get("accept-encoding", "")) if asset.encoded else None
+        if encoding in asset.encoded:
+            body = asset.encoded[encoding]
+            headers["Content-Encoding"] = encoding
+
+        response = Response(body if scope["method"] == "GET" else b"", media_type=asset.content_type, headers=headers)
+        if scope["method"] == "HEAD":
+            response.headers["Content-Length"] = str(len(body))
+        await response(scope, receive, send)
@@ -0,0 +1,53 @@
+import re
+from typing import Dict, List, Optional
+
+# tiktoken为可选依赖，未安装时按字符数估算
+try:
+    import tiktoken
+    TIKTOKEN_AVAILABLE = True
+except ImportError:
+    TIKTOKEN_AVAILABLE = False
+
+# 每条消息的格式开销（role、分隔符等）和回复的起始开销
+MESSAGE_OVERHEAD_TOKENS = 4
+REPLY_OVERHEAD_TOKENS = 2
+
+CJK_PATTERN = re.compile(r"[　-〿㐀-䶿一-鿿豈-﫿＀-￯]")
+WHITESPACE_RUN = re.compile(r"[ \t]+")
+BLANK_LINES = re.compile(r"\n\s*\n+")
+
+_encodings: Dict[str, object] = {}
+
+def _encoding(model: Optional[str]):
+    key = model or ""
+    encoding = _encodings.get(key)
+    if encoding is None:
+        try:
+            encoding = tiktoken.encoding_for_model(model) if model else tiktoken.get_encoding("cl100k_base")
+        except KeyError:
+            # 未知模型（如兼容OpenAI协议的其他服务）使用通用编码
+            encoding = tiktoken.get_encoding("cl100k_base")
+        _encodings[key] = encoding
+    return encoding
+
+def count_tokens(text: str, model: Optional[str] = None) -> int:
+    """统计文本的token数，未安装tiktoken时估算（中日韩字符约1个token，其余约4个字符1个token）"""
+    if not text:
+        return 0
+    if TIKTOKEN_AVAILABLE:
+        return len(_encoding(model).encode(text))
+    cjk = len(CJK_PATTERN.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+def count_message_tokens(messages: List[Dict[str, str]], model: Optional[str] = None) -> int:
+    """统计一组聊天消息的输入token数"""
+    return sum(count_tokens(message["content"], model) + MESSAGE_OVERHEAD_TOKENS for message in messages) + REPLY_OVERHEAD_TOKENS
+
+def compact_whitespace(text: str) -> str:
+    """压缩空白：保留行首缩进（可能表示任务层级），行内连续空白合并为一个，多个空行合并为一个"""
+    lines = []
+    for line in text.strip().splitlines():
+        content = line.lstrip()
+        indent = line[:len(line) - len(content)].replace("\t", "    ")
+        lines.append(indent + WHITESPACE_RUN.sub(" ", content).rstrip())
+    return BLANK_LINES.sub("\n\n", "\n".join(lines))
@@ -0,0 +1,103 @@
+import json
+import re
+from contextvars import ContextVar
+from pathlib import Path
+from typing import List, Optional
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from ..config import settings
+
+# 工作区名称：字母或数字开头，由字母、数字、下划线、点和短横线组成
+WORKSPACE_NAME = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_.-]{0,63}$")
+# 默认工作区直接使用DATA_DIR（兼容没有工作区时的数据）
+DEFAULT_WORKSPACE = "default"
+WORKSPACE_HEADER = "x-workspace"
+WORKSPACE_PREFIX = re.compile(r"^/w/([^/]+)(/.*)?$")
+
+# 当前请求所在的工作区，None为默认工作区
+current_workspace: ContextVar[Optional[str]] = ContextVar("current_workspace", default=None)
+
+def normalize_workspace(name: Optional[str]) -> Optional[str]:
+    """校验工作区名称，默认工作区返回None，名称非法时抛出ValueError"""
+    if not name or name == DEFAULT_WORKSPACE:
+        return None
+    if not WORKSPACE_NAME.match(name):
+        raise ValueError(f"无效的工作区名称: {name}")
+    return name
+
+def workspace_data_dir(workspace: Optional[str] = None) -> Path:
+    """工作区的数据目录，未指定时使用当前请求所在的工作区
+
+    默认工作区为DATA_DIR，其他工作区为DATA_DIR/workspaces/<名称>，每个工作区有独立的
+    计划、当前计划指针、评论、历史、归档、模板和后台任务。
+    """
+    workspace = workspace or current_workspace.get()
+    if workspace is None or workspace == DEFAULT_WORKSPACE:
+        return settings.data_dir_path
+    return settings.data_dir_path / settings.WORKSPACE_DIR / workspace
+
+def list_workspaces() -> List[str]:
+    """列出所有已有数据的工作区（默认工作区排在最前）"""
+    names = [DEFAULT_WORKSPACE]
+    root = settings.data_dir_path / settings.WORKSPACE_DIR
+    if root.is_dir():
+        names.extend(sorted(
+            path.name for path in root.iterdir()
+            if path.is_dir() and WORKSPACE_NAME.match(path.name) and path.name != DEFAULT_WORKSPACE
+        ))
+    return names
+
+class WorkspaceMiddleware:
+    """从路径前缀/w/<工作区>/或X-Workspace请求头中选择工作区
+
+    路径前缀会从请求路径中去掉并移入root_path，内层路由和中间件看到的路径与默认工作区相同，
+    生成的URL（包括补全末尾斜杠的重定向）仍带有前缀；两者同时存在时以路径前缀为准。
+    工作区名称非法时返回400。
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        name = None
+        match = WORKSPACE_PREFIX.match(scope["path"])
+        if match:
+            name = match.group(1)
+            path = match.group(2) or "/"
+            root_path = scope.get("root_path", "") + f"/w/{name}"
+            scope = {**scope, "path": path, "raw_path": path.encode("utf-8"), "root_path": root_path}
+        else:
+            for key, value in scope["headers"]:
+                if key == WORKSPACE_HEADER.encode("latin-1"):
+                    name = value.decode("latin-1").strip()
+                    break
+
+        try:
+            workspace = normalize_workspace(name)
+        except ValueError as e:
+            await self._reject(str(e), send)
+            return
+
+        token = current_workspace.set(workspace)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            current_workspace.reset(token)
+
+    @staticmethod
+    async def _reject(message: str, send: Send) -> None:
+        body = json.dumps({"detail": message}, ensure_ascii=False).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": 400,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode("latin-1")),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
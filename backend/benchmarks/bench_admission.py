@@ -0,0 +1,128 @@
+"""
+准入控制基准测试
+
+启动后端（分别关闭和开启ADMISSION_CONTROL），用大量并发的 GET /plans/ 请求
+（全量列表，响应很大）制造过载，同时让少量"agent"持续更新任务状态，比较：
+- 状态更新请求的延迟分布（p50/p95/p99）；
+- 全量列表请求的完成数和被拒绝（429）数。
+
+用法（在backend目录下运行）:
+    python benchmarks/bench_admission.py --duration 10 --bulk-clients 64 --plans 200 --tasks 50
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+STATUSES = ["Pending", "Working", "Pending For Review", "Complete", "Need Fixed"]
+
+def seed_data(data_dir: Path, plans: int, tasks: int) -> None:
+    """写入测试数据"""
+    sys.path.insert(0, str(BACKEND_DIR))
+    from app.models.schemas import Plan, Task
+    from app.utils.file_handler import DateTimeEncoder
+
+    data = {}
+    for i in range(plans):
+        plan = Plan(name=f"plan {i}", tasks=[
+            Task(title=f"task {j}", description="description " * 20, order=j) for j in range(tasks)
+        ])
+        data[plan.id] = plan.model_dump()
+    (data_dir / "plans.json").write_text(json.dumps(data, cls=DateTimeEncoder), encoding="utf-8")
+    (data_dir / "current_plan.json").write_text(json.dumps({"plan_id": next(iter(data))}), encoding="utf-8")
+
+async def wait_ready(base_url: str, timeout: float = 60) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            try:
+                if (await client.get(f"{base_url}/ready")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.1)
+    raise RuntimeError("后端启动超时")
+
+async def run_load(base_url: str, duration: float, bulk_clients: int, agents: int) -> dict:
+    limits = httpx.Limits(max_connections=bulk_clients + agents + 8)
+    async with httpx.AsyncClient(base_url=base_url, timeout=120, limits=limits) as client:
+        plan = (await client.get("/plans/current")).json()
+        task_ids = [task["id"] for task in plan["tasks"]]
+        deadline = time.monotonic() + duration
+        result = {"status_latencies": [], "status_rejected": 0, "bulk_ok": 0, "bulk_rejected": 0}
+
+        async def bulk() -> None:
+            while time.monotonic() < deadline:
+                response = await client.get("/plans/")
+                if response.status_code == 429:
+                    result["bulk_rejected"] += 1
+                    await asyncio.sleep(float(response.headers.get("retry-after", "1")))
+                else:
+                    result["bulk_ok"] += 1
+
+        async def agent() -> None:
+            while time.monotonic() < deadline:
+                started = time.perf_counter()
+                response = await client.put(
+                    f"/plans/{plan['id']}/tasks/{random.choice(task_ids)}/status",
+                    json={"status": random.choice(STATUSES)},
+                )
+                if response.status_code == 429:
+                    result["status_rejected"] += 1
+                else:
+                    result["status_latencies"].append((time.perf_counter() - started) * 1000)
+                await asyncio.sleep(0.05)
+
+        await asyncio.gather(*(bulk() for _ in range(bulk_clients)), *(agent() for _ in range(agents)))
+        result["lanes"] = (await client.get("/admin/admission")).json()
+        return result
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="准入控制基准测试")
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--bulk-clients", type=int, default=64)
+    parser.add_argument("--agents", type=int, default=4)
+    parser.add_argument("--plans", type=int, default=200)
+    parser.add_argument("--tasks", type=int, default=50)
+    parser.add_argument("--port", type=int, default=18020)
+    args = parser.parse_args()
+    base_url = f"http://127.0.0.1:{args.port}"
+
+    print(f"{'准入控制':<8} {'状态更新p50':>12} {'p95':>8} {'p99':>8} {'状态429':>8} {'列表完成':>8} {'列表429':>8}")
+    for enabled in ("false", "true"):
+        with tempfile.TemporaryDirectory() as tmp:
+            data_dir = Path(tmp)
+            seed_data(data_dir, args.plans, args.tasks)
+            env = dict(os.environ, DATA_DIR=str(data_dir), ADMISSION_CONTROL=enabled)
+            proc = subprocess.Popen(
+                [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(args.port),
+                 "--log-level", "warning", "--no-access-log"],
+                cwd=BACKEND_DIR, env=env,
+            )
+            try:
+                asyncio.run(wait_ready(base_url))
+                result = asyncio.run(run_load(base_url, args.duration, args.bulk_clients, args.agents))
+            finally:
+                proc.terminate()
+                proc.wait()
+
+        latencies = sorted(result["status_latencies"]) or [float("nan")]
+        quantile = lambda q: latencies[min(len(latencies) - 1, int(len(latencies) * q))]
+        print(f"{enabled:<12} {quantile(0.5):>10.0f}ms {quantile(0.95):>6.0f}ms {quantile(0.99):>6.0f}ms "
+              f"{result['status_rejected']:>8} {result['bulk_ok']:>10} {result['bulk_rejected']:>10}")
+        for lane in result["lanes"]:
+            if lane["admitted"] or lane["rejected"]:
+                print(f"    通道 {lane['name']:<8} 处理 {lane['admitted']:>5}  排队 {lane['queued']:>5}  "
+                      f"拒绝 {lane['rejected']:>5}  平均处理 {lane['avg_duration_ms']}ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+评论存储基准测试
+
+生成一个包含大量任务和评论的计划（旧格式：评论嵌套在plans.json中），迁移到评论存储后统计：
+- 迁移前后plans.json的大小；
+- 添加评论的耗时（只追加评论日志并更新评论数）；
+- 按all/latest/none三种方式读取计划的响应大小和耗时；
+- 分页读取单个任务评论的耗时。
+
+用法（在backend目录下运行）:
+    python benchmarks/bench_comments.py --tasks 200 --comments 50 --runs 50
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+def seed_data(data_dir: Path, tasks: int, comments: int) -> str:
+    """写入旧格式的计划数据（评论嵌套在任务中），返回计划ID"""
+    from app.config import settings
+    from app.models.schemas import Comment, Plan, Task
+
+    plan = Plan(name="bench", tasks=[
+        Task(
+            title=f"任务{i}",
+            description=f"第{i}个任务的描述",
+            order=i,
+            comments=[Comment(content=f"任务{i}的第{j}条评论，包含一些链接和路径 /src/module_{j}.py") for j in range(comments)]
+        )
+        for i in range(tasks)
+    ])
+    data_dir.mkdir(parents=True, exist_ok=True)
+    (data_dir / settings.PLANS_FILE).write_text(json.dumps({plan.id: plan.model_dump(mode="json")}, indent=2))
+    return plan.id
+
+def percentile(values, fraction: float) -> float:
+    values = sorted(values)
+    return values[max(0, int(len(values) * fraction) - 1)]
+
+def report(name: str, durations) -> None:
+    print(f"{name}: 中位数 {statistics.median(durations):.2f} ms, p95 {percentile(durations, 0.95):.2f} ms")
+
+def run(tasks: int, comments: int, runs: int) -> None:
+    from fastapi.testclient import TestClient
+    from app.config import settings
+    from app.main import app
+
+    data_dir = settings.data_dir_path
+    plan_id = seed_data(data_dir, tasks, comments)
+    before = (data_dir / settings.PLANS_FILE).stat().st_size
+
+    with TestClient(app) as client:
+        while not client.get("/ready").json()["ready"]:
+            time.sleep(0.05)
+        after = (data_dir / settings.PLANS_FILE).stat().st_size
+        print(f"plans.json: 迁移前 {before / 1024:.0f} KB, 迁移后 {after / 1024:.0f} KB")
+
+        task_id = client.get(f"/plans/{plan_id}?comments=none").json()["tasks"][0]["id"]
+        durations = []
+        for i in range(runs):
+            start = time.perf_counter()
+            client.post(f"/plans/{plan_id}/tasks/{task_id}/comments", json={"content": f"新评论{i}"})
+            durations.append((time.perf_counter() - start) * 1000)
+        report("添加评论", durations)
+
+        for mode in ("all", "latest", "none"):
+            durations = []
+            size = 0
+            for _ in range(runs):
+                start = time.perf_counter()
+                response = client.get(f"/plans/{plan_id}", params={"comments": mode})
+                durations.append((time.perf_counter() - start) * 1000)
+                size = len(response.content)
+            report(f"读取计划 comments={mode} ({size / 1024:.0f} KB)", durations)
+
+        durations = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            client.get(f"/plans/{plan_id}/tasks/{task_id}/comments", params={"limit": 20})
+            durations.append((time.perf_counter() - start) * 1000)
+        report("分页读取评论 limit=20", durations)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="评论存储基准测试")
+    parser.add_argument("--tasks", type=int, default=200)
+    parser.add_argument("--comments", type=int, default=50, help="每个任务的评论数")
+    parser.add_argument("--runs", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATA_DIR"] = tmp
+        from app.config import settings
+        settings.DATA_DIR = tmp
+        print(f"任务数: {args.tasks}, 每个任务评论数: {args.comments}, 每项 {args.runs} 次")
+        run(args.tasks, args.comments, args.runs)
+
+if __name__ == "__main__":
+    main()
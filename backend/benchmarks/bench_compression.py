@@ -0,0 +1,105 @@
+"""
+响应压缩与静态文件缓存基准测试
+
+统计后端主要接口在不同Accept-Encoding下实际传输的字节数，以及前端静态服务器
+对index.html和脚本文件在首次请求、gzip和条件请求(304)下的传输字节数。
+
+用法（在backend目录下运行）:
+    python benchmarks/bench_compression.py --plans 50 --tasks 40 --comments 5
+"""
+import argparse
+import importlib.util
+import os
+import sys
+import tempfile
+import threading
+from http.server import ThreadingHTTPServer
+from pathlib import Path
+
+import httpx
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+ROOT_DIR = BACKEND_DIR.parent
+
+def seed(client, plans: int, tasks: int, comments: int) -> str:
+    """通过批量导入写入测试数据，返回第一个计划ID"""
+    sys.path.insert(0, str(BACKEND_DIR))
+    from app.models.schemas import Plan, Task, Comment
+
+    lines = []
+    for i in range(plans):
+        plan = Plan(name=f"计划 {i}", description="用于压缩基准测试的计划描述" * 3, tasks=[
+            Task(
+                title=f"任务 {j}：实现模块 {j}",
+                description="实现对应模块并补充单元测试、文档和示例。" * 2,
+                order=j,
+                comments=[Comment(content=f"进度说明 {k}：已完成部分实现，待评审。") for k in range(comments)]
+            )
+            for j in range(tasks)
+        ])
+        lines.append(plan.model_dump_json())
+    client.post("/plans/import", content="\n".join(lines))
+    plan_id = client.get("/plans/").json()[0]["id"]
+    client.put(f"/plans/{plan_id}/set-current")
+    return plan_id
+
+def wire_bytes(response: httpx.Response) -> int:
+    """响应体在网络上传输的字节数（压缩后）"""
+    return response.num_bytes_downloaded
+
+def bench_api(args) -> None:
+    os.environ["DATA_DIR"] = tempfile.mkdtemp()
+    sys.path.insert(0, str(BACKEND_DIR))
+    from fastapi.testclient import TestClient
+    from app.main import app
+    from app.utils.compression import BROTLI_AVAILABLE
+
+    encodings = ["identity", "gzip"] + (["br"] if BROTLI_AVAILABLE else [])
+    with TestClient(app) as client:
+        plan_id = seed(client, args.plans, args.tasks, args.comments)
+        print(f"{'endpoint':<28}" + "".join(f"{enc:>12}" for enc in encodings) + f"{'saved':>8}")
+        for path in ["/plans/", f"/plans/{plan_id}", "/plans/current", "/plans/next-tasks", "/plans/export"]:
+            sizes = []
+            for encoding in encodings:
+                with client.stream("GET", path, headers={"Accept-Encoding": encoding}) as response:
+                    response.read()
+                    sizes.append(wire_bytes(response))
+            label = path if len(path) < 28 else "/plans/{id}"
+            print(f"{label:<28}" + "".join(f"{size:>12}" for size in sizes) + f"{1 - min(sizes) / sizes[0]:>8.0%}")
+
+def bench_static() -> None:
+    spec = importlib.util.spec_from_file_location("web_server", ROOT_DIR / "web_server.py")
+    web_server = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(web_server)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), web_server.Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        with httpx.Client(base_url=base_url) as client:
+            print(f"\n{'static file':<28}{'identity':>12}{'gzip':>12}{'304':>12}")
+            for path in ["/", "/js/task-manager.js", "/css/layout.css"]:
+                with client.stream("GET", path, headers={"Accept-Encoding": "identity"}) as response:
+                    response.read()
+                    plain = wire_bytes(response)
+                    etag = response.headers["ETag"]
+                with client.stream("GET", path, headers={"Accept-Encoding": "gzip"}) as response:
+                    response.read()
+                    compressed = wire_bytes(response)
+                revalidated = client.get(path, headers={"If-None-Match": etag})
+                assert revalidated.status_code == 304
+                print(f"{path:<28}{plain:>12}{compressed:>12}{wire_bytes(revalidated):>12}")
+    finally:
+        server.shutdown()
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="响应压缩与静态文件缓存基准测试")
+    parser.add_argument("--plans", type=int, default=50)
+    parser.add_argument("--tasks", type=int, default=40)
+    parser.add_argument("--comments", type=int, default=5)
+    args = parser.parse_args()
+    bench_api(args)
+    bench_static()
+
+if __name__ == "__main__":
+    main()
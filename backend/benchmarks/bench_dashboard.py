@@ -0,0 +1,89 @@
+"""
+仪表盘汇总基准测试
+
+写入不同数量的计划后，分别统计获取全部计划（前端原来的做法：拿到所有任务后在浏览器中统计）、
+读取完整仪表盘和只读取全局汇总（plans=false）的响应大小和耗时，以及修改一个任务状态后
+第一次读取仪表盘的耗时（增量更新只重新汇总被修改的计划）。
+
+用法（在backend目录下运行）:
+    python benchmarks/bench_dashboard.py --plans 50 200 800 --tasks 30 --runs 30
+"""
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+async def seed_data(store, plans: int, tasks: int) -> str:
+    """写入plans个计划，每个计划tasks个任务，返回第一个计划的ID"""
+    from app.models.schemas import Plan, Task, TaskStatus
+
+    statuses = list(TaskStatus)
+    first = None
+    async with store.transaction() as tx:
+        for p in range(plans):
+            plan = Plan(name=f"计划{p}", tasks=[
+                Task(title=f"任务{i}", description=f"任务{i}的描述", status=statuses[i % len(statuses)], order=i)
+                for i in range(tasks)
+            ])
+            tx.put(plan)
+            first = first or plan.id
+    return first
+
+def timed(client, url: str, runs: int, method: str = "get", **kwargs):
+    durations = []
+    size = 0
+    for _ in range(runs):
+        start = time.perf_counter()
+        response = getattr(client, method)(url, **kwargs)
+        durations.append((time.perf_counter() - start) * 1000)
+        size = len(response.content)
+    return statistics.median(durations), size
+
+def run(plans: int, tasks: int, runs: int) -> None:
+    from fastapi.testclient import TestClient
+    from app.main import app
+    from app.services.plan_store import get_plan_store
+
+    with tempfile.TemporaryDirectory() as tmp:
+        from app.config import settings
+        settings.DATA_DIR = tmp
+        with TestClient(app) as client:
+            store = get_plan_store()
+            plan_id = client.portal.call(seed_data, store, plans, tasks)
+            client.get("/dashboard/")
+            task_id = client.get(f"/plans/{plan_id}?comments=none").json()["tasks"][0]["id"]
+
+            print(f"计划数: {plans}, 每个计划任务数: {tasks}")
+            for name, url in (
+                ("获取全部计划", "/plans/?comments=none"),
+                ("完整仪表盘", "/dashboard/"),
+                ("全局汇总", "/dashboard/?plans=false"),
+            ):
+                median, size = timed(client, url, runs)
+                print(f"  {name}: 中位数 {median:.2f} ms, {size / 1024:.1f} KB")
+
+            durations = []
+            statuses = ["Working", "Complete"]
+            for i in range(runs):
+                client.put(f"/plans/{plan_id}/tasks/{task_id}/status", json={"status": statuses[i % 2]})
+                start = time.perf_counter()
+                client.get("/dashboard/?plans=false")
+                durations.append((time.perf_counter() - start) * 1000)
+            print(f"  修改任务后读取全局汇总: 中位数 {statistics.median(durations):.2f} ms")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="仪表盘汇总基准测试")
+    parser.add_argument("--plans", type=int, nargs="+", default=[50, 200, 800])
+    parser.add_argument("--tasks", type=int, default=30)
+    parser.add_argument("--runs", type=int, default=30)
+    args = parser.parse_args()
+
+    for plans in args.plans:
+        run(plans, args.tasks, args.runs)
+
+if __name__ == "__main__":
+    main()
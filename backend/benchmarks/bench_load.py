@@ -0,0 +1,82 @@
+"""
+计划数据加载基准测试
+
+通过存储写入大量计划（生成plans.json及记录模式版本和校验和的元数据），然后分别统计
+完整pydantic校验加载和可信快速加载（校验和匹配时直接构造模型）读取并解析plans.json的耗时。
+
+用法（在backend目录下运行）:
+    python benchmarks/bench_load.py --plans 200 --tasks 50 --runs 10
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+async def seed_data(store, plans: int, tasks: int) -> None:
+    """写入plans个计划，每个计划tasks个任务（部分任务带依赖和认领租约）"""
+    from app.models.schemas import Plan, Task, TaskLease, TaskStatus
+
+    statuses = list(TaskStatus)
+    async with store.transaction() as tx:
+        for p in range(plans):
+            task_list = []
+            for i in range(tasks):
+                task = Task(
+                    title=f"计划{p}的任务{i}",
+                    description=f"任务{i}的详细描述，包括实现步骤和验收标准",
+                    status=statuses[i % len(statuses)],
+                    order=i,
+                    dependencies=[task_list[-1].id] if task_list else [],
+                    comment_count=i % 4
+                )
+                if task.status == TaskStatus.WORKING:
+                    task.lease = TaskLease(owner=f"agent-{i}", expires_at=datetime.now() + timedelta(hours=1))
+                task_list.append(task)
+            tx.put(Plan(name=f"计划{p}", description="基准测试计划", notes=["注意事项"], tasks=task_list))
+
+def measure(store, trusted: bool, runs: int):
+    from app.config import settings
+
+    settings.TRUSTED_LOAD = trusted
+    durations = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        plans = store._read_plans_sync()
+        durations.append((time.perf_counter() - start) * 1000)
+    return durations, plans
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="计划数据加载基准测试")
+    parser.add_argument("--plans", type=int, default=200)
+    parser.add_argument("--tasks", type=int, default=50)
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATA_DIR"] = tmp
+        from app.config import settings
+        settings.DATA_DIR = tmp
+        from app.services.plan_store import PlanStore
+
+        store = PlanStore(Path(tmp))
+        asyncio.run(seed_data(store, args.plans, args.tasks))
+        size = store.plans_file_path.stat().st_size
+        print(f"计划数: {args.plans}, 每个计划任务数: {args.tasks}, plans.json {size / 1024 / 1024:.1f} MB, 每项 {args.runs} 次")
+
+        validated, expected = measure(store, False, args.runs)
+        trusted, plans = measure(store, True, args.runs)
+        assert all(plans[plan_id].model_dump() == plan.model_dump() for plan_id, plan in expected.items())
+
+        print(f"完整校验: 中位数 {statistics.median(validated):.1f} ms")
+        print(f"可信加载: 中位数 {statistics.median(trusted):.1f} ms（含sha256校验）")
+        print(f"加速: {statistics.median(validated) / statistics.median(trusted):.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+多模型服务路由基准测试
+
+在本地启动若干个兼容OpenAI接口的桩服务（可配置延迟分布、限流和5xx错误），
+通过MODEL_ENDPOINTS让解析代理使用这些服务，分别测量：
+1. 单个长尾延迟服务（基线）；
+2. 两个长尾延迟服务并开启对冲请求；
+3. 主服务持续限流（429 + Retry-After）时切换到备用服务。
+输出每个场景的成功数、p50/p95/p99延迟以及各服务的请求、失败和对冲次数。
+
+用法（在backend目录下运行）:
+    python benchmarks/bench_model_router.py --requests 200 --concurrency 8
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import uvicorn
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+os.environ.setdefault("MODEL_API_KEY", "stub")
+
+from app.config import settings
+from app.agents import model_router
+from app.agents.plan_parser import PlanParserAgent
+
+PLAN_CONTENT = json.dumps({
+    "name": "stub plan",
+    "description": "",
+    "notes": [],
+    "tasks": [{"title": "task", "description": "", "status": "Pending", "order": 1, "dependencies": [], "comments": []}]
+})
+
+def stub_app(fast_ms: float, slow_ms: float, slow_ratio: float, rate_limited: bool) -> FastAPI:
+    """兼容chat.completions接口的桩服务：按slow_ratio的概率返回慢响应"""
+    app = FastAPI()
+
+    @app.post("/v1/chat/completions")
+    async def completions():
+        if rate_limited:
+            return JSONResponse(
+                status_code=429,
+                content={"error": {"message": "rate limited", "type": "rate_limit"}},
+                headers={"Retry-After": "5"}
+            )
+        await asyncio.sleep((slow_ms if random.random() < slow_ratio else fast_ms) / 1000)
+        return {
+            "id": "stub", "object": "chat.completion", "created": int(time.time()), "model": "stub",
+            "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": PLAN_CONTENT}}],
+            "usage": {"prompt_tokens": 100, "completion_tokens": 50, "total_tokens": 150}
+        }
+
+    return app
+
+async def start_stub(port: int, **behavior) -> uvicorn.Server:
+    server = uvicorn.Server(uvicorn.Config(stub_app(**behavior), port=port, log_level="warning", access_log=False))
+    asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+    return server
+
+async def run_scenario(title: str, endpoints: list, hedge: bool, requests: int, concurrency: int) -> None:
+    settings.MODEL_ENDPOINTS = json.dumps(endpoints)
+    settings.MODEL_HEDGE = hedge
+    model_router._router = None
+    agent = PlanParserAgent()
+
+    latencies = []
+    failures = 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one() -> None:
+        nonlocal failures
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                await agent._call_openai("- task")
+                latencies.append((time.perf_counter() - started) * 1000)
+            except Exception:
+                failures += 1
+
+    await asyncio.gather(*(one() for _ in range(requests)))
+    latencies.sort()
+    quantile = lambda q: latencies[min(len(latencies) - 1, int(len(latencies) * q))] if latencies else float("nan")
+    print(f"\n{title}")
+    print(f"  成功 {len(latencies)}/{requests}, p50 {quantile(0.5):.0f}ms, p95 {quantile(0.95):.0f}ms, "
+          f"p99 {quantile(0.99):.0f}ms, 平均 {statistics.mean(latencies) if latencies else float('nan'):.0f}ms")
+    for status in agent.router.status():
+        print(f"  {status.name:<8} 请求 {status.requests:>4}  失败 {status.failures:>4}  对冲 {status.hedges:>4}  "
+              f"p95 {status.p95_latency_ms}ms")
+    await agent.router.aclose()
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="多模型服务路由基准测试")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--fast-ms", type=float, default=50)
+    parser.add_argument("--slow-ms", type=float, default=1500)
+    parser.add_argument("--slow-ratio", type=float, default=0.1)
+    parser.add_argument("--port", type=int, default=18100)
+    args = parser.parse_args()
+    logging.disable(logging.ERROR)
+
+    settings.MODEL_STRUCTURED_OUTPUT = "json_object"
+    settings.MODEL_HEDGE_MIN_MS = args.fast_ms * 2
+    tail = dict(fast_ms=args.fast_ms, slow_ms=args.slow_ms, slow_ratio=args.slow_ratio, rate_limited=False)
+    servers = [
+        await start_stub(args.port, **tail),
+        await start_stub(args.port + 1, **tail),
+        await start_stub(args.port + 2, **dict(tail, rate_limited=True)),
+    ]
+
+    def endpoint(name: str, offset: int) -> dict:
+        return {"name": name, "base_url": f"http://127.0.0.1:{args.port + offset}/v1", "model": "stub"}
+
+    print(f"桩服务延迟: {args.slow_ratio:.0%} 的请求 {args.slow_ms:.0f}ms，其余 {args.fast_ms:.0f}ms；"
+          f"{args.requests} 个请求，并发 {args.concurrency}")
+    await run_scenario("单个服务（基线）", [endpoint("a", 0)], False, args.requests, args.concurrency)
+    await run_scenario("两个服务 + 对冲请求", [endpoint("a", 0), endpoint("b", 1)], True, args.requests, args.concurrency)
+    await run_scenario("主服务限流，切换到备用服务", [endpoint("limited", 2), endpoint("a", 0)], False, args.requests, args.concurrency)
+
+    for server in servers:
+        server.should_exit = True
+    await asyncio.sleep(0.2)
+
+if __name__ == "__main__":
+    asyncio.run(main())
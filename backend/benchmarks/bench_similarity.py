@@ -0,0 +1,69 @@
+"""
+任务相似度查询基准测试
+
+生成一个包含大量任务的计划，分别统计向量索引的构建耗时（首次、向量缓存命中后，
+以及修改一个任务后复用旧索引增量重建）、单条查询和批量查询的延迟。
+
+用法（在backend目录下运行）:
+    python benchmarks/bench_similarity.py --tasks 50000 --queries 200
+"""
+import argparse
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.models.schemas import Task
+from app.services.similarity_service import NUMPY_AVAILABLE, SimilarityIndex, embed_text
+
+VERBS = ["实现", "编写", "重构", "优化", "修复", "设计", "Add", "Fix", "Refactor", "Document"]
+NOUNS = ["用户登录接口", "订单服务", "数据库迁移脚本", "缓存层", "单元测试", "API gateway",
+         "payment webhook", "search index", "CLI parser", "metrics exporter"]
+
+def make_tasks(count: int) -> list:
+    rng = random.Random(42)
+    return [
+        Task(
+            title=f"{rng.choice(VERBS)}{rng.choice(NOUNS)} #{i}",
+            description=f"{rng.choice(NOUNS)}相关的第{i}项工作，包括{rng.choice(NOUNS)}和{rng.choice(NOUNS)}"
+        )
+        for i in range(count)
+    ]
+
+def timed(func) -> float:
+    start = time.perf_counter()
+    func()
+    return (time.perf_counter() - start) * 1000
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="任务相似度查询基准测试")
+    parser.add_argument("--tasks", type=int, default=50000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--batch", type=int, default=32)
+    args = parser.parse_args()
+
+    tasks = make_tasks(args.tasks)
+    print(f"numpy: {'是' if NUMPY_AVAILABLE else '否（纯Python回退）'}, 任务数: {args.tasks}")
+    print(f"首次构建索引: {timed(lambda: SimilarityIndex(tasks)):.1f} ms")
+    rebuild = timed(lambda: SimilarityIndex(tasks))
+    print(f"向量缓存命中后重建: {rebuild:.1f} ms")
+
+    index = SimilarityIndex(tasks)
+    edited = list(tasks)
+    edited[len(edited) // 2] = edited[len(edited) // 2].model_copy(update={"title": "修改后的任务标题"})
+    print(f"修改一个任务后增量重建: {timed(lambda: SimilarityIndex(edited, index)):.1f} ms")
+    rng = random.Random(7)
+    queries = [embed_text(f"{rng.choice(VERBS)}{rng.choice(NOUNS)}") for _ in range(args.queries)]
+    latencies = sorted(timed(lambda q=q: index.search([q], limit=10)) for q in queries)
+    print(f"单条查询: 中位数 {statistics.median(latencies):.2f} ms, "
+          f"p95 {latencies[int(len(latencies) * 0.95) - 1]:.2f} ms")
+
+    batches = [queries[i:i + args.batch] for i in range(0, len(queries), args.batch)]
+    total = sum(timed(lambda b=b: index.search(b, limit=10)) for b in batches)
+    print(f"批量查询（每批{args.batch}条）: 平均每条 {total / len(queries):.2f} ms")
+
+if __name__ == "__main__":
+    main()
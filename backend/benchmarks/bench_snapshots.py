@@ -0,0 +1,141 @@
+"""
+快照读取基准测试
+
+启动后端，先只运行读取客户端（GET /plans/{id}、GET /plans/{id}/tasks），
+再在读取的同时以固定速率发送更新任务状态的写请求（写入突发），比较两个阶段的：
+- 读取延迟分布（p50/p95/p99/最大值）和吞吐；
+- 写请求的完成数和延迟。
+读取直接使用已发布的快照，写入在线程中序列化，两个阶段的读取延迟应基本持平。
+
+用法（在backend目录下运行）:
+    python benchmarks/bench_snapshots.py --duration 10 --readers 16 --write-rate 10 --plans 200 --tasks 30
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+STATUSES = ["Pending", "Working", "Pending For Review", "Complete", "Need Fixed"]
+
+def seed_data(data_dir: Path, plans: int, tasks: int) -> dict:
+    """写入测试数据，返回{计划ID: [任务ID]}"""
+    sys.path.insert(0, str(BACKEND_DIR))
+    from app.models.schemas import Plan, Task
+    from app.utils.file_handler import DateTimeEncoder
+
+    data = {}
+    for i in range(plans):
+        plan = Plan(name=f"plan {i}", tasks=[
+            Task(title=f"task {j}", description="description " * 20, order=j) for j in range(tasks)
+        ])
+        data[plan.id] = plan.model_dump()
+    (data_dir / "plans.json").write_text(json.dumps(data, cls=DateTimeEncoder), encoding="utf-8")
+    (data_dir / "current_plan.json").write_text(json.dumps({"plan_id": next(iter(data))}), encoding="utf-8")
+    return {plan_id: [task["id"] for task in plan["tasks"]] for plan_id, plan in data.items()}
+
+async def wait_ready(base_url: str, timeout: float = 60) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            try:
+                if (await client.get(f"{base_url}/ready")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.1)
+    raise RuntimeError("后端启动超时")
+
+async def run_phase(base_url: str, plans: dict, duration: float, readers: int, write_rate: float) -> dict:
+    limits = httpx.Limits(max_connections=readers + 64)
+    plan_ids = list(plans)
+    deadline = time.monotonic() + duration
+    result = {"read": [], "write": []}
+    async with httpx.AsyncClient(base_url=base_url, timeout=120, limits=limits) as client:
+
+        async def reader() -> None:
+            while time.monotonic() < deadline:
+                plan_id = random.choice(plan_ids)
+                path = random.choice([f"/plans/{plan_id}", f"/plans/{plan_id}/tasks"])
+                started = time.perf_counter()
+                response = await client.get(path)
+                response.raise_for_status()
+                result["read"].append((time.perf_counter() - started) * 1000)
+
+        async def write() -> None:
+            plan_id = random.choice(plan_ids)
+            started = time.perf_counter()
+            response = await client.put(
+                f"/plans/{plan_id}/tasks/{random.choice(plans[plan_id])}/status",
+                json={"status": random.choice(STATUSES)},
+            )
+            response.raise_for_status()
+            result["write"].append((time.perf_counter() - started) * 1000)
+
+        async def writer() -> None:
+            # 按固定速率发送，不等待上一个写请求完成，两种实现承受相同的写入压力
+            writes = []
+            while write_rate > 0 and time.monotonic() < deadline:
+                writes.append(asyncio.ensure_future(write()))
+                await asyncio.sleep(1 / write_rate)
+            await asyncio.gather(*writes)
+
+        await asyncio.gather(*(reader() for _ in range(readers)), writer())
+    return result
+
+def summarize(latencies: list) -> str:
+    if not latencies:
+        return f"{'-':>8} {'-':>8} {'-':>8} {'-':>8} {0:>8}"
+    latencies = sorted(latencies)
+    quantile = lambda q: latencies[min(len(latencies) - 1, int(len(latencies) * q))]
+    return (f"{quantile(0.5):>6.1f}ms {quantile(0.95):>6.1f}ms {quantile(0.99):>6.1f}ms "
+            f"{latencies[-1]:>6.1f}ms {len(latencies):>8}")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="快照读取基准测试")
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--readers", type=int, default=16)
+    parser.add_argument("--write-rate", type=float, default=10, help="写入阶段每秒的写请求数")
+    parser.add_argument("--plans", type=int, default=200)
+    parser.add_argument("--tasks", type=int, default=30)
+    parser.add_argument("--port", type=int, default=18030)
+    args = parser.parse_args()
+    base_url = f"http://127.0.0.1:{args.port}"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = Path(tmp)
+        plans = seed_data(data_dir, args.plans, args.tasks)
+        size = (data_dir / "plans.json").stat().st_size
+        print(f"数据: {args.plans} 个计划 x {args.tasks} 个任务 ({size / 1024 / 1024:.1f}MB), "
+              f"{args.readers} 个读取客户端, 每阶段 {args.duration:.0f}s")
+        # 关闭准入控制，只比较存储本身的读写干扰
+        env = dict(os.environ, DATA_DIR=str(data_dir), ADMISSION_CONTROL="false")
+        proc = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(args.port),
+             "--log-level", "warning", "--no-access-log"],
+            cwd=BACKEND_DIR, env=env,
+        )
+        try:
+            asyncio.run(wait_ready(base_url))
+            idle = asyncio.run(run_phase(base_url, plans, args.duration, args.readers, 0))
+            burst = asyncio.run(run_phase(base_url, plans, args.duration, args.readers, args.write_rate))
+        finally:
+            proc.terminate()
+            proc.wait()
+
+    print(f"{'阶段':<14} {'请求':<4} {'p50':>8} {'p95':>8} {'p99':>8} {'最大':>8} {'完成数':>8}")
+    print(f"{'只读':<14} {'读取':<4} {summarize(idle['read'])}")
+    burst_title = f"读 + {args.write_rate:g}写/秒"
+    print(f"{burst_title:<14} {'读取':<4} {summarize(burst['read'])}")
+    print(f"{burst_title:<14} {'写入':<4} {summarize(burst['write'])}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+冷启动基准测试
+
+1. 在新的Python进程中导入app.main，统计导入耗时，并检查openai/tenacity/numpy等
+   较重的依赖是否仍在启动时被导入；
+2. 启动uvicorn，统计从启动进程到/health返回200（开始监听）和/ready返回200
+   （预热完成）的时间；
+3. 统计第一次解析前导入计划解析代理的耗时（延迟到第一次解析时才发生）。
+
+用法（在backend目录下运行）:
+    python benchmarks/bench_startup.py --runs 5 --plans 200 --tasks 30
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+HEAVY_MODULES = ["openai", "tenacity", "tiktoken", "numpy"]
+
+IMPORT_SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - started
+print(json.dumps({{"seconds": elapsed, "loaded": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+def seed_data(data_dir: Path, plans: int, tasks: int) -> None:
+    """写入测试数据"""
+    sys.path.insert(0, str(BACKEND_DIR))
+    from app.models.schemas import Plan, Task
+    from app.utils.file_handler import DateTimeEncoder
+
+    data = {}
+    for i in range(plans):
+        plan = Plan(name=f"plan {i}", tasks=[Task(title=f"task {j}", order=j) for j in range(tasks)])
+        data[plan.id] = plan.model_dump()
+    (data_dir / "plans.json").write_text(json.dumps(data, cls=DateTimeEncoder), encoding="utf-8")
+    (data_dir / "current_plan.json").write_text(json.dumps({"plan_id": next(iter(data), None)}), encoding="utf-8")
+
+def time_import(module: str, env: dict) -> dict:
+    """在新进程中导入模块，返回耗时和已导入的重依赖"""
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_SCRIPT.format(module=module, heavy=HEAVY_MODULES)],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def wait_status(client: httpx.Client, url: str, started: float, timeout: float = 60) -> float:
+    """轮询直到接口返回200，返回距离started的秒数"""
+    deadline = started + timeout
+    while time.perf_counter() < deadline:
+        try:
+            if client.get(url).status_code == 200:
+                return time.perf_counter() - started
+        except httpx.TransportError:
+            pass
+        time.sleep(0.01)
+    raise RuntimeError(f"{url} 等待超时")
+
+def time_server(port: int, env: dict) -> tuple:
+    """启动uvicorn，返回(开始监听用时, 预热完成用时)"""
+    base_url = f"http://127.0.0.1:{port}"
+    started = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port),
+         "--log-level", "warning", "--no-access-log"],
+        cwd=BACKEND_DIR, env=env,
+    )
+    try:
+        with httpx.Client(timeout=5) as client:
+            live = wait_status(client, f"{base_url}/health", started)
+            ready = wait_status(client, f"{base_url}/ready", started)
+    finally:
+        proc.terminate()
+        proc.wait()
+    return live, ready
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="冷启动基准测试")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--plans", type=int, default=200)
+    parser.add_argument("--tasks", type=int, default=30)
+    parser.add_argument("--port", type=int, default=18010)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = Path(tmp)
+        seed_data(data_dir, args.plans, args.tasks)
+        env = dict(os.environ, DATA_DIR=str(data_dir))
+        print(f"数据: {args.plans} 个计划 x {args.tasks} 个任务, 每项取 {args.runs} 次的中位数")
+
+        imports = [time_import("app.main", env) for _ in range(args.runs)]
+        loaded = sorted({module for result in imports for module in result["loaded"]})
+        print(f"导入 app.main: {statistics.median(r['seconds'] for r in imports) * 1000:8.0f} ms"
+              f"  (启动时导入的重依赖: {', '.join(loaded) or '无'})")
+
+        parser_imports = [time_import("app.agents.plan_parser", env) for _ in range(args.runs)]
+        print(f"导入解析代理: {statistics.median(r['seconds'] for r in parser_imports) * 1000:8.0f} ms"
+              f"  (第一次解析时发生)")
+
+        servers = [time_server(args.port, env) for _ in range(args.runs)]
+        print(f"启动到 /health: {statistics.median(live for live, _ in servers) * 1000:6.0f} ms")
+        print(f"启动到 /ready:  {statistics.median(ready for _, ready in servers) * 1000:6.0f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+计划模板实例化基准测试
+
+生成一个包含大量任务（带评论、依赖链和占位符）的模板，分别统计：
+- 只构建计划对象（复制、分配新ID、重映射依赖、替换占位符并校验）的耗时；
+- 包括写入存储在内的完整实例化耗时。
+
+用法（在backend目录下运行）:
+    python benchmarks/bench_templates.py --tasks 500 --runs 50
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.models.schemas import Comment, PlanTemplateCreate, Task, TemplateInstantiate
+
+def make_template(count: int) -> PlanTemplateCreate:
+    tasks = [
+        Task(
+            id=f"t{i}",
+            title=f"{{{{service}}}} 第{i}步",
+            description=f"{{{{team}}}} 负责 {{{{service}}}} 的第{i}项工作",
+            order=i,
+            dependencies=[f"t{i - 1}"] if i else [],
+            comments=[Comment(content="验收标准见 {{service}} 设计文档")]
+        )
+        for i in range(count)
+    ]
+    return PlanTemplateCreate(
+        name="bench", plan_name="上线 {{service}}", tasks=tasks, defaults={"team": "platform"}
+    )
+
+def timed(func) -> float:
+    start = time.perf_counter()
+    func()
+    return (time.perf_counter() - start) * 1000
+
+async def run(tasks: int, runs: int) -> None:
+    from app.services.template_service import get_template_service
+
+    service = get_template_service()
+    template = await service.create(make_template(tasks))
+    loaded = await service._load(template.id)
+    request = TemplateInstantiate(variables={"service": "billing"})
+
+    build = sorted(timed(lambda: service.build_plan(*loaded, request)) for _ in range(runs))
+    print(f"构建计划: 中位数 {statistics.median(build):.2f} ms, p95 {build[int(len(build) * 0.95) - 1]:.2f} ms")
+
+    full = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        await service.instantiate(template.id, request)
+        full.append((time.perf_counter() - start) * 1000)
+    full.sort()
+    print(f"完整实例化（含写入）: 中位数 {statistics.median(full):.2f} ms, p95 {full[int(len(full) * 0.95) - 1]:.2f} ms")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="计划模板实例化基准测试")
+    parser.add_argument("--tasks", type=int, default=500)
+    parser.add_argument("--runs", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATA_DIR"] = tmp
+        from app.config import settings
+        settings.DATA_DIR = tmp
+        print(f"模板任务数: {args.tasks}, 每项 {args.runs} 次")
+        asyncio.run(run(args.tasks, args.runs))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+多worker吞吐量基准测试
+
+依次以 1..N 个worker启动后端（共享同一个临时数据目录），用并发客户端混合发送
+读请求（当前计划、下一步任务）和写请求（更新任务状态），输出每秒请求数，
+并在结束时校验plans.json仍然是完整的JSON。
+
+用法（在backend目录下运行）:
+    python benchmarks/bench_workers.py --max-workers 4 --duration 10
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+STATUSES = ["Pending", "Working", "Pending For Review", "Complete", "Need Fixed"]
+
+def seed_data(data_dir: Path, plans: int, tasks: int) -> None:
+    """写入测试数据"""
+    sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+    from app.models.schemas import Plan, Task
+    from app.utils.file_handler import DateTimeEncoder
+
+    data = {}
+    for i in range(plans):
+        plan = Plan(name=f"plan {i}", tasks=[Task(title=f"task {j}", order=j) for j in range(tasks)])
+        data[plan.id] = plan.model_dump()
+    (data_dir / "plans.json").write_text(json.dumps(data, cls=DateTimeEncoder), encoding="utf-8")
+    (data_dir / "current_plan.json").write_text(json.dumps({"plan_id": next(iter(data))}), encoding="utf-8")
+
+async def wait_ready(base_url: str, timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            try:
+                await client.get(f"{base_url}/")
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.2)
+    raise RuntimeError("后端启动超时")
+
+async def run_load(base_url: str, duration: float, concurrency: int, write_ratio: float) -> int:
+    """持续发送请求，返回完成的请求数"""
+    async with httpx.AsyncClient(base_url=base_url, timeout=30) as client:
+        plan = (await client.get("/plans/current")).json()
+        task_ids = [task["id"] for task in plan["tasks"]]
+        deadline = time.monotonic() + duration
+        done = 0
+
+        async def worker() -> None:
+            nonlocal done
+            while time.monotonic() < deadline:
+                if random.random() < write_ratio:
+                    await client.put(
+                        f"/plans/{plan['id']}/tasks/{random.choice(task_ids)}/status",
+                        json={"status": random.choice(STATUSES)},
+                    )
+                elif random.random() < 0.5:
+                    await client.get("/plans/current")
+                else:
+                    await client.get("/plans/next-tasks")
+                done += 1
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return done
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="多worker吞吐量基准测试")
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--write-ratio", type=float, default=0.2)
+    parser.add_argument("--plans", type=int, default=20)
+    parser.add_argument("--tasks", type=int, default=30)
+    parser.add_argument("--port", type=int, default=18000)
+    args = parser.parse_args()
+
+    backend_dir = Path(__file__).resolve().parents[1]
+    base_url = f"http://127.0.0.1:{args.port}"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = Path(tmp)
+        seed_data(data_dir, args.plans, args.tasks)
+        env = dict(os.environ, DATA_DIR=str(data_dir))
+
+        print(f"{'workers':>8} {'requests':>10} {'req/s':>10} {'speedup':>8}")
+        baseline = None
+        for workers in range(1, args.max_workers + 1):
+            proc = subprocess.Popen(
+                [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(args.port),
+                 "--workers", str(workers), "--log-level", "warning", "--no-access-log"],
+                cwd=backend_dir, env=env,
+            )
+            try:
+                asyncio.run(wait_ready(base_url))
+                done = asyncio.run(run_load(base_url, args.duration, args.concurrency, args.write_ratio))
+            finally:
+                proc.terminate()
+                proc.wait()
+
+            rps = done / args.duration
+            baseline = baseline or rps
+            print(f"{workers:>8} {done:>10} {rps:>10.1f} {rps / baseline:>7.2f}x")
+
+        # 并发写入后数据文件必须仍然完整
+        json.loads((data_dir / "plans.json").read_text(encoding="utf-8"))
+        print("plans.json 校验通过")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""模型路由器的故障切换：请求本身有问题时不切换服务"""
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from app.agents.model_router import ModelEndpoint, ModelRouter
+from app.config import settings
+
+openai = pytest.importorskip("openai")
+
+def bad_request() -> Exception:
+    request = httpx.Request("POST", "http://model.test/v1/chat/completions")
+    response = httpx.Response(400, request=request)
+    return openai.BadRequestError("maximum context length exceeded", response=response, body=None)
+
+def make_router(count: int = 3) -> ModelRouter:
+    return ModelRouter([ModelEndpoint(f"ep{i}", "test-model") for i in range(count)])
+
+def test_bad_request_is_not_retried_on_other_endpoints(monkeypatch):
+    monkeypatch.setattr(settings, "MODEL_HEDGE", False)
+    router = make_router()
+    called = []
+
+    async def call(endpoint: ModelEndpoint):
+        called.append(endpoint.name)
+        raise bad_request()
+
+    with pytest.raises(openai.BadRequestError):
+        asyncio.run(router.complete(call))
+    assert len(called) == 1
+    # 请求错误不计入服务的失败次数
+    assert all(endpoint.failures == 0 for endpoint in router.endpoints)
+
+def test_hedged_bad_request_raises_without_waiting_for_backup(monkeypatch):
+    monkeypatch.setattr(settings, "MODEL_HEDGE", True)
+    monkeypatch.setattr(settings, "MODEL_HEDGE_MIN_MS", 10)
+    router = make_router(2)
+    for endpoint in router.endpoints:
+        endpoint.latencies.extend([10.0] * 10)
+        endpoint.ewma_ms = 10.0
+    called = []
+
+    async def call(endpoint: ModelEndpoint):
+        called.append(endpoint.name)
+        if len(called) == 1:
+            # 主请求超过对冲延迟后才返回400，此时对冲请求已经发出
+            await asyncio.sleep(0.1)
+            raise bad_request()
+        await asyncio.sleep(30)
+
+    started = time.perf_counter()
+    with pytest.raises(openai.BadRequestError):
+        asyncio.run(router.complete(call))
+    assert len(called) == 2
+    assert time.perf_counter() - started < 5
@@ -0,0 +1,58 @@
+"""json_schema结构化输出的自动回退：只有与response_format有关的400才回退"""
+import asyncio
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+from app.agents import plan_parser
+from app.agents.model_router import ModelEndpoint
+from app.agents.plan_parser import PlanParserAgent
+from app.config import settings
+
+openai = pytest.importorskip("openai")
+
+def bad_request(message: str, param=None) -> Exception:
+    request = httpx.Request("POST", "http://model.test/v1/chat/completions")
+    body = {"message": message, "param": param, "type": "invalid_request_error"}
+    return openai.BadRequestError(message, response=httpx.Response(400, request=request), body=body)
+
+def stub_endpoint(name: str, error: Exception) -> ModelEndpoint:
+    """第一次json_schema请求抛出error，之后返回固定内容；记录每次请求的输出格式"""
+    endpoint = ModelEndpoint(name, "test-model", base_url=f"http://{name}.test/v1")
+    formats = []
+
+    async def create(**request):
+        formats.append(request["response_format"]["type"])
+        if request["response_format"]["type"] == "json_schema":
+            raise error
+        message = SimpleNamespace(content='{"name": "p", "tasks": []}')
+        return SimpleNamespace(choices=[SimpleNamespace(message=message, finish_reason="stop")], usage=None)
+
+    endpoint._client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    endpoint.formats = formats
+    return endpoint
+
+def make_agent() -> PlanParserAgent:
+    agent = PlanParserAgent.__new__(PlanParserAgent)
+    agent.router = None
+    return agent
+
+@pytest.fixture(autouse=True)
+def auto_mode(monkeypatch):
+    monkeypatch.setattr(settings, "MODEL_STRUCTURED_OUTPUT", "auto")
+    monkeypatch.setattr(plan_parser, "_structured_output_support", {})
+
+def test_unrelated_bad_request_is_raised_and_keeps_json_schema():
+    endpoint = stub_endpoint("ctx", bad_request("This model's maximum context length is 8192 tokens", param="messages"))
+    with pytest.raises(openai.BadRequestError):
+        asyncio.run(make_agent()._request(endpoint, [], 0, 1))
+    assert endpoint.formats == ["json_schema"]
+    assert make_agent()._response_format(endpoint)["type"] == "json_schema"
+
+def test_response_format_rejection_falls_back_to_json_object():
+    endpoint = stub_endpoint("old", bad_request("Invalid parameter: 'response_format' of type 'json_schema' is not supported", param="response_format"))
+    content = asyncio.run(make_agent()._request(endpoint, [], 0, 1))
+    assert content.startswith("{")
+    assert endpoint.formats == ["json_schema", "json_object"]
+    assert make_agent()._response_format(endpoint)["type"] == "json_object"
@@ -14,6 +14,39 @@ dotenv.config();
 // 从环境变量中获取API基础URL
 const API_BASE_URL = process.env.API_BASE_URL || "http://localhost:8000";
 
+// 等待计划解析任务完成的最长时间（毫秒）和每次长轮询的秒数
+const PARSE_JOB_TIMEOUT_MS = Number(process.env.PLANNER_PARSE_TIMEOUT_MS || 600000);
+const JOB_POLL_WAIT_SECONDS = 25;
+
+// 认领任务时使用的默认认领者标识，多个agent共享同一计划时应各不相同
+const AGENT_ID = process.env.PLANNER_AGENT_ID || `agent-${process.pid}`;
+
+// 工作区名称：多个项目或agent共用一个后端时，每个工作区有独立的计划和当前计划
+const WORKSPACE = process.env.PLANNER_WORKSPACE || "";
+if (WORKSPACE) {
+  axios.defaults.headers.common["X-Workspace"] = WORKSPACE;
+}
+
+// 列出当前计划任务时每个任务附带的最新评论数（完整评论可以通过评论接口分页读取）
+const TASK_COMMENT_LIMIT = Number(process.env.PLANNER_TASK_COMMENT_LIMIT || 5);
+
+// 后端过载时返回429和Retry-After，按提示等待后重试，最多重试的次数
+const MAX_OVERLOAD_RETRIES = 3;
+
+axios.interceptors.response.use(undefined, async (error) => {
+  const config = error.config;
+  if (!config || error.response?.status !== 429) {
+    throw error;
+  }
+  config.overloadRetries = (config.overloadRetries || 0) + 1;
+  if (config.overloadRetries > MAX_OVERLOAD_RETRIES) {
+    throw error;
+  }
+  const seconds = Number(error.response.headers["retry-after"]) || 1;
+  await new Promise((resolve) => setTimeout(resolve, seconds * 1000));
+  return axios(config);
+});
+
 // 定义参数接口
 interface CreatePlanArgs {
   name: string;
@@ -37,6 +70,23 @@ interface RemoveCommentArgs {
   comment_id: string;
 }
 
+interface ClaimNextTaskArgs {
+  owner?: string;
+  ttl_seconds?: number;
+}
+
+interface ReleaseTaskArgs {
+  task_id: string;
+  owner?: string;
+  status?: string;
+}
+
+interface CreatePlanFromTemplateArgs {
+  template_id: string;
+  variables?: Record<string, string>;
+  name?: string;
+}
+
 // 参数验证函数
 function isValidCreatePlanArgs(args: unknown): args is CreatePlanArgs {
   return (
@@ -96,10 +146,65 @@ function isValidRemoveCommentArgs(args: unknown): args is RemoveCommentArgs {
   );
 }
 
+function isValidClaimNextTaskArgs(args: unknown): args is ClaimNextTaskArgs {
+  return (
+    (args === undefined || (typeof args === "object" && args !== null)) &&
+    (
+      !args || !("owner" in args) ||
+      typeof (args as ClaimNextTaskArgs).owner === "string"
+    ) &&
+    (
+      !args || !("ttl_seconds" in args) ||
+      (typeof (args as ClaimNextTaskArgs).ttl_seconds === "number" &&
+       (args as ClaimNextTaskArgs).ttl_seconds > 0)
+    )
+  );
+}
+
+function isValidReleaseTaskArgs(args: unknown): args is ReleaseTaskArgs {
+  const validStatuses = ["Pending", "Working", "Pending For Review", "Complete", "Need Fixed"];
+  return (
+    typeof args === "object" &&
+    args !== null &&
+    "task_id" in args &&
+    typeof (args as ReleaseTaskArgs).task_id === "string" &&
+    (
+      !("owner" in args) ||
+      typeof (args as ReleaseTaskArgs).owner === "string"
+    ) &&
+    (
+      !("status" in args) ||
+      (typeof (args as ReleaseTaskArgs).status === "string" &&
+       validStatuses.includes((args as ReleaseTaskArgs).status))
+    )
+  );
+}
+
+function isValidCreatePlanFromTemplateArgs(args: unknown): args is CreatePlanFromTemplateArgs {
+  return (
+    typeof args === "object" &&
+    args !== null &&
+    "template_id" in args &&
+    typeof (args as CreatePlanFromTemplateArgs).template_id === "string" &&
+    (
+      !("variables" in args) ||
+      (typeof (args as CreatePlanFromTemplateArgs).variables === "object" &&
+       (args as CreatePlanFromTemplateArgs).variables !== null &&
+       Object.values((args as CreatePlanFromTemplateArgs).variables).every((value) => typeof value === "string"))
+    ) &&
+    (
+      !("name" in args) ||
+      typeof (args as CreatePlanFromTemplateArgs).name === "string"
+    )
+  );
+}
+
 // 获取当前计划ID的辅助函数
 async function getCurrentPlanId(): Promise<string> {
   try {
-    const response = await axios.get(`${API_BASE_URL}/plans/current`);
+    const response = await axios.get(`${API_BASE_URL}/plans/current`, {
+      params: { comments: "none" }
+    });
     if (response.data && response.data.id) {
       return response.data.id;
     }
@@ -110,6 +215,31 @@ async function getCurrentPlanId(): Promise<string> {
   }
 }
 
+// 提交文本转计划的后台任务，并通过长轮询等待任务完成，返回生成的计划
+async function createPlanFromText(planData: { name: string; text?: string }): Promise<any> {
+  const submitted = await axios.post(`${API_BASE_URL}/jobs/parse-plan`, planData);
+  const jobId = submitted.data.id;
+  const deadline = Date.now() + PARSE_JOB_TIMEOUT_MS;
+
+  while (Date.now() < deadline) {
+    const response = await axios.get(`${API_BASE_URL}/jobs/${jobId}`, {
+      params: { wait: JOB_POLL_WAIT_SECONDS }
+    });
+    const job = response.data;
+    if (job.status === "succeeded") {
+      const plan = await axios.get(`${API_BASE_URL}/plans/${job.plan_id}`);
+      return plan.data;
+    }
+    if (job.status === "failed" || job.status === "cancelled") {
+      throw new Error(`计划解析任务${job.status === "failed" ? "失败" : "已取消"}: ${job.error || jobId}`);
+    }
+  }
+
+  // 超时后取消任务，避免稍后生成一个无人等待的计划
+  await axios.post(`${API_BASE_URL}/jobs/${jobId}/cancel`).catch(() => undefined);
+  throw new Error(`计划解析超时（任务 ${jobId} 已取消）`);
+}
+
 // MCP服务器类
 class PlannerToolsServer {
   private server: Server;
@@ -159,9 +289,40 @@ class PlannerToolsServer {
               required: ["name"]
             }
           },
+          {
+            name: "list_plan_templates",
+            description: "Lists the saved plan templates. A template is a reusable plan shape (tasks, comments and dependencies) whose text may contain {{variable}} placeholders.\n\nEach entry includes the template ID, name, description, task count and the placeholder variables it expects. Use create_plan_from_template to create a plan from one of them instead of parsing similar text again with create_plan.",
+            inputSchema: {
+              type: "object",
+              properties: {}
+            }
+          },
+          {
+            name: "create_plan_from_template",
+            description: "Creates a new plan from a saved template and sets it as the currently tracked plan. This is instant and does not call the model: tasks, comments and dependencies are copied with fresh IDs and {{variable}} placeholders are replaced.\n\nParameters:\n- template_id: The template ID from list_plan_templates (required)\n- variables: Values for the template's placeholder variables (optional for variables that have defaults)\n- name: Overrides the generated plan name (optional)",
+            inputSchema: {
+              type: "object",
+              properties: {
+                template_id: {
+                  type: "string",
+                  description: "The ID of the template"
+                },
+                variables: {
+                  type: "object",
+                  additionalProperties: { type: "string" },
+                  description: "Values for the template's placeholder variables"
+                },
+                name: {
+                  type: "string",
+                  description: "The plan name, overriding the name from the template"
+                }
+              },
+              required: ["template_id"]
+            }
+          },
           {
             name: "get_current_plan_tasks",
-            description: "Retrieves all tasks from the currently tracked plan. This tool provides a complete view of all tasks in the active plan, helping you understand the entire project structure and progress.\n\nThe results are sorted by task order and include detailed information for each task:\n- Task ID and title\n- Detailed description\n- Current status (such as 'Pending', 'Working', etc.)\n- Dependencies\n- Estimated time\n- Comment list\n\nThis tool is particularly useful for:\n- Getting a complete task overview at the beginning of a project\n- Regularly checking project progress and structure\n- Finding dependencies between tasks\n- Understanding the entire project architecture and components before writing code\n\nThis tool doesn't require any input parameters as it automatically identifies the currently tracked plan. If no current plan is set, it will return an appropriate error message.",
+            description: "Retrieves all tasks from the currently tracked plan. This tool provides a complete view of all tasks in the active plan, helping you understand the entire project structure and progress.\n\nThe results are sorted by task order and include detailed information for each task:\n- Task ID and title\n- Detailed description\n- Current status (such as 'Pending', 'Working', etc.)\n- Dependencies\n- Estimated time\n- The most recent comments and the total comment count\n\nThis tool is particularly useful for:\n- Getting a complete task overview at the beginning of a project\n- Regularly checking project progress and structure\n- Finding dependencies between tasks\n- Understanding the entire project architecture and components before writing code\n\nThis tool doesn't require any input parameters as it automatically identifies the currently tracked plan. If no current plan is set, it will return an appropriate error message.",
             inputSchema: {
               type: "object",
               properties: {
@@ -246,6 +407,46 @@ class PlannerToolsServer {
               },
               required: ["task_id", "comment_id"]
             }
+          },
+          {
+            name: "claim_next_task",
+            description: "Atomically claims the next ready task in the current plan for this agent. The claimed task is set to 'Working' and held by a lease, so other agents sharing the same plan will not receive it from get_next_tasks or claim_next_task.\n\nUse this tool instead of get_next_tasks when several agents work on the same plan in parallel.\n\nParameters:\n- owner: The claiming agent's identifier (optional, defaults to PLANNER_AGENT_ID)\n- ttl_seconds: Lease duration in seconds (optional, defaults to the server setting)\n\nThe lease ends automatically when the task status is updated away from 'Working'. If the lease expires before that, the server returns the task to its previous status so another agent can pick it up. Returns the claimed task, or a message if no task is ready.",
+            inputSchema: {
+              type: "object",
+              properties: {
+                owner: {
+                  type: "string",
+                  description: "Identifier of the claiming agent"
+                },
+                ttl_seconds: {
+                  type: "number",
+                  description: "Lease duration in seconds"
+                }
+              }
+            }
+          },
+          {
+            name: "release_task",
+            description: "Releases a task previously claimed with claim_next_task without finishing it, so other agents can pick it up.\n\nParameters:\n- task_id: The ID of the claimed task (required)\n- owner: The claiming agent's identifier (optional, defaults to PLANNER_AGENT_ID)\n- status: The status to set on release (optional, defaults to the status before the claim)",
+            inputSchema: {
+              type: "object",
+              properties: {
+                task_id: {
+                  type: "string",
+                  description: "The ID of the claimed task"
+                },
+                owner: {
+                  type: "string",
+                  description: "Identifier of the claiming agent"
+                },
+                status: {
+                  type: "string",
+                  enum: ["Pending", "Working", "Pending For Review", "Complete", "Need Fixed"],
+                  description: "The status to set on release"
+                }
+              },
+              required: ["task_id"]
+            }
           }
         ]
       })
@@ -271,13 +472,13 @@ class PlannerToolsServer {
                 text: request.params.arguments.text
               };
               
-              // 发送API请求创建计划 - 使用正确的from-text API
-              const response = await axios.post(`${API_BASE_URL}/plans/from-text`, planData);
+              // 提交后台解析任务并等待完成，长时间解析不会因HTTP超时中断
+              const plan = await createPlanFromText(planData);
               
               return {
                 content: [{
                   type: "text",
-                  text: JSON.stringify(response.data, null, 2)
+                  text: JSON.stringify(plan, null, 2)
                 }]
               };
             } catch (error) {
@@ -292,10 +493,75 @@ class PlannerToolsServer {
             }
           }
           
+          case "list_plan_templates": {
+            try {
+              const response = await axios.get(`${API_BASE_URL}/templates/`);
+              
+              return {
+                content: [{
+                  type: "text",
+                  text: JSON.stringify(response.data, null, 2)
+                }]
+              };
+            } catch (error) {
+              console.error("获取计划模板失败:", error);
+              return {
+                content: [{
+                  type: "text",
+                  text: `获取计划模板失败: ${error instanceof Error ? error.message : String(error)}`
+                }],
+                isError: true
+              };
+            }
+          }
+          
+          case "create_plan_from_template": {
+            try {
+              if (!isValidCreatePlanFromTemplateArgs(request.params.arguments)) {
+                throw new McpError(
+                  "无效的模板参数", 
+                  ErrorCode.InvalidParams
+                );
+              }
+              
+              const templateId = request.params.arguments.template_id;
+              const instantiateData = {
+                variables: request.params.arguments.variables || {},
+                name: request.params.arguments.name,
+                set_current: true
+              };
+              
+              // 从模板创建计划（不调用模型）
+              const response = await axios.post(
+                `${API_BASE_URL}/templates/${templateId}/instantiate`,
+                instantiateData
+              );
+              
+              return {
+                content: [{
+                  type: "text",
+                  text: JSON.stringify(response.data, null, 2)
+                }]
+              };
+            } catch (error) {
+              console.error("从模板创建计划失败:", error);
+              const detail = axios.isAxiosError(error) ? error.response?.data?.detail : undefined;
+              return {
+                content: [{
+                  type: "text",
+                  text: `从模板创建计划失败: ${detail || (error instanceof Error ? error.message : String(error))}`
+                }],
+                isError: true
+              };
+            }
+          }
+          
           case "get_current_plan_tasks": {
             try {
-              // 获取当前计划中的所有任务列表
-              const response = await axios.get(`${API_BASE_URL}/plans/current`);
+              // 获取当前计划中的所有任务列表（每个任务只带最新几条评论，comment_count为评论总数）
+              const response = await axios.get(`${API_BASE_URL}/plans/current`, {
+                params: { comments: "latest", comment_limit: TASK_COMMENT_LIMIT }
+              });
               
               if (!response.data || !response.data.tasks || response.data.tasks.length === 0) {
                 return {
@@ -484,6 +750,93 @@ class PlannerToolsServer {
             }
           }
           
+          case "claim_next_task": {
+            try {
+              if (!isValidClaimNextTaskArgs(request.params.arguments)) {
+                throw new McpError(
+                  "Invalid claim parameters", 
+                  ErrorCode.InvalidParams
+                );
+              }
+              
+              const args = request.params.arguments || {};
+              const claimData = {
+                owner: args.owner || AGENT_ID,
+                ttl_seconds: args.ttl_seconds
+              };
+              
+              // 发送API请求认领下一个任务
+              const response = await axios.post(`${API_BASE_URL}/plans/claim-next`, claimData);
+              
+              if (!response.data) {
+                return {
+                  content: [{
+                    type: "text",
+                    text: "No task is ready to be claimed. All ready tasks may already be claimed by other agents, or waiting on dependencies."
+                  }]
+                };
+              }
+              
+              return {
+                content: [{
+                  type: "text",
+                  text: JSON.stringify(response.data, null, 2)
+                }]
+              };
+            } catch (error) {
+              console.error("Failed to claim task:", error);
+              return {
+                content: [{
+                  type: "text",
+                  text: `Failed to claim task: ${error instanceof Error ? error.message : String(error)}`
+                }],
+                isError: true
+              };
+            }
+          }
+          
+          case "release_task": {
+            try {
+              if (!isValidReleaseTaskArgs(request.params.arguments)) {
+                throw new McpError(
+                  "Invalid release parameters", 
+                  ErrorCode.InvalidParams
+                );
+              }
+              
+              // 获取当前计划ID
+              const planId = await getCurrentPlanId();
+              const taskId = request.params.arguments.task_id;
+              
+              const releaseData = {
+                owner: request.params.arguments.owner || AGENT_ID,
+                status: request.params.arguments.status
+              };
+              
+              // 发送API请求释放任务
+              const response = await axios.post(
+                `${API_BASE_URL}/plans/${planId}/tasks/${taskId}/release`,
+                releaseData
+              );
+              
+              return {
+                content: [{
+                  type: "text",
+                  text: JSON.stringify(response.data, null, 2)
+                }]
+              };
+            } catch (error) {
+              console.error("Failed to release task:", error);
+              return {
+                content: [{
+                  type: "text",
+                  text: `Failed to release task: ${error instanceof Error ? error.message : String(error)}`
+                }],
+                isError: true
+              };
+            }
+          }
+          
           default:
             throw new McpError(
               `Unknown tool: ${request.params.name}`, 
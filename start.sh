@@ -4,12 +4,20 @@
 # 获取后端端口号，默认为8000
 BACKEND_PORT=${BACKEND_PORT:-8000}
 FRONTEND_PORT=${WEB_PORT:-3000}
+# 后端worker进程数，大于1时以多进程生产模式运行（不启用--reload）
+BACKEND_WORKERS=${BACKEND_WORKERS:-1}
+# 空闲keep-alive连接保持秒数
+KEEP_ALIVE_TIMEOUT=${KEEP_ALIVE_TIMEOUT:-60}
+# 为true时前端页面由后端进程提供，不启动单独的前端服务器
+SERVE_WEB=${SERVE_WEB:-false}
+# 等待后端就绪的最长秒数
+READY_TIMEOUT=${READY_TIMEOUT:-60}
 
 # 日志文件
 FRONTEND_LOG="frontend_server.log"
 rm -f $FRONTEND_LOG # 清除旧日志
 
-echo "后端端口: $BACKEND_PORT, 前端端口: $FRONTEND_PORT"
+echo "后端端口: $BACKEND_PORT, 前端端口: $FRONTEND_PORT, 后端worker数: $BACKEND_WORKERS"
 
 # 停止函数
 kill_process_on_port() {
@@ -56,7 +64,11 @@ else
 fi
 
 # 启动uvicorn并在后台运行 (错误输出也打印到终端)
-python -m uvicorn app.main:app --reload --host 0.0.0.0 --port $BACKEND_PORT &
+if [ "$BACKEND_WORKERS" -gt 1 ]; then
+    python -m uvicorn app.main:app --workers $BACKEND_WORKERS --timeout-keep-alive $KEEP_ALIVE_TIMEOUT --host 0.0.0.0 --port $BACKEND_PORT &
+else
+    python -m uvicorn app.main:app --reload --timeout-keep-alive $KEEP_ALIVE_TIMEOUT --host 0.0.0.0 --port $BACKEND_PORT &
+fi
 API_PID=$!
 echo "API服务器进程ID: $API_PID"
 if [ -f "venv/bin/activate" ]; then # 仅当虚拟环境存在时才停用
@@ -64,14 +76,40 @@ if [ -f "venv/bin/activate" ]; then # 仅当虚拟环境存在时才停用
 fi
 cd .. # 返回项目根目录
 
-# 等待API服务器启动
-echo "等待API服务器启动..."
-sleep 3
+# 等待API服务器就绪（轮询/ready，预热完成后返回200），不再固定等待
+echo "等待API服务器就绪..."
+READY_URL="http://127.0.0.1:$BACKEND_PORT/ready"
+is_ready() {
+    if command -v curl >/dev/null 2>&1; then
+        curl -sf -o /dev/null "$READY_URL"
+    else
+        python -c "import sys, urllib.request; urllib.request.urlopen(sys.argv[1], timeout=2)" "$READY_URL" 2>/dev/null
+    fi
+}
+WAITED=0
+until is_ready; do
+    # 检查API服务器是否仍在运行
+    if ! kill -0 $API_PID 2>/dev/null; then
+        echo "错误：后端API服务器未能成功启动或已退出！请检查后端日志。"
+        exit 1
+    fi
+    if [ $WAITED -ge $((READY_TIMEOUT * 10)) ]; then
+        echo "错误：后端API服务器在 ${READY_TIMEOUT} 秒内未就绪！请检查后端日志。"
+        kill $API_PID
+        exit 1
+    fi
+    sleep 0.1
+    WAITED=$((WAITED + 1))
+done
+echo "API服务器已就绪（用时约 $((WAITED / 10)).$((WAITED % 10)) 秒）"
 
-# 检查API服务器是否仍在运行
-if ! kill -0 $API_PID 2>/dev/null; then
-    echo "错误：后端API服务器未能成功启动或已退出！请检查后端日志。"
-    exit 1
+if [ "$SERVE_WEB" = "true" ]; then
+    # 前端由后端同源提供，只需等待后端进程
+    trap "echo '正在关闭服务...'; kill $API_PID; exit" INT TERM
+    echo "服务已启动，访问 http://localhost:$BACKEND_PORT 查看前端界面。按 Ctrl+C 停止"
+    wait $API_PID
+    echo "所有服务已停止"
+    exit 0
 fi
 
 # 启动前端静态服务器 (后台，并将输出重定向到日志文件)
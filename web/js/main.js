@@ -6,9 +6,15 @@
 document.addEventListener('DOMContentLoaded', () => {
     console.log("DOM内容加载完成，初始化应用...");
     
-    // 配置信息
+    // 通过/w/<工作区>/打开页面时请求同一工作区的API
+    const workspaceMatch = window.location.pathname.match(/^\/w\/([^/]+)/);
+    const workspacePrefix = workspaceMatch ? `/w/${workspaceMatch[1]}` : '';
+
+    // 配置信息（由后端同源提供页面时直接请求当前源，省去跨域预检）
     const config = {
-        API_BASE_URL: `${window.location.protocol}//${window.location.hostname}:${window.CODE_DOCK_CONFIG.API_PORT}`
+        API_BASE_URL: (window.CODE_DOCK_CONFIG.SAME_ORIGIN
+            ? window.location.origin
+            : `${window.location.protocol}//${window.location.hostname}:${window.CODE_DOCK_CONFIG.API_PORT}`) + workspacePrefix
     };
 
     // 初始化模块
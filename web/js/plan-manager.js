@@ -7,6 +7,7 @@
 const PlanManager = (function() {
     // 私有变量
     let plansGrid;
+    let dashboardSummary;
     let plansLoading;
     let noPlansEl;
     let manageStatusDiv;
@@ -34,6 +35,7 @@ const PlanManager = (function() {
         
         // 初始化DOM元素引用
         plansGrid = document.getElementById('plans-grid');
+        dashboardSummary = document.getElementById('dashboard-summary');
         plansLoading = document.getElementById('plans-loading');
         noPlansEl = document.getElementById('no-plans');
         manageStatusDiv = document.getElementById('manage-status');
@@ -214,7 +216,7 @@ const PlanManager = (function() {
         UI.openModal(planDetailModal);
         
         try {
-            const response = await fetch(`${API_BASE_URL}/plans/${planId}`);
+            const response = await fetch(`${API_BASE_URL}/plans/${planId}?comments=none`);
             
             if (!response.ok) {
                 throw new Error(`获取计划详情失败: ${response.status}`);
@@ -425,7 +427,7 @@ const PlanManager = (function() {
                         <div class="task-meta">
                             <div>
                                 ${task.order !== null ? `<span>顺序: ${task.order}</span> | ` : ''}
-                                <span>评论: ${task.comments ? task.comments.length : 0}</span>
+                                <span>评论: ${task.comment_count || 0}</span>
                             </div>
                             <div class="task-actions">
                                 <button class="btn btn-sm btn-primary edit-task-btn" data-id="${task.id}" title="查看/编辑任务">
@@ -667,31 +669,17 @@ const PlanManager = (function() {
         hidePlansGrid();
         
         try {
-            // 首先获取当前计划ID
-            let currentPlanId = null;
-            try {
-                const currentPlanResponse = await fetch(`${API_BASE_URL}/plans/current`);
-                if (currentPlanResponse.ok) {
-                    const currentPlanData = await currentPlanResponse.json();
-                    if (currentPlanData && currentPlanData.id) {
-                        currentPlanId = currentPlanData.id;
-                    }
-                } else {
-                    console.warn('获取当前计划失败', currentPlanResponse.status);
-                }
-            } catch (error) {
-                console.error('获取当前计划出错:', error);
-                // 继续执行获取所有计划
-            }
-            
-            // 获取所有计划
-            const response = await fetch(`${API_BASE_URL}/plans/`);
+            // 仪表盘汇总包含当前计划ID和各计划的任务数，不需要获取所有任务
+            const response = await fetch(`${API_BASE_URL}/dashboard/`);
             
             if (!response.ok) {
                 throw new Error(`服务器返回错误: ${response.status}`);
             }
             
-            const plans = await response.json();
+            const dashboard = await response.json();
+            const plans = dashboard.plans;
+            const currentPlanId = dashboard.current_plan_id;
+            renderDashboardSummary(dashboard);
             
             if (plans && plans.length > 0) {
                 renderPlanCards(plans, currentPlanId);
@@ -713,7 +701,32 @@ const PlanManager = (function() {
         }
     }
     
-    // 渲染计划卡片
+    // 渲染所有计划的汇总
+    function renderDashboardSummary(dashboard) {
+        if (!dashboardSummary) {
+            return;
+        }
+        if (!dashboard.plan_count) {
+            dashboardSummary.style.display = 'none';
+            return;
+        }
+        const items = [
+            [dashboard.plan_count, '计划'],
+            [dashboard.task_count, '总任务'],
+            [dashboard.status_counts['Working'] || 0, '进行中'],
+            [dashboard.ready_count, '可开始'],
+            [`${dashboard.completion}%`, '完成度']
+        ];
+        dashboardSummary.innerHTML = items.map(([value, label]) => `
+            <div class="stat-item">
+                <div class="stat-value">${value}</div>
+                <div class="stat-label">${label}</div>
+            </div>
+        `).join('');
+        dashboardSummary.style.display = 'flex';
+    }
+    
+    // 渲染计划卡片（plans为仪表盘中各计划的汇总）
     function renderPlanCards(plans, currentPlanId) {
         if (!plansGrid) {
             console.error('[计划管理] 渲染失败: plansGrid元素不存在');
@@ -734,12 +747,13 @@ const PlanManager = (function() {
         
         // 创建计划卡片
         plans.forEach((plan, index) => {
-            const isCurrent = plan.id === currentPlanId;
-            const totalTasks = plan.tasks ? plan.tasks.length : 0;
-            const completedTasks = plan.tasks ? plan.tasks.filter(task => task.status === 'Complete').length : 0;
+            const planId = plan.plan_id;
+            const isCurrent = planId === currentPlanId;
+            const totalTasks = plan.task_count;
+            const completedTasks = plan.status_counts['Complete'] || 0;
             const pendingTasks = totalTasks - completedTasks;
             
-            console.log(`[计划管理] 渲染计划: ${plan.name}, ID: ${plan.id}, 当前计划: ${isCurrent}`);
+            console.log(`[计划管理] 渲染计划: ${plan.name}, ID: ${planId}, 当前计划: ${isCurrent}`);
             
             // 创建计划卡片HTML
             const planCard = document.createElement('div');
@@ -767,11 +781,11 @@ const PlanManager = (function() {
                     </div>
                 </div>
                 <div class="plan-actions">
-                    <button class="btn btn-sm btn-primary manage-tasks-btn" data-id="${plan.id}" title="管理任务">
+                    <button class="btn btn-sm btn-primary manage-tasks-btn" data-id="${planId}" title="管理任务">
                         <i class="fas fa-tasks"></i> 管理任务
                     </button>
                     ${!isCurrent ? `
-                        <button class="btn btn-sm btn-success set-current-btn" data-id="${plan.id}" title="设为当前计划">
+                        <button class="btn btn-sm btn-success set-current-btn" data-id="${planId}" title="设为当前计划">
                             <i class="fas fa-star"></i> 设为当前
                         </button>
                     ` : `
@@ -779,7 +793,7 @@ const PlanManager = (function() {
                             <i class="fas fa-arrow-right"></i> 下一步任务
                         </button>
                     `}
-                    <button class="btn btn-sm btn-danger delete-plan-btn" data-id="${plan.id}" title="删除计划">
+                    <button class="btn btn-sm btn-danger delete-plan-btn" data-id="${planId}" title="删除计划">
                         <i class="fas fa-trash-alt"></i> 删除
                     </button>
                 </div>
@@ -386,7 +386,7 @@ const TaskManager = (function() {
         console.log(`正在加载计划(${planId})的任务列表`);
         
         try {
-            const response = await fetch(`${API_BASE_URL}/plans/${planId}/tasks`);
+            const response = await fetch(getTasksUrl(planId));
             if (!response.ok) {
                 throw new Error(`获取任务列表失败: ${response.status}`);
             }
@@ -884,11 +884,16 @@ const TaskManager = (function() {
         }
     }
     
+    // 构建任务列表请求地址（列表只显示评论数，不需要评论内容）
+    function getTasksUrl(planId) {
+        return `${API_BASE_URL}/plans/${planId}/tasks?comments=none`;
+    }
+    
     // 获取任务列表
     function fetchTasks() {
         UI.showLoading();
         
-        fetch(`${API_BASE_URL}/plans/${planId}/tasks`)
+        fetch(getTasksUrl(planId))
         .then(response => {
             if (!response.ok) {
                 throw new Error('获取任务列表失败');
@@ -1,8 +1,11 @@
 import os
 import http.server
-import socketserver
 import sys
-import re
+import gzip
+import hashlib
+import mimetypes
+import threading
+from email.utils import formatdate, parsedate_to_datetime
 from dotenv import load_dotenv
 # 配置
 
@@ -10,40 +13,141 @@ load_dotenv()
 WEB_PORT = int(os.getenv("WEB_PORT", 3000))
 BACKEND_PORT = int(os.getenv("BACKEND_PORT", 8000))
 DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "web")
+# 小于该字节数的文件不压缩
+GZIP_MIN_SIZE = 1024
+# 可以压缩的内容类型
+COMPRESSIBLE_TYPES = ("text/", "application/javascript", "application/json", "image/svg+xml")
 
-class Handler(http.server.SimpleHTTPRequestHandler):
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, directory=DIRECTORY, **kwargs)
+def accepts_gzip(accept_encoding):
+    """Accept-Encoding是否接受gzip（解析q值，q=0表示拒绝；规则与后端的压缩中间件一致）"""
+    accepted = {}
+    for part in accept_encoding.split(','):
+        name, _, params = part.strip().partition(';')
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+    return accepted.get('gzip', accepted.get('*', 0.0)) > 0
+
+class StaticFile:
+    """内存中缓存的静态文件（HTML已注入配置，并预先计算gzip内容和ETag）"""
+    def __init__(self, path, mtime, body, content_type):
+        self.path = path
+        self.mtime = mtime
+        self.body = body
+        self.content_type = content_type
+        self.etag = '"' + hashlib.sha1(body).hexdigest()[:16] + '"'
+        self.last_modified = formatdate(mtime, usegmt=True)
+        self.gzip_body = None
+        if len(body) >= GZIP_MIN_SIZE and content_type.startswith(COMPRESSIBLE_TYPES):
+            self.gzip_body = gzip.compress(body, compresslevel=9)
+
+class StaticCache:
+    """按路径缓存静态文件，文件修改时间变化时重新加载"""
+    def __init__(self, directory):
+        self.directory = os.path.realpath(directory)
+        self._files = {}
+        self._lock = threading.Lock()
+
+    def get(self, url_path):
+        file_path = os.path.realpath(os.path.join(self.directory, url_path.lstrip('/')))
+        # 防止路径穿越到服务目录之外
+        if not file_path.startswith(self.directory + os.sep) or not os.path.isfile(file_path):
+            return None
+        mtime = os.stat(file_path).st_mtime
+        cached = self._files.get(file_path)
+        if cached and cached.mtime == mtime:
+            return cached
+        with self._lock:
+            cached = self._load(file_path, mtime)
+            self._files[file_path] = cached
+        return cached
+
+    def _load(self, file_path, mtime):
+        with open(file_path, 'rb') as file:
+            body = file.read()
+        content_type = mimetypes.guess_type(file_path)[0] or 'application/octet-stream'
+        if content_type.startswith('text/'):
+            content_type += '; charset=utf-8'
+        if file_path.endswith('.html'):
+            # 注入配置脚本，在</head>标签前
+            config_script = f'<script>window.CODE_DOCK_CONFIG = {{ API_PORT: {BACKEND_PORT} }};</script>'
+            body = body.decode('utf-8').replace('</head>', f'{config_script}\n</head>').encode('utf-8')
+        return StaticFile(file_path, mtime, body, content_type)
+
+CACHE = StaticCache(DIRECTORY)
+
+class Handler(http.server.BaseHTTPRequestHandler):
+    # HTTP/1.1以支持keep-alive，所有响应都必须带Content-Length
+    protocol_version = "HTTP/1.1"
 
     def do_GET(self):
+        self._serve(send_body=True)
+
+    def do_HEAD(self):
+        self._serve(send_body=False)
+
+    def _serve(self, send_body):
+        path = self.path.split('?', 1)[0].split('#', 1)[0]
         # 对于根路径，确保服务index.html
-        if self.path == '/':
-            self.path = '/index.html'
-        
-        # 如果是请求HTML文件，注入端口配置
-        if self.path.endswith('.html'):
-            self.send_response(200)
-            self.send_header('Content-type', 'text/html')
+        if path.endswith('/'):
+            path += 'index.html'
+
+        static_file = CACHE.get(path)
+        if static_file is None:
+            self.send_error(404, "File not found")
+            return
+
+        if self._not_modified(static_file):
+            self.send_response(304)
+            self._send_cache_headers(static_file)
             self.end_headers()
-            
-            file_path = os.path.join(DIRECTORY, self.path.lstrip('/'))
-            with open(file_path, 'r', encoding='utf-8') as file:
-                content = file.read()
-            
-            # 注入配置脚本，在</head>标签前
-            config_script = f'<script>window.CODE_DOCK_CONFIG = {{ API_PORT: {BACKEND_PORT} }};</script>'
-            content = content.replace('</head>', f'{config_script}\n</head>')
-            
-            # 发送修改后的内容
-            self.wfile.write(content.encode())
             return
-        
-        return super().do_GET()
+
+        body = static_file.body
+        use_gzip = static_file.gzip_body is not None and accepts_gzip(self.headers.get('Accept-Encoding', ''))
+        if use_gzip:
+            body = static_file.gzip_body
+
+        self.send_response(200)
+        self.send_header('Content-Type', static_file.content_type)
+        self.send_header('Content-Length', str(len(body)))
+        if static_file.gzip_body is not None:
+            self.send_header('Vary', 'Accept-Encoding')
+        if use_gzip:
+            self.send_header('Content-Encoding', 'gzip')
+        self._send_cache_headers(static_file)
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+    def _send_cache_headers(self, static_file):
+        self.send_header('ETag', static_file.etag)
+        self.send_header('Last-Modified', static_file.last_modified)
+        # 每次使用前都需要验证，未修改时只返回304
+        self.send_header('Cache-Control', 'no-cache')
+
+    def _not_modified(self, static_file):
+        """根据If-None-Match/If-Modified-Since判断客户端缓存是否仍然有效"""
+        if_none_match = self.headers.get('If-None-Match')
+        if if_none_match:
+            return static_file.etag in [tag.strip() for tag in if_none_match.split(',')] or if_none_match.strip() == '*'
+        if_modified_since = self.headers.get('If-Modified-Since')
+        if if_modified_since:
+            try:
+                return int(static_file.mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+        return False
 
 def run_server():
     """运行HTTP服务器"""
-    # 使用 ThreadingHTTPServer 以便能处理 Ctrl+C
-    with socketserver.ThreadingTCPServer(("", WEB_PORT), Handler) as httpd:
+    # 使用 ThreadingHTTPServer 以便能处理 Ctrl+C 和并发的keep-alive连接
+    with http.server.ThreadingHTTPServer(("", WEB_PORT), Handler) as httpd:
         print(f"前端服务器启动在 http://localhost:{WEB_PORT}")
         print(f"后端服务器地址: http://localhost:{BACKEND_PORT}")
         print(f"服务目录: {DIRECTORY}")
@@ -56,4 +160,4 @@ def run_server():
             sys.exit(0)
 
 if __name__ == "__main__":
-    run_server() 
\ No newline at end of file
+    run_server()